@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""収集処理のオフラインベンチマーク: backfill / daily / recent をチャンネル規模ごとに計測
+
+ローカルの偽 YouTube Data API サーバー（benchmarks/fake_youtube_api.py）と SQLite バックエンドを使い、
+各フェーズを実際のスクリプトとして別プロセスで実行する（外部サービスにはアクセスしない）。
+フェーズごとに壁時計時間・API リクエスト数・クォータ消費・ピークメモリ（最大 RSS）・書き込み行数を出力する。
+recent の yt-dlp 部分は偽サーバーの /watch を読む SyntheticScraper に置き換える。
+
+合成データと計測条件は固定なので、--output で保存した結果を別のコミットで --baseline に渡すと
+差分が比較できる（時間・メモリは --threshold を超えた悪化、リクエスト・クォータは増加を回帰とみなす）。
+
+使い方:
+    python benchmarks/bench_collect.py                          # 1k / 10k / 100k 動画
+    python benchmarks/bench_collect.py --sizes 1000 10000 --output bench.json
+    python benchmarks/bench_collect.py --baseline bench.json --fail-on-regression
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fake_youtube_api import FakeYouTubeApi, SyntheticChannel
+
+# フェーズは上から順に同じデータディレクトリで実行する
+_RECENT = (
+    "import runpy, sys, types\n"
+    "from benchmarks.fake_youtube_api import SyntheticScraper\n"
+    "sys.modules['src.scrape_collector'] = types.SimpleNamespace(ScrapeCollector=SyntheticScraper)\n"
+    "sys.argv = ['collect.py', '--mode', 'recent']\n"
+    f"runpy.run_path({str(ROOT / 'scripts' / 'collect.py')!r}, run_name='__main__')\n"
+)
+PHASES = {
+    "backfill": [str(ROOT / "scripts" / "backfill.py")],
+    "daily": [str(ROOT / "scripts" / "collect.py"), "--mode", "daily"],
+    "recent": ["-c", _RECENT],
+}
+ROW_TABLES = ("video_metadata", "video_snapshots", "scraped_snapshots")
+
+# --baseline で比較する指標と、回帰とみなす条件（"ratio" は threshold を超えた増加、"any" は少しでも増加）
+COMPARED = {"wall_seconds": "ratio", "peak_rss_mb": "ratio", "requests_total": "any", "quota_units": "any"}
+
+
+def _row_counts(db_path: Path) -> dict[str, int]:
+    if not db_path.exists():
+        return {t: 0 for t in ROW_TABLES}
+    conn = sqlite3.connect(db_path)
+    try:
+        return {t: conn.execute(f"SELECT count(*) FROM {t}").fetchone()[0] for t in ROW_TABLES}
+    finally:
+        conn.close()
+
+
+def run_phase(name: str, api: FakeYouTubeApi, data_dir: Path) -> dict:
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])),
+        "COLLECTOR_DATA_DIR": str(data_dir),
+        "STORAGE_BACKEND": "sqlite",
+        "YOUTUBE_API_KEY": "bench",
+        "YOUTUBE_API_ENDPOINT": api.endpoint,
+    }
+    rows_before = _row_counts(data_dir / "local.db")
+    counters_before = api.counters()
+
+    with open(data_dir / f"{name}.stderr", "w", encoding="utf-8") as stderr:
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, *PHASES[name]], cwd=ROOT, env=env,
+                                stdout=subprocess.DEVNULL, stderr=stderr)
+        # wait4 でこの子プロセスだけの最大 RSS を取る（Linux は KiB、macOS はバイト）
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        tail = (data_dir / f"{name}.stderr").read_text(encoding="utf-8").splitlines()[-20:]
+        raise RuntimeError(f"{name} が終了コード {proc.returncode} で失敗しました:\n" + "\n".join(tail))
+
+    counters = api.counters()
+    requests = {
+        endpoint: count - counters_before["requests"].get(endpoint, 0)
+        for endpoint, count in counters["requests"].items()
+        if count != counters_before["requests"].get(endpoint, 0)
+    }
+    rows_after = _row_counts(data_dir / "local.db")
+    rss_bytes = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return {
+        "wall_seconds": round(wall, 2),
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 2),
+        "peak_rss_mb": round(rss_bytes / 2**20, 1),
+        "requests_total": sum(requests.values()),
+        "requests": requests,
+        "quota_units": counters["quota_units"] - counters_before["quota_units"],
+        "rows_written": {t: rows_after[t] - rows_before[t] for t in ROW_TABLES},
+    }
+
+
+def run_size(n_videos: int, latency: float) -> dict:
+    channel = SyntheticChannel(n_videos)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix=f"bench-{n_videos}-") as tmp, FakeYouTubeApi(channel, latency) as api:
+        for name in PHASES:
+            results[name] = run_phase(name, api, Path(tmp))
+            print(f"{n_videos:>7} videos  {name:<9} {results[name]['wall_seconds']:>8.2f}s  "
+                  f"{results[name]['requests_total']:>6} req  {results[name]['quota_units']:>6} units  "
+                  f"{results[name]['peak_rss_mb']:>7.1f} MB", file=sys.stderr)
+    return results
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """baseline と共通の (規模, フェーズ) について指標を比べ、回帰の一覧を返す"""
+    regressions = []
+    for size, phases in current["results"].items():
+        for phase, metrics in phases.items():
+            base = baseline["results"].get(size, {}).get(phase)
+            if base is None:
+                continue
+            for metric, rule in COMPARED.items():
+                new, old = metrics[metric], base[metric]
+                change = (new - old) / old if old else (0.0 if new == old else float("inf"))
+                regressed = change > threshold if rule == "ratio" else new > old
+                mark = "  REGRESSION" if regressed else ""
+                print(f"{size:>7} {phase:<9} {metric:<15} {old:>10} -> {new:>10} ({change:+.1%}){mark}",
+                      file=sys.stderr)
+                if regressed:
+                    regressions.append(f"{size}/{phase}/{metric}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="収集処理のオフラインベンチマーク")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="チャンネルの動画数")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="偽 API の1リクエストあたりの応答遅延")
+    parser.add_argument("--output", type=Path, help="結果の JSON を保存するパス")
+    parser.add_argument("--baseline", type=Path, help="比較する過去の結果（--output で保存したもの）")
+    parser.add_argument("--threshold", type=float, default=0.2, help="時間・メモリを回帰とみなす増加率")
+    parser.add_argument("--fail-on-regression", action="store_true", help="回帰があれば終了コード1で終わる")
+    args = parser.parse_args()
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "latency_ms": args.latency_ms,
+        "results": {str(n): run_size(n, args.latency_ms / 1000) for n in args.sizes},
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("latency_ms") != report["latency_ms"]:
+            print("警告: baseline と --latency-ms が異なるため時間は比較になりません", file=sys.stderr)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
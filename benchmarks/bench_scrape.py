@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""スクレイピング経路のベンチマーク: 個別ページ抽出 vs 動画タブの stats-only 抽出
+
+動画1件あたりの CPU 時間と HTTP リクエスト数を比較する（実際に YouTube へアクセスする）。
+
+使い方:
+    python benchmarks/bench_scrape.py                 # Supabase から直近の動画IDを取得
+    python benchmarks/bench_scrape.py VIDEO_ID ...    # 対象動画を指定
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import yt_dlp
+
+from config.settings import (
+    CHANNEL_ID, SUPABASE_URL, SUPABASE_KEY,
+    SCRAPE_RECENT_DAYS, SCRAPE_WORKERS,
+)
+from src.scrape_collector import ScrapeCollector
+
+_request_count = 0
+_request_lock = threading.Lock()
+_original_urlopen = yt_dlp.YoutubeDL.urlopen
+
+
+def _counting_urlopen(self, req):
+    global _request_count
+    with _request_lock:
+        _request_count += 1
+    return _original_urlopen(self, req)
+
+
+def measure(label: str, run) -> dict:
+    global _request_count
+    _request_count = 0
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    snaps = run()
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    videos = max(len(snaps), 1)
+    return {
+        "path": label,
+        "videos": len(snaps),
+        "requests": _request_count,
+        "requests_per_video": round(_request_count / videos, 2),
+        "cpu_seconds_per_video": round(cpu / videos, 4),
+        "wall_seconds": round(wall, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="スクレイピング経路のベンチマーク")
+    parser.add_argument("video_ids", nargs="*", help="対象動画ID（省略時は直近の動画）")
+    parser.add_argument("--channel-id", default=CHANNEL_ID)
+    parser.add_argument("--delay", type=float, default=0.5, help="リクエスト開始間隔（秒）")
+    args = parser.parse_args()
+
+    video_ids = args.video_ids
+    if not video_ids:
+        from src.db import Database
+        video_ids = Database(SUPABASE_URL, SUPABASE_KEY).get_recent_video_ids(days=SCRAPE_RECENT_DAYS)
+    if not video_ids:
+        print("対象動画がありません", file=sys.stderr)
+        sys.exit(1)
+
+    yt_dlp.YoutubeDL.urlopen = _counting_urlopen
+    results = []
+    for label, method in [("per_video", "collect"), ("stats_only", "collect_stats_only")]:
+        scraper = ScrapeCollector(args.delay, args.delay, workers=SCRAPE_WORKERS)
+        try:
+            if method == "collect":
+                results.append(measure(label, lambda: scraper.collect(video_ids)))
+            else:
+                results.append(measure(label, lambda: scraper.collect_stats_only(video_ids, args.channel_id)))
+        finally:
+            scraper.close()
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
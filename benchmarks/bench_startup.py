@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""コレクター起動時間のベンチマーク: モードごとの import 時間とクライアント生成時間
+
+各ケースを新しい Python プロセスで実行し（コールドスタート）、壁時計時間の中央値と
+`python -X importtime` で計測した重い import の上位を出力する（ネットワークにはアクセスしない）。
+
+使い方:
+    python benchmarks/bench_startup.py              # 各ケース5回
+    python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# scripts/collect.py のモジュールレベルの import を実行した上で、各モードが追加で行う処理
+_LOAD_SCRIPT = f"import runpy; runpy.run_path({str(ROOT / 'scripts' / 'collect.py')!r}, run_name='bench')\n"
+CASES = {
+    "script_only": _LOAD_SCRIPT,
+    "recent": _LOAD_SCRIPT + (
+        "from src.db import Database\n"
+        "from src.scrape_collector import ScrapeCollector\n"
+        "ScrapeCollector().close()\n"
+    ),
+    "daily_build": _LOAD_SCRIPT + (
+        "from src.api_collector import ApiCollector\n"
+        "ApiCollector('dummy')\n"
+    ),
+    "daily_cached_doc": _LOAD_SCRIPT + (
+        "from src.api_collector import ApiCollector\n"
+        "ApiCollector('dummy', discovery_cache_path=__import__('pathlib').Path({cache!r}))\n"
+    ),
+}
+
+
+def run_case(code: str, runs: int) -> dict:
+    walls = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True)
+        walls.append(time.perf_counter() - start)
+
+    # 最後に1回 -X importtime 付きで実行し、トップレベル import の累積時間を集計
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, check=True, capture_output=True, text=True
+    )
+    top_level = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # ネストした import は名前の前に2文字ずつ字下げされる
+        if not name.startswith("  "):
+            top_level.append((int(cumulative), name.strip()))
+    top_level.sort(reverse=True)
+
+    return {
+        "wall_seconds_median": round(statistics.median(walls), 3),
+        "wall_seconds_min": round(min(walls), 3),
+        "import_ms_total": round(sum(us for us, _ in top_level) / 1000, 1),
+        "heaviest_imports_ms": {name: round(us / 1000, 1) for us, name in top_level[:8]},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="コレクター起動時間のベンチマーク")
+    parser.add_argument("--runs", type=int, default=5, help="ケースごとの実行回数")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = str(Path(tmp) / "youtube_v3_discovery.json")
+        # キャッシュ作成は計測対象外（2回目以降の起動を想定）
+        subprocess.run([sys.executable, "-c", CASES["daily_cached_doc"].format(cache=cache)], cwd=ROOT, check=True)
+        for name, code in CASES.items():
+            results[name] = run_case(code.format(cache=cache) if name == "daily_cached_doc" else code, args.runs)
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
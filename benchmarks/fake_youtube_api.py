@@ -0,0 +1,234 @@
+"""ベンチマーク用の YouTube Data API v3 の代役（ローカル HTTP サーバー）と合成チャンネル
+
+channels.list / playlistItems.list / videos.list を、収集側が読むフィールドだけで返す。
+動画の一覧・公開日・統計は (動画数, seed, 日付) から決定的に生成するため、同じ条件なら
+どのコミットでも同じレスポンスになる。リクエスト数とクォータ消費はエンドポイントごとに数える。
+
+/watch?v=... は yt-dlp の代わりにスクレイピング経路が使う（クォータは消費しない）。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.request
+from base64 import urlsafe_b64encode
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from src.models import ScrapedSnapshot
+
+# 1リクエストあたりのクォータ消費（YouTube Data API v3 の list 系はすべて1ユニット）
+QUOTA_COSTS = {"channels": 1, "playlistItems": 1, "videos": 1}
+PAGE_SIZE = 50
+HISTORY_DAYS = 3650  # 動画の公開日をこの日数に均等に散らす
+
+
+def _unit(*parts) -> float:
+    """parts から決まる [0, 1) の疑似乱数"""
+    digest = hashlib.sha1(":".join(map(str, parts)).encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64
+
+
+class SyntheticChannel:
+    """動画数 n_videos の合成チャンネル（index 0 が最新の動画）"""
+
+    def __init__(self, n_videos: int, seed: int = 0, now: datetime | None = None):
+        self.n_videos = n_videos
+        self.seed = seed
+        self.now = now or datetime.utcnow().replace(microsecond=0)
+        self.video_ids = [
+            urlsafe_b64encode(hashlib.sha1(f"{seed}:{i}".encode()).digest()).decode()[:11]
+            for i in range(n_videos)
+        ]
+        self._index = {vid: i for i, vid in enumerate(self.video_ids)}
+        self._spacing = timedelta(days=HISTORY_DAYS) / max(n_videos, 1)
+
+    def published_at(self, i: int) -> datetime:
+        return self.now - self._spacing * i - timedelta(hours=1)
+
+    def stats(self, i: int) -> dict:
+        # 公開直後に伸びて以降は逓減、古い動画の6割は再生が止まっている（休眠）
+        age_days = (self.now - self.published_at(i)).total_seconds() / 86400
+        base = int(1000 + 200_000 * _unit(self.seed, i, "base") ** 3)
+        rate = 0.0 if age_days > 60 and _unit(self.seed, i, "dormant") < 0.6 else 50 * _unit(self.seed, i, "rate")
+        views = base + int(rate * age_days) + int(base * min(age_days, 7) / 7)
+        return {
+            "viewCount": str(views),
+            "likeCount": str(views // 40),
+            "commentCount": str(views // 900),
+        }
+
+    def channel_item(self, channel_id: str) -> dict:
+        total_views = sum(int(self.stats(i)["viewCount"]) for i in range(min(self.n_videos, 1000)))
+        return {
+            "id": channel_id,
+            "statistics": {
+                "subscriberCount": str(10 * self.n_videos),
+                "viewCount": str(total_views),
+                "videoCount": str(self.n_videos),
+            },
+            "snippet": {"title": f"Synthetic {self.n_videos}", "thumbnails": {"high": {"url": "https://example.invalid/c.jpg"}}},
+            "brandingSettings": {"image": {"bannerExternalUrl": "https://example.invalid/b.jpg"}},
+            "contentDetails": {"relatedPlaylists": {"uploads": "UU" + channel_id[2:]}},
+        }
+
+    def playlist_page(self, page_token: str | None) -> dict:
+        start = int(page_token or 0)
+        end = min(start + PAGE_SIZE, self.n_videos)
+        response = {"items": [{"contentDetails": {"videoId": vid}} for vid in self.video_ids[start:end]]}
+        if end < self.n_videos:
+            response["nextPageToken"] = str(end)
+        return response
+
+    def video_item(self, video_id: str, parts: set[str]) -> dict | None:
+        i = self._index.get(video_id)
+        if i is None:
+            return None
+        item = {"id": video_id}
+        if "statistics" in parts:
+            item["statistics"] = self.stats(i)
+        if "snippet" in parts:
+            item["snippet"] = {
+                "title": f"Video {i}",
+                "description": "synthetic " * 20,
+                "publishedAt": self.published_at(i).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "tags": ["bench", f"t{i % 7}"],
+                "categoryId": "24",
+                "thumbnails": {"high": {"url": f"https://example.invalid/{video_id}.jpg"}},
+            }
+        if "contentDetails" in parts:
+            item["contentDetails"] = {"duration": f"PT{5 + i % 40}M{i % 60}S"}
+        return item
+
+
+class FakeYouTubeApi:
+    """SyntheticChannel を返すローカル HTTP サーバー（with で起動・停止）
+
+    どのチャンネルIDを問い合わせても同じ合成チャンネルを返す。
+    latency は1リクエストごとの応答遅延（秒）で、実際の API の往復時間の代わり。
+    key_quota を指定すると API キー（key パラメータ）ごとにその量を超えたリクエストへ
+    403 quotaExceeded を返す（キーの切り替えの確認用）。
+    """
+
+    def __init__(self, channel: SyntheticChannel, latency: float = 0.0, key_quota: int | None = None):
+        self.channel = channel
+        self.latency = latency
+        self.key_quota = key_quota
+        self._lock = threading.Lock()
+        self.requests: dict[str, int] = {}
+        self.quota_units = 0
+        self.key_units: dict[str, int] = {}
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def endpoint(self) -> str:
+        """ApiCollector(api_endpoint=...) / YOUTUBE_API_ENDPOINT に渡す URL"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def counters(self) -> dict:
+        with self._lock:
+            return {"requests": dict(self.requests), "quota_units": self.quota_units, "key_units": dict(self.key_units)}
+
+    def _count(self, name: str, key: str | None) -> bool:
+        """リクエストを数える。key のクォータが key_quota を超えていれば消費せず False"""
+        cost = QUOTA_COSTS.get(name, 0)
+        with self._lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+            if cost and self.key_quota is not None and self.key_units.get(key, 0) + cost > self.key_quota:
+                return False
+            self.quota_units += cost
+            if cost:
+                self.key_units[key] = self.key_units.get(key, 0) + cost
+            return True
+
+    def _respond(self, name: str, params: dict[str, list[str]]) -> tuple[int, dict]:
+        channel = self.channel
+        if name == "channels":
+            return 200, {"items": [channel.channel_item(cid) for cid in params["id"][0].split(",")]}
+        if name == "playlistItems":
+            return 200, channel.playlist_page(params.get("pageToken", [None])[0])
+        if name == "videos":
+            parts = set(params["part"][0].split(","))
+            items = [channel.video_item(vid, parts) for vid in params["id"][0].split(",")]
+            return 200, {"items": [item for item in items if item is not None]}
+        if name == "watch":
+            item = channel.video_item(params["v"][0], {"statistics"})
+            return (200, item["statistics"]) if item else (404, {"error": "not found"})
+        return 404, {"error": {"code": 404, "message": f"unknown endpoint: {name}"}}
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                name = url.path.rstrip("/").rsplit("/", 1)[-1]
+                params = parse_qs(url.query)
+                allowed = api._count(name, params.get("key", [None])[0])
+                if api.latency:
+                    time.sleep(api.latency)
+                if allowed:
+                    status, body = api._respond(name, params)
+                else:
+                    status, body = 403, {"error": {"code": 403, "message": "quota exceeded", "errors": [
+                        {"domain": "youtube.quota", "reason": "quotaExceeded", "message": "quota exceeded"}
+                    ]}}
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-youtube-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class SyntheticScraper:
+    """ScrapeCollector の代役: 偽 API サーバーの /watch から動画ごとに統計を取得する
+
+    scripts/collect.py の collect_recent() がそのまま使えるよう、コンストラクタと
+    collect / collect_stats_only / close の形を ScrapeCollector に合わせる。接続先は YOUTUBE_API_ENDPOINT。
+    """
+
+    def __init__(self, delay_min: float = 0.0, delay_max: float = 0.0, workers: int = 1,
+                 max_requests: int | None = None, deadline_seconds: float | None = None):
+        self.endpoint = os.environ["YOUTUBE_API_ENDPOINT"]
+        self.max_requests = max_requests
+
+    def collect(self, video_ids: list[str]) -> list[ScrapedSnapshot]:
+        snaps = []
+        for video_id in video_ids[:self.max_requests]:
+            with urllib.request.urlopen(f"{self.endpoint}watch?v={video_id}") as response:
+                stats = json.loads(response.read())
+            snaps.append(ScrapedSnapshot(
+                video_id=video_id,
+                view_count=int(stats["viewCount"]),
+                like_count=int(stats["likeCount"]),
+                collected_at=datetime.utcnow().isoformat(),
+            ))
+        return snaps
+
+    def collect_stats_only(self, video_ids: list[str], channel_id: str, require_likes: bool = False):
+        return self.collect(video_ids)
+
+    def close(self):
+        pass
@@ -6,20 +6,86 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(BASE_DIR / "config" / ".env")
 
 YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY", "")
+# 複数のキー（カンマ区切り）を指定するとクォータをキーごとに使い、使い切ったら次のキーに切り替える。
+# 未指定なら YOUTUBE_API_KEY のみ
+YOUTUBE_API_KEYS = [
+    key.strip() for key in os.environ.get("YOUTUBE_API_KEYS", "").split(",") if key.strip()
+] or [key for key in [YOUTUBE_API_KEY] if key and key != "YOUR_API_KEY_HERE"]
+# API の接続先を差し替える（ベンチマークの偽 API サーバーなど。例: http://127.0.0.1:8000/。パスはディスカバリ文書側に含まれる）
+YOUTUBE_API_ENDPOINT = os.environ.get("YOUTUBE_API_ENDPOINT") or None
 CHANNEL_ID = "UCuWdyc0Mp7zRZd6KSPguCsA"  # ララチューン【ラランド公式】
+# 複数チャンネルを収集する場合の一覧（書式は config/channels.example.txt）。ファイルが無ければ CHANNEL_ID のみ
+CHANNELS_FILE = Path(os.environ.get("CHANNELS_FILE") or BASE_DIR / "config" / "channels.txt")
 
 # Supabase
 SUPABASE_URL = os.environ.get("SUPABASE_URL", "")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY", "")  # service_role key（サーバーサイド用）
 
-LOG_PATH = BASE_DIR / "data" / "collect.log"
+# 保存先: supabase | sqlite（sqlite はオフライン実行・検証用のローカルDB）
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "supabase")
+# 状態ファイル・ローカルDB・ログの置き場所（ベンチマークは一時ディレクトリに差し替える）
+DATA_DIR = Path(os.environ.get("COLLECTOR_DATA_DIR") or BASE_DIR / "data")
+LOCAL_DB_PATH = DATA_DIR / "local.db"
+# Supabase への書き込みを一旦ディスクに溜め、まとめて送る。
+# 環境変数 WRITE_SPOOL_DIR で置き場所を変えられ、空文字を設定すると無効（None = 都度送信）
+_write_spool_dir = os.environ.get("WRITE_SPOOL_DIR")
+if _write_spool_dir is None:
+    WRITE_SPOOL_DIR = DATA_DIR / "spool"
+else:
+    WRITE_SPOOL_DIR = Path(_write_spool_dir) if _write_spool_dir else None
+
+LOG_PATH = DATA_DIR / "collect.log"
+DISCOVERY_CACHE_PATH = DATA_DIR / "discovery_cache.json"
+QUOTA_STATE_PATH = DATA_DIR / "quota_state.json"  # クォータ日ごとの使用量（実行をまたいで累積）
+CHECKPOINT_DIR = DATA_DIR / "checkpoints"  # --resume 用の実行途中の進捗
+API_DISCOVERY_CACHE_PATH = DATA_DIR / "youtube_v3_discovery.json"  # 絞り込んだディスカバリ文書
+# 実行ごとの計測値（段階ごとの所要時間・レイテンシ・書き込み行数・クォータ）を {mode}.jsonl に1行ずつ追記
+METRICS_HISTORY_DIR = DATA_DIR / "metrics"
+# node_exporter の textfile collector のディレクトリ（設定すると youtube_collector_{mode}.prom を上書き出力）
+METRICS_TEXTFILE_DIR = os.environ.get("METRICS_TEXTFILE_DIR") or None
+PROFILE_DIR = DATA_DIR / "profiles"  # --profile の出力先（実行ごとに <mode>-<UTC時刻>/ を作る）
 
 # API収集パラメータ
-API_DAILY_QUOTA_LIMIT = 10000
+API_DAILY_QUOTA_LIMIT = 10000  # キー1つあたり
 VIDEO_BATCH_SIZE = 50  # videos.list は1リクエストで最大50件
+API_FETCH_WORKERS = 4  # videos.list を並列実行するワーカー数（1で逐次実行）
+PIPELINE_QUEUE_SIZE = 4  # 取得済みで書き込み待ちにできるバッチ数（超えると取得側が待つ）
+API_QUOTA_RESERVE = 200  # 日次収集で使わずに残すユニット（再実行・手動実行用）
+
+# 日次スナップショットの優先度付け（src/sampling.py）
+SAMPLING_FRESH_DAYS = 30  # 公開からこの日数以内の動画は毎日取得
+SAMPLING_DORMANT_INTERVAL_DAYS = 7  # 休眠動画はこの日数に1回だけ取得
+SAMPLING_DORMANT_DAILY_VIEWS = 10  # 1日あたりの再生増加がこれ未満の動画は休眠扱い
+
+# video_snapshots の保存方式: full=毎日全動画の行を書く | changes=値が変わった動画と
+# 前回の保存から SNAPSHOT_KEYFRAME_DAYS 日経った動画だけ書く（migrations/004 が必要）
+SNAPSHOT_STORAGE = os.environ.get("SNAPSHOT_STORAGE", "full")
+SNAPSHOT_KEYFRAME_DAYS = 7
+
+# 動画一覧の差分取得パラメータ
+DISCOVERY_STOP_AFTER_KNOWN = 10  # 既知IDがこの件数連続したらプレイリストの走査を打ち切る
+DISCOVERY_FULL_SCAN_DAYS = 7  # 削除検出のため、この日数ごとに全件走査する
 
 # スクレイピングパラメータ
-SCRAPE_DELAY_MIN = 3.0  # 秒
+SCRAPE_DELAY_MIN = 3.0  # 秒（リクエスト開始間隔の下限・上限）
 SCRAPE_DELAY_MAX = 5.0
 SCRAPE_MAX_REQUESTS_PER_RUN = 50
+SCRAPE_WORKERS = 3  # 同時にスクレイピングする動画数
+SCRAPE_RUN_DEADLINE = 300  # 秒。この時間内に始められなかった動画はスキップ
+SCRAPE_STATS_ONLY = False  # True: 動画タブの一覧から再生数をまとめて取得（欠けた動画のみ個別取得）
+SCRAPE_REQUIRE_LIKES = False  # stats-only で like_count も必須にする（動画タブには無いため個別取得になる）
 SCRAPE_RECENT_DAYS = 7  # 直近N日以内の動画を対象
+# scraped_snapshots の保持: 生データはこの日数だけ残し、古い分は時間集計→日集計にまとめる（migrations/005）
+SCRAPE_RAW_RETENTION_DAYS = 14
+SCRAPE_HOURLY_RETENTION_DAYS = 90
+
+# 常駐モード（collect.py --mode daemon）のスケジュール。各実行の開始は予定から最大 *_JITTER 秒ずらす
+DAEMON_DAILY_AT = "03:00"  # JST。日次収集を始める時刻
+DAEMON_DAILY_JITTER = 15 * 60
+DAEMON_RECENT_INTERVAL = 6 * 3600  # 秒。新着動画のスクレイピング間隔
+DAEMON_RECENT_JITTER = 10 * 60
+DAEMON_EARLY_INTERVAL = 10 * 60  # 秒。公開直後の動画を API で取得する間隔（1回 チャンネル数 + 動画数/50 ユニット）
+DAEMON_EARLY_JITTER = 60
+EARLY_LIFE_HOURS = 48  # 公開からこの時間以内の動画を DAEMON_EARLY_INTERVAL ごとに取得
+DAEMON_STATE_PATH = DATA_DIR / "daemon" / "schedule.json"  # ジョブごとの前回開始時刻（再起動しても間隔を保つ）
+DAEMON_TRIGGER_DIR = DATA_DIR / "daemon" / "triggers"  # collect.py --trigger がジョブ名のファイルを置く
@@ -11,9 +11,7 @@ import VideoFrequencyChart from "@/components/VideoFrequencyChart";
 import VideoDurationHistogram from "@/components/VideoDurationHistogram";
 import VideoMetricHistogram, { MetricType } from "@/components/VideoMetricHistogram";
 import FilteredVideoList from "@/components/FilteredVideoList";
-import { VideoWithStats } from "@/lib/queries";
-
-const CHANNEL_ID = "UCuWdyc0Mp7zRZd6KSPguCsA";
+import { CHANNEL_ID, VideoWithStats } from "@/lib/queries";
 
 const VIEW_BINS = [
   { label: "1万未満", min: 0, max: 10000 },
@@ -1,5 +1,9 @@
 import { getSupabase } from "./supabase";
 
+// 表示するチャンネル。収集側が複数チャンネルでも、ダッシュボードはこのチャンネルの行だけを読む
+export const CHANNEL_ID =
+  process.env.NEXT_PUBLIC_CHANNEL_ID || "UCuWdyc0Mp7zRZd6KSPguCsA";
+
 export type ChannelSnapshot = {
   collected_date: string;
   subscriber_count: number;
@@ -39,6 +43,7 @@ export async function fetchChannelSnapshots(
   const { data, error } = await getSupabase()
     .from("channel_snapshots")
     .select("collected_date, subscriber_count, total_view_count, video_count")
+    .eq("channel_id", CHANNEL_ID)
     .gte("collected_date", cutoff.toISOString().slice(0, 10))
     .order("collected_date", { ascending: true });
 
@@ -63,6 +68,7 @@ export async function fetchLatestChannelSnapshot(): Promise<ChannelSnapshot | nu
   const { data, error } = await getSupabase()
     .from("channel_snapshots")
     .select("collected_date, subscriber_count, total_view_count, video_count")
+    .eq("channel_id", CHANNEL_ID)
     .order("collected_date", { ascending: false })
     .limit(1)
     .single();
@@ -74,42 +80,16 @@ export async function fetchLatestChannelSnapshot(): Promise<ChannelSnapshot | nu
 export async function fetchTopVideos(
   limit: number = 20
 ): Promise<(VideoMeta & { view_count: number })[]> {
-  // 最新日の統計を取得
-  const { data: latestDate } = await getSupabase()
-    .from("video_snapshots")
-    .select("collected_date")
-    .order("collected_date", { ascending: false })
-    .limit(1)
-    .single();
-
-  if (!latestDate) return [];
-
-  const { data: snapshots, error: snapError } = await getSupabase()
-    .from("video_snapshots")
-    .select("video_id, view_count")
-    .eq("collected_date", latestDate.collected_date)
+  // 収集時に更新される video_latest_stats から最新統計をメタデータ付きで取得
+  const { data, error } = await getSupabase()
+    .from("video_latest_stats")
+    .select("video_id, title, published_at, duration_seconds, thumbnail_url, view_count")
+    .eq("channel_id", CHANNEL_ID)
     .order("view_count", { ascending: false })
     .limit(limit);
 
-  if (snapError || !snapshots) return [];
-
-  const videoIds = snapshots.map((s) => s.video_id);
-  const { data: metas } = await getSupabase()
-    .from("video_metadata")
-    .select("video_id, title, published_at, duration_seconds, thumbnail_url")
-    .in("video_id", videoIds);
-
-  const metaMap = new Map((metas ?? []).map((m) => [m.video_id, m]));
-  return snapshots.map((s) => ({
-    ...(metaMap.get(s.video_id) ?? {
-      video_id: s.video_id,
-      title: "",
-      published_at: "",
-      duration_seconds: 0,
-      thumbnail_url: "",
-    }),
-    view_count: s.view_count,
-  }));
+  if (error || !data) return [];
+  return data;
 }
 
 export async function fetchVideoGrowth(
@@ -118,12 +98,11 @@ export async function fetchVideoGrowth(
 ): Promise<VideoSnapshotRow[]> {
   const cutoff = new Date();
   cutoff.setDate(cutoff.getDate() - days);
-  const { data, error } = await getSupabase()
-    .from("video_snapshots")
-    .select("video_id, view_count, like_count, comment_count, collected_date")
-    .eq("video_id", videoId)
-    .gte("collected_date", cutoff.toISOString().slice(0, 10))
-    .order("collected_date", { ascending: true });
+  // video_snapshots は値が変わった日しか行が無い場合があるため、日ごとに補完した値を取得する
+  const { data, error } = await getSupabase().rpc("video_snapshots_filled", {
+    p_video_ids: [videoId],
+    p_start: cutoff.toISOString().slice(0, 10),
+  });
 
   if (error) throw error;
   return data ?? [];
@@ -137,6 +116,7 @@ export async function fetchRecentVideos(
   const { data, error } = await getSupabase()
     .from("video_metadata")
     .select("video_id, title, published_at, duration_seconds, thumbnail_url")
+    .eq("channel_id", CHANNEL_ID)
     .gte("published_at", cutoff.toISOString())
     .order("published_at", { ascending: false });
 
@@ -150,12 +130,10 @@ export async function fetchVideoSnapshotsMulti(
 ): Promise<VideoSnapshotRow[]> {
   const cutoff = new Date();
   cutoff.setDate(cutoff.getDate() - days);
-  const { data, error } = await getSupabase()
-    .from("video_snapshots")
-    .select("video_id, view_count, like_count, comment_count, collected_date")
-    .in("video_id", videoIds)
-    .gte("collected_date", cutoff.toISOString().slice(0, 10))
-    .order("collected_date", { ascending: true });
+  const { data, error } = await getSupabase().rpc("video_snapshots_filled", {
+    p_video_ids: videoIds,
+    p_start: cutoff.toISOString().slice(0, 10),
+  });
 
   if (error) throw error;
   return data ?? [];
@@ -165,6 +143,7 @@ export async function fetchAllVideoMetadata(): Promise<VideoMeta[]> {
   const { data, error } = await getSupabase()
     .from("video_metadata")
     .select("video_id, title, published_at, duration_seconds, thumbnail_url")
+    .eq("channel_id", CHANNEL_ID)
     .order("published_at", { ascending: true });
 
   if (error) throw error;
@@ -178,43 +157,14 @@ export type VideoWithStats = VideoMeta & {
 };
 
 export async function fetchAllVideoStats(): Promise<VideoWithStats[]> {
-  const supabase = getSupabase();
-
-  // 1. 最新の取得日を特定
-  const { data: latestDateRow } = await supabase
-    .from("video_snapshots")
-    .select("collected_date")
-    .order("collected_date", { ascending: false })
-    .limit(1)
-    .single();
-
-  if (!latestDateRow) return [];
-  const latestDate = latestDateRow.collected_date;
-
-  // 2. その日の全統計を取得
-  const { data: snapshots } = await supabase
-    .from("video_snapshots")
-    .select("video_id, view_count, like_count, comment_count")
-    .eq("collected_date", latestDate);
-
-  if (!snapshots) return [];
+  // 収集時に更新される video_latest_stats（最新統計 + メタデータ）を1クエリで取得
+  const { data, error } = await getSupabase()
+    .from("video_latest_stats")
+    .select(
+      "video_id, title, published_at, duration_seconds, thumbnail_url, view_count, like_count, comment_count"
+    )
+    .eq("channel_id", CHANNEL_ID);
 
-  // 3. 全メタデータを取得
-  const { data: metas } = await supabase
-    .from("video_metadata")
-    .select("video_id, title, published_at, duration_seconds, thumbnail_url");
-
-  if (!metas) return [];
-
-  // 4. マージ
-  const snapMap = new Map(snapshots.map(s => [s.video_id, s]));
-  return metas.map(m => {
-    const s = snapMap.get(m.video_id);
-    return {
-      ...m,
-      view_count: s?.view_count ?? 0,
-      like_count: s?.like_count ?? 0,
-      comment_count: s?.comment_count ?? 0,
-    };
-  });
+  if (error || !data) return [];
+  return data;
 }
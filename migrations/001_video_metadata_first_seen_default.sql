@@ -0,0 +1,8 @@
+-- video_metadata.first_seen_at に列デフォルトを設定する
+--
+-- insert_video_metadata_batch は first_seen_at を送らずに複数行 upsert する。
+-- 新規行はこのデフォルトで初回登録時刻が入り、既存行は ON CONFLICT の更新対象に
+-- first_seen_at が含まれないため元の値が保持される（事前の SELECT が不要になる）。
+ALTER TABLE video_metadata
+    ALTER COLUMN first_seen_at
+    SET DEFAULT to_char(now() AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US');
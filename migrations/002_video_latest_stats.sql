@@ -0,0 +1,90 @@
+-- 動画ごとの最新統計と増分のロールアップ（ダッシュボードの一覧・ランキング用）
+--
+-- 日次収集の最後に、その実行で書き込んだ動画IDだけを refresh_video_latest_stats() に渡して更新する。
+-- 増分は「最新日の k 日前以前で最も新しいスナップショット」との差（欠測日があっても算出できる）。
+CREATE TABLE IF NOT EXISTS video_latest_stats (
+    video_id TEXT PRIMARY KEY REFERENCES video_metadata(video_id),
+    title TEXT,
+    published_at TEXT,
+    duration_seconds INTEGER,
+    thumbnail_url TEXT,
+    collected_date TEXT NOT NULL,
+    view_count BIGINT,
+    like_count BIGINT,
+    comment_count BIGINT,
+    view_delta_1d BIGINT,
+    view_delta_7d BIGINT,
+    view_delta_30d BIGINT,
+    updated_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_video_latest_stats_views ON video_latest_stats(view_count DESC);
+CREATE INDEX IF NOT EXISTS idx_video_latest_stats_published ON video_latest_stats(published_at);
+
+ALTER TABLE video_latest_stats ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Allow public read" ON video_latest_stats FOR SELECT USING (true);
+
+CREATE OR REPLACE FUNCTION refresh_video_latest_stats(p_video_ids TEXT[])
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH latest AS (
+        SELECT DISTINCT ON (s.video_id)
+            s.video_id, s.collected_date, s.view_count, s.like_count, s.comment_count
+        FROM video_snapshots s
+        WHERE s.video_id = ANY(p_video_ids)
+        ORDER BY s.video_id, s.collected_date DESC
+    ),
+    upserted AS (
+        INSERT INTO video_latest_stats AS t (
+            video_id, title, published_at, duration_seconds, thumbnail_url,
+            collected_date, view_count, like_count, comment_count,
+            view_delta_1d, view_delta_7d, view_delta_30d, updated_at
+        )
+        SELECT
+            l.video_id, m.title, m.published_at, m.duration_seconds, m.thumbnail_url,
+            l.collected_date, l.view_count, l.like_count, l.comment_count,
+            l.view_count - p1.view_count,
+            l.view_count - p7.view_count,
+            l.view_count - p30.view_count,
+            to_char(now() AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US')
+        FROM latest l
+        JOIN video_metadata m ON m.video_id = l.video_id
+        LEFT JOIN LATERAL (
+            SELECT p.view_count FROM video_snapshots p
+            WHERE p.video_id = l.video_id
+              AND p.collected_date <= to_char(l.collected_date::date - 1, 'YYYY-MM-DD')
+            ORDER BY p.collected_date DESC LIMIT 1
+        ) p1 ON true
+        LEFT JOIN LATERAL (
+            SELECT p.view_count FROM video_snapshots p
+            WHERE p.video_id = l.video_id
+              AND p.collected_date <= to_char(l.collected_date::date - 7, 'YYYY-MM-DD')
+            ORDER BY p.collected_date DESC LIMIT 1
+        ) p7 ON true
+        LEFT JOIN LATERAL (
+            SELECT p.view_count FROM video_snapshots p
+            WHERE p.video_id = l.video_id
+              AND p.collected_date <= to_char(l.collected_date::date - 30, 'YYYY-MM-DD')
+            ORDER BY p.collected_date DESC LIMIT 1
+        ) p30 ON true
+        ON CONFLICT (video_id) DO UPDATE SET
+            title = EXCLUDED.title,
+            published_at = EXCLUDED.published_at,
+            duration_seconds = EXCLUDED.duration_seconds,
+            thumbnail_url = EXCLUDED.thumbnail_url,
+            collected_date = EXCLUDED.collected_date,
+            view_count = EXCLUDED.view_count,
+            like_count = EXCLUDED.like_count,
+            comment_count = EXCLUDED.comment_count,
+            view_delta_1d = EXCLUDED.view_delta_1d,
+            view_delta_7d = EXCLUDED.view_delta_7d,
+            view_delta_30d = EXCLUDED.view_delta_30d,
+            updated_at = EXCLUDED.updated_at
+        RETURNING 1
+    )
+    SELECT count(*)::INTEGER FROM upserted;
+$$;
+
+-- 既存データからの初回構築
+SELECT refresh_video_latest_stats(ARRAY(SELECT video_id FROM video_metadata));
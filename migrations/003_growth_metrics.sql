@@ -0,0 +1,31 @@
+-- src/analytics.py（scripts/compute_growth.py）が算出する成長指標の派生テーブル
+
+-- 動画×日付ごとの成長指標
+CREATE TABLE IF NOT EXISTS video_growth_metrics (
+    video_id TEXT NOT NULL REFERENCES video_metadata(video_id),
+    collected_date TEXT NOT NULL,
+    days_since_publish INTEGER,
+    view_count BIGINT,
+    daily_view_delta DOUBLE PRECISION,
+    view_growth_rate DOUBLE PRECISION,
+    PRIMARY KEY (video_id, collected_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_video_growth_metrics_dsp ON video_growth_metrics(days_since_publish);
+
+-- 公開からの経過日数ごとの累計再生数パーセンタイル帯（全動画）
+CREATE TABLE IF NOT EXISTS growth_percentile_bands (
+    days_since_publish INTEGER PRIMARY KEY,
+    video_count INTEGER,
+    p10 DOUBLE PRECISION,
+    p25 DOUBLE PRECISION,
+    p50 DOUBLE PRECISION,
+    p75 DOUBLE PRECISION,
+    p90 DOUBLE PRECISION,
+    updated_at TEXT NOT NULL
+);
+
+ALTER TABLE video_growth_metrics ENABLE ROW LEVEL SECURITY;
+ALTER TABLE growth_percentile_bands ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Allow public read" ON video_growth_metrics FOR SELECT USING (true);
+CREATE POLICY "Allow public read" ON growth_percentile_bands FOR SELECT USING (true);
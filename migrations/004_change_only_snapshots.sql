@@ -0,0 +1,157 @@
+-- video_snapshots を「変化した日とキーフレームだけ」の保存に切り替えるためのマイグレーション
+--
+-- SNAPSHOT_STORAGE = "changes" のとき、日次収集は前回保存した値から変化した動画と、
+-- 前回の保存から SNAPSHOT_KEYFRAME_DAYS 日以上経った動画だけを video_snapshots に書く。
+-- 欠けた日の値は直前の行と同じなので、日付 D の値は「D 以前で最も新しい行」で復元できる。
+--
+-- このマイグレーションは関数を作るだけで、既存の行は削除しない。既存履歴を圧縮する場合は
+-- SNAPSHOT_STORAGE = "changes" に切り替えた後で、python scripts/compact_snapshots.py
+-- （または SQL Editor で SELECT compact_video_snapshots(7);）を手動で実行する。
+
+-- 1. 値を確認した日（変化が無く行を書かなかった日も含む）
+ALTER TABLE video_latest_stats ADD COLUMN IF NOT EXISTS checked_date TEXT;
+UPDATE video_latest_stats SET checked_date = collected_date WHERE checked_date IS NULL;
+
+-- 2. 増分を p_as_of（その日に値を確認した日付）基準で計算できるようにする
+--    p_as_of を省略すると従来どおり最新スナップショットの日付が基準
+DROP FUNCTION IF EXISTS refresh_video_latest_stats(TEXT[]);
+
+CREATE OR REPLACE FUNCTION refresh_video_latest_stats(p_video_ids TEXT[], p_as_of TEXT DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH latest AS (
+        SELECT DISTINCT ON (s.video_id)
+            s.video_id, s.collected_date, s.view_count, s.like_count, s.comment_count,
+            greatest(s.collected_date, coalesce(p_as_of, s.collected_date)) AS checked_date
+        FROM video_snapshots s
+        WHERE s.video_id = ANY(p_video_ids)
+        ORDER BY s.video_id, s.collected_date DESC
+    ),
+    upserted AS (
+        INSERT INTO video_latest_stats AS t (
+            video_id, title, published_at, duration_seconds, thumbnail_url,
+            collected_date, checked_date, view_count, like_count, comment_count,
+            view_delta_1d, view_delta_7d, view_delta_30d, updated_at
+        )
+        SELECT
+            l.video_id, m.title, m.published_at, m.duration_seconds, m.thumbnail_url,
+            l.collected_date, l.checked_date, l.view_count, l.like_count, l.comment_count,
+            l.view_count - p1.view_count,
+            l.view_count - p7.view_count,
+            l.view_count - p30.view_count,
+            to_char(now() AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US')
+        FROM latest l
+        JOIN video_metadata m ON m.video_id = l.video_id
+        LEFT JOIN LATERAL (
+            SELECT p.view_count FROM video_snapshots p
+            WHERE p.video_id = l.video_id
+              AND p.collected_date <= to_char(l.checked_date::date - 1, 'YYYY-MM-DD')
+            ORDER BY p.collected_date DESC LIMIT 1
+        ) p1 ON true
+        LEFT JOIN LATERAL (
+            SELECT p.view_count FROM video_snapshots p
+            WHERE p.video_id = l.video_id
+              AND p.collected_date <= to_char(l.checked_date::date - 7, 'YYYY-MM-DD')
+            ORDER BY p.collected_date DESC LIMIT 1
+        ) p7 ON true
+        LEFT JOIN LATERAL (
+            SELECT p.view_count FROM video_snapshots p
+            WHERE p.video_id = l.video_id
+              AND p.collected_date <= to_char(l.checked_date::date - 30, 'YYYY-MM-DD')
+            ORDER BY p.collected_date DESC LIMIT 1
+        ) p30 ON true
+        ON CONFLICT (video_id) DO UPDATE SET
+            title = EXCLUDED.title,
+            published_at = EXCLUDED.published_at,
+            duration_seconds = EXCLUDED.duration_seconds,
+            thumbnail_url = EXCLUDED.thumbnail_url,
+            collected_date = EXCLUDED.collected_date,
+            checked_date = EXCLUDED.checked_date,
+            view_count = EXCLUDED.view_count,
+            like_count = EXCLUDED.like_count,
+            comment_count = EXCLUDED.comment_count,
+            view_delta_1d = EXCLUDED.view_delta_1d,
+            view_delta_7d = EXCLUDED.view_delta_7d,
+            view_delta_30d = EXCLUDED.view_delta_30d,
+            updated_at = EXCLUDED.updated_at
+        RETURNING 1
+    )
+    SELECT count(*)::INTEGER FROM upserted;
+$$;
+
+-- 3. 日付ごとの値の復元（ダッシュボードの推移グラフ用）
+--    p_start〜p_end の各日について、その日以前で最も新しいスナップショットの値を返す。
+--    p_video_ids が NULL なら全動画、p_end が NULL なら最新の収集日まで。
+CREATE OR REPLACE FUNCTION video_snapshots_filled(
+    p_video_ids TEXT[], p_start TEXT, p_end TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    video_id TEXT, collected_date TEXT, view_count INTEGER, like_count INTEGER, comment_count INTEGER
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT v.video_id, to_char(d.day, 'YYYY-MM-DD'), s.view_count, s.like_count, s.comment_count
+    FROM unnest(coalesce(p_video_ids, ARRAY(SELECT m.video_id FROM video_metadata m))) AS v(video_id)
+    CROSS JOIN generate_series(
+        p_start::date,
+        coalesce(p_end, (SELECT max(x.collected_date) FROM video_snapshots x))::date,
+        interval '1 day'
+    ) AS d(day)
+    JOIN LATERAL (
+        SELECT p.view_count, p.like_count, p.comment_count FROM video_snapshots p
+        WHERE p.video_id = v.video_id AND p.collected_date <= to_char(d.day, 'YYYY-MM-DD')
+        ORDER BY p.collected_date DESC LIMIT 1
+    ) s ON true
+    ORDER BY 2, 1;
+$$;
+
+-- 4. 既存履歴の圧縮: 直前に残した行と値が同じで、キーフレーム間隔内の行を削除する
+--    削除後の領域は VACUUM (FULL) video_snapshots; を別途実行すると OS に返される。
+CREATE OR REPLACE FUNCTION compact_video_snapshots(p_keyframe_days INTEGER DEFAULT 7)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    r RECORD;
+    kept_video TEXT;
+    kept_date DATE;
+    kept_counts INTEGER[];
+    rows_before BIGINT;
+    bytes_before BIGINT;
+    deleted BIGINT;
+BEGIN
+    SELECT count(*) INTO rows_before FROM video_snapshots;
+    bytes_before := pg_total_relation_size('video_snapshots');
+
+    CREATE TEMP TABLE _compact_drop (id BIGINT PRIMARY KEY) ON COMMIT DROP;
+    FOR r IN
+        SELECT id, video_id, collected_date, view_count, like_count, comment_count
+        FROM video_snapshots
+        ORDER BY video_id, collected_date
+    LOOP
+        IF r.video_id = kept_video
+           AND ARRAY[r.view_count, r.like_count, r.comment_count] IS NOT DISTINCT FROM kept_counts
+           AND r.collected_date::date - kept_date < p_keyframe_days
+        THEN
+            INSERT INTO _compact_drop VALUES (r.id);
+        ELSE
+            kept_video := r.video_id;
+            kept_date := r.collected_date::date;
+            kept_counts := ARRAY[r.view_count, r.like_count, r.comment_count];
+        END IF;
+    END LOOP;
+
+    DELETE FROM video_snapshots s USING _compact_drop d WHERE s.id = d.id;
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+
+    RETURN json_build_object(
+        'rows_before', rows_before,
+        'rows_deleted', deleted,
+        'rows_after', rows_before - deleted,
+        'bytes_before', bytes_before,
+        'estimated_bytes_saved', CASE WHEN rows_before > 0 THEN bytes_before * deleted / rows_before ELSE 0 END
+    );
+END;
+$$;
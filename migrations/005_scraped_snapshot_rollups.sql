@@ -0,0 +1,137 @@
+-- scraped_snapshots の階層ダウンサンプリングと保持期間
+--
+-- 生データは直近 SCRAPE_RAW_RETENTION_DAYS 日分だけ残し、それより古い行は1時間ごとの集計に、
+-- SCRAPE_HOURLY_RETENTION_DAYS 日より古い時間集計は1日ごとの集計にまとめる。
+-- 集計は各区間の最小・最大・最後の値を持つ（scripts/compact_snapshots.py --table scraped_snapshots）。
+
+-- 1. 集計テーブル（resolution = 'hour' | 'day'、bucket_start は区間の開始時刻 UTC）
+CREATE TABLE IF NOT EXISTS scraped_snapshot_rollups (
+    video_id TEXT NOT NULL REFERENCES video_metadata(video_id),
+    resolution TEXT NOT NULL,
+    bucket_start TEXT NOT NULL,
+    sample_count INTEGER NOT NULL,
+    view_min INTEGER,
+    view_max INTEGER,
+    view_last INTEGER,
+    like_min INTEGER,
+    like_max INTEGER,
+    like_last INTEGER,
+    last_collected_at TEXT NOT NULL,
+    PRIMARY KEY (video_id, resolution, bucket_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_scraped_snapshot_rollups_bucket ON scraped_snapshot_rollups(resolution, bucket_start);
+
+ALTER TABLE scraped_snapshot_rollups ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Allow public read" ON scraped_snapshot_rollups FOR SELECT USING (true);
+
+-- 2. 時刻のインデックス（動画ごとの時系列と、圧縮対象の範囲走査用）
+CREATE INDEX IF NOT EXISTS idx_scraped_snapshots_video_time ON scraped_snapshots(video_id, collected_at);
+CREATE INDEX IF NOT EXISTS idx_scraped_snapshots_collected_at ON scraped_snapshots(collected_at);
+-- (video_id, collected_at) の先頭列で代替できる
+DROP INDEX IF EXISTS idx_scraped_snapshots_video;
+
+-- 3. 生データ・時間集計・日集計を1本の時系列として読むビュー（生データは min = max = last）
+CREATE OR REPLACE VIEW scraped_snapshots_tiered AS
+    SELECT video_id, 'raw' AS resolution, collected_at AS bucket_start, 1 AS sample_count,
+           view_count AS view_min, view_count AS view_max, view_count AS view_last,
+           like_count AS like_min, like_count AS like_max, like_count AS like_last,
+           collected_at AS last_collected_at
+    FROM scraped_snapshots
+    UNION ALL
+    SELECT video_id, resolution, bucket_start, sample_count,
+           view_min, view_max, view_last, like_min, like_max, like_last, last_collected_at
+    FROM scraped_snapshot_rollups;
+
+-- 4. 圧縮: collected_at < p_raw_before の生データを時間集計へ、
+--    bucket_start < p_hourly_before の時間集計を日集計へ移す（既存の集計行とは min/max/last でマージ）
+CREATE OR REPLACE FUNCTION compact_scraped_snapshots(p_raw_before TEXT, p_hourly_before TEXT)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    raw_compacted BIGINT;
+    hourly_written BIGINT;
+    hourly_compacted BIGINT;
+    daily_written BIGINT;
+BEGIN
+    WITH moved AS (
+        DELETE FROM scraped_snapshots WHERE collected_at < p_raw_before
+        RETURNING id, video_id, view_count, like_count, collected_at
+    ),
+    upserted AS (
+        INSERT INTO scraped_snapshot_rollups AS t (
+            video_id, resolution, bucket_start, sample_count,
+            view_min, view_max, view_last, like_min, like_max, like_last, last_collected_at
+        )
+        SELECT
+            m.video_id, 'hour', left(m.collected_at, 13) || ':00:00', count(*),
+            min(m.view_count), max(m.view_count),
+            (array_agg(m.view_count ORDER BY m.collected_at DESC, m.id DESC))[1],
+            min(m.like_count), max(m.like_count),
+            (array_agg(m.like_count ORDER BY m.collected_at DESC, m.id DESC))[1],
+            max(m.collected_at)
+        FROM moved m
+        GROUP BY m.video_id, left(m.collected_at, 13)
+        ON CONFLICT (video_id, resolution, bucket_start) DO UPDATE SET
+            sample_count = t.sample_count + EXCLUDED.sample_count,
+            view_min = least(t.view_min, EXCLUDED.view_min),
+            view_max = greatest(t.view_max, EXCLUDED.view_max),
+            view_last = CASE WHEN EXCLUDED.last_collected_at >= t.last_collected_at
+                             THEN EXCLUDED.view_last ELSE t.view_last END,
+            like_min = least(t.like_min, EXCLUDED.like_min),
+            like_max = greatest(t.like_max, EXCLUDED.like_max),
+            like_last = CASE WHEN EXCLUDED.last_collected_at >= t.last_collected_at
+                             THEN EXCLUDED.like_last ELSE t.like_last END,
+            last_collected_at = greatest(t.last_collected_at, EXCLUDED.last_collected_at)
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM moved), (SELECT count(*) FROM upserted)
+    INTO raw_compacted, hourly_written;
+
+    WITH moved AS (
+        DELETE FROM scraped_snapshot_rollups
+        WHERE resolution = 'hour' AND bucket_start < p_hourly_before
+        RETURNING *
+    ),
+    upserted AS (
+        INSERT INTO scraped_snapshot_rollups AS t (
+            video_id, resolution, bucket_start, sample_count,
+            view_min, view_max, view_last, like_min, like_max, like_last, last_collected_at
+        )
+        SELECT
+            m.video_id, 'day', left(m.bucket_start, 10) || 'T00:00:00', sum(m.sample_count),
+            min(m.view_min), max(m.view_max),
+            (array_agg(m.view_last ORDER BY m.last_collected_at DESC))[1],
+            min(m.like_min), max(m.like_max),
+            (array_agg(m.like_last ORDER BY m.last_collected_at DESC))[1],
+            max(m.last_collected_at)
+        FROM moved m
+        GROUP BY m.video_id, left(m.bucket_start, 10)
+        ON CONFLICT (video_id, resolution, bucket_start) DO UPDATE SET
+            sample_count = t.sample_count + EXCLUDED.sample_count,
+            view_min = least(t.view_min, EXCLUDED.view_min),
+            view_max = greatest(t.view_max, EXCLUDED.view_max),
+            view_last = CASE WHEN EXCLUDED.last_collected_at >= t.last_collected_at
+                             THEN EXCLUDED.view_last ELSE t.view_last END,
+            like_min = least(t.like_min, EXCLUDED.like_min),
+            like_max = greatest(t.like_max, EXCLUDED.like_max),
+            like_last = CASE WHEN EXCLUDED.last_collected_at >= t.last_collected_at
+                             THEN EXCLUDED.like_last ELSE t.like_last END,
+            last_collected_at = greatest(t.last_collected_at, EXCLUDED.last_collected_at)
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM moved), (SELECT count(*) FROM upserted)
+    INTO hourly_compacted, daily_written;
+
+    RETURN json_build_object(
+        'raw_compacted', raw_compacted,
+        'hourly_written', hourly_written,
+        'hourly_compacted', hourly_compacted,
+        'daily_written', daily_written,
+        'raw_rows', (SELECT count(*) FROM scraped_snapshots),
+        'hourly_rows', (SELECT count(*) FROM scraped_snapshot_rollups WHERE resolution = 'hour'),
+        'daily_rows', (SELECT count(*) FROM scraped_snapshot_rollups WHERE resolution = 'day')
+    );
+END;
+$$;
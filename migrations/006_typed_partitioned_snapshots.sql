@@ -0,0 +1,394 @@
+-- 日付・時刻を DATE / TIMESTAMPTZ、カウントを BIGINT に変換し、video_snapshots を月単位で範囲パーティション化する
+--
+-- TEXT の日付は文字列比較になり、INTEGER の再生数は 2^31 を超える動画で溢れる。
+-- 既存の TEXT 値は UTC の ISO 8601 として変換する（収集側は datetime.utcnow().isoformat() で書いていたため）。
+-- video_snapshots は新しいパーティションテーブルに行を移し替えるため、1トランザクションで実行する。
+-- 適用後は src/db.py が書き込み前に月パーティションを ensure_video_snapshot_partitions() で用意する。
+
+BEGIN;
+SET LOCAL TIME ZONE 'UTC';
+
+-- 1. 列の型に依存するビュー・関数を外す（後で型付きで作り直す）
+DROP VIEW IF EXISTS scraped_snapshots_tiered;
+DROP FUNCTION IF EXISTS refresh_video_latest_stats(TEXT[], TEXT);
+DROP FUNCTION IF EXISTS video_snapshots_filled(TEXT[], TEXT, TEXT);
+DROP FUNCTION IF EXISTS compact_scraped_snapshots(TEXT, TEXT);
+
+-- 2. 型の変換
+ALTER TABLE channel_snapshots
+    ALTER COLUMN subscriber_count TYPE BIGINT,
+    ALTER COLUMN total_view_count TYPE BIGINT,
+    ALTER COLUMN video_count TYPE BIGINT,
+    ALTER COLUMN collected_date TYPE DATE USING collected_date::date,
+    ALTER COLUMN collected_at TYPE TIMESTAMPTZ USING collected_at::timestamptz;
+
+ALTER TABLE channel_metadata
+    ALTER COLUMN updated_at TYPE TIMESTAMPTZ USING updated_at::timestamptz;
+
+ALTER TABLE video_metadata ALTER COLUMN first_seen_at DROP DEFAULT;
+ALTER TABLE video_metadata
+    ALTER COLUMN published_at TYPE TIMESTAMPTZ USING nullif(published_at, '')::timestamptz,
+    ALTER COLUMN first_seen_at TYPE TIMESTAMPTZ USING nullif(first_seen_at, '')::timestamptz,
+    ALTER COLUMN updated_at TYPE TIMESTAMPTZ USING nullif(updated_at, '')::timestamptz;
+ALTER TABLE video_metadata ALTER COLUMN first_seen_at SET DEFAULT now();
+
+ALTER TABLE scraped_snapshots
+    ALTER COLUMN view_count TYPE BIGINT,
+    ALTER COLUMN like_count TYPE BIGINT,
+    ALTER COLUMN collected_at TYPE TIMESTAMPTZ USING collected_at::timestamptz;
+
+ALTER TABLE scraped_snapshot_rollups
+    ALTER COLUMN view_min TYPE BIGINT,
+    ALTER COLUMN view_max TYPE BIGINT,
+    ALTER COLUMN view_last TYPE BIGINT,
+    ALTER COLUMN like_min TYPE BIGINT,
+    ALTER COLUMN like_max TYPE BIGINT,
+    ALTER COLUMN like_last TYPE BIGINT,
+    ALTER COLUMN bucket_start TYPE TIMESTAMPTZ USING bucket_start::timestamptz,
+    ALTER COLUMN last_collected_at TYPE TIMESTAMPTZ USING last_collected_at::timestamptz;
+
+ALTER TABLE video_latest_stats
+    ALTER COLUMN published_at TYPE TIMESTAMPTZ USING nullif(published_at, '')::timestamptz,
+    ALTER COLUMN collected_date TYPE DATE USING collected_date::date,
+    ALTER COLUMN checked_date TYPE DATE USING checked_date::date,
+    ALTER COLUMN updated_at TYPE TIMESTAMPTZ USING updated_at::timestamptz;
+
+ALTER TABLE video_growth_metrics
+    ALTER COLUMN collected_date TYPE DATE USING collected_date::date;
+
+ALTER TABLE growth_percentile_bands
+    ALTER COLUMN updated_at TYPE TIMESTAMPTZ USING updated_at::timestamptz;
+
+-- 3. video_snapshots を月単位の範囲パーティションに移し替える
+--    一意キー (video_id, collected_date) に分割キーが含まれるため、代理キー id は廃止して主キーにする
+ALTER TABLE video_snapshots RENAME TO video_snapshots_unpartitioned;
+ALTER TABLE video_snapshots_unpartitioned
+    DROP CONSTRAINT IF EXISTS video_snapshots_pkey,
+    DROP CONSTRAINT IF EXISTS video_snapshots_video_id_collected_date_key;
+DROP INDEX IF EXISTS idx_video_snapshots_date;
+DROP INDEX IF EXISTS idx_video_snapshots_video;
+
+CREATE TABLE video_snapshots (
+    video_id TEXT NOT NULL REFERENCES video_metadata(video_id),
+    view_count BIGINT,
+    like_count BIGINT,
+    comment_count BIGINT,
+    collected_date DATE NOT NULL,
+    collected_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (video_id, collected_date)
+) PARTITION BY RANGE (collected_date);
+
+-- 月パーティションが無い日付の受け皿（通常は空のまま）
+CREATE TABLE video_snapshots_default PARTITION OF video_snapshots DEFAULT;
+ALTER TABLE video_snapshots_default ENABLE ROW LEVEL SECURITY;
+
+-- p_from の月から、今月の p_months_ahead か月先までの月パーティションを作成し、作成数を返す
+-- パーティションは RLS を有効にしてポリシーを付けない（読み取りは親テーブル経由だけにする）。
+-- 既に受け皿に入っている同じ月の行は、新しいパーティションへ移す（残っているとパーティションを作成できない）
+-- 収集スクリプト（service_role）が RPC で呼ぶ。テーブルを作るため所有者権限で実行し、service_role 以外からは呼べなくする
+CREATE OR REPLACE FUNCTION ensure_video_snapshot_partitions(p_from DATE DEFAULT NULL, p_months_ahead INTEGER DEFAULT 2)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    month_start DATE := date_trunc('month', coalesce(p_from, current_date))::date;
+    last_month DATE := (date_trunc('month', current_date) + make_interval(months => p_months_ahead))::date;
+    month_end DATE;
+    part_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        part_name := 'video_snapshots_' || to_char(month_start, 'YYYY_MM');
+        month_end := (month_start + interval '1 month')::date;
+        IF to_regclass(part_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TEMP TABLE _partition_rows ON COMMIT DROP AS '
+                'SELECT * FROM video_snapshots_default WHERE collected_date >= %L AND collected_date < %L',
+                month_start, month_end
+            );
+            DELETE FROM video_snapshots_default
+            WHERE collected_date >= month_start AND collected_date < month_end;
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF video_snapshots FOR VALUES FROM (%L) TO (%L)',
+                part_name, month_start, month_end
+            );
+            EXECUTE format('ALTER TABLE %I ENABLE ROW LEVEL SECURITY', part_name);
+            INSERT INTO video_snapshots SELECT * FROM _partition_rows;
+            DROP TABLE _partition_rows;
+            created := created + 1;
+        END IF;
+        month_start := month_end;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION ensure_video_snapshot_partitions(DATE, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION ensure_video_snapshot_partitions(DATE, INTEGER) TO service_role;
+
+SELECT ensure_video_snapshot_partitions((SELECT min(collected_date)::date FROM video_snapshots_unpartitioned));
+
+INSERT INTO video_snapshots (video_id, view_count, like_count, comment_count, collected_date, collected_at)
+SELECT video_id, view_count, like_count, comment_count, collected_date::date, collected_at::timestamptz
+FROM video_snapshots_unpartitioned;
+
+DROP TABLE video_snapshots_unpartitioned;
+
+ALTER TABLE video_snapshots ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Allow public read" ON video_snapshots FOR SELECT USING (true);
+
+-- 4. アクセスパターンに合わせたインデックス
+--    動画ごとの時系列（増分・補完・推移グラフ）は主キー (video_id, collected_date) で引く。
+--    全動画を日付順に読む iter_video_snapshots のキーセットページング用
+CREATE INDEX IF NOT EXISTS idx_video_snapshots_date_video ON video_snapshots(collected_date, video_id);
+--    iter_video_ids のキーセットページング（公開日の新しい順）とダッシュボードの新着一覧用
+CREATE INDEX IF NOT EXISTS idx_video_metadata_published_video ON video_metadata(published_at DESC, video_id DESC);
+--    scraped_snapshots は追記順と collected_at がほぼ一致するため、範囲走査（圧縮）は BRIN で足りる
+DROP INDEX IF EXISTS idx_scraped_snapshots_collected_at;
+CREATE INDEX IF NOT EXISTS idx_scraped_snapshots_collected_at_brin ON scraped_snapshots USING brin (collected_at);
+--    チャンネルの推移は (channel_id, collected_date) の一意制約で引けるが、日付範囲だけの絞り込みは BRIN
+DROP INDEX IF EXISTS idx_channel_snapshots_date;
+CREATE INDEX IF NOT EXISTS idx_channel_snapshots_date_brin ON channel_snapshots USING brin (collected_date);
+
+-- 5. 関数・ビューを型付きで作り直す
+CREATE OR REPLACE FUNCTION refresh_video_latest_stats(p_video_ids TEXT[], p_as_of DATE DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH latest AS (
+        SELECT DISTINCT ON (s.video_id)
+            s.video_id, s.collected_date, s.view_count, s.like_count, s.comment_count,
+            greatest(s.collected_date, coalesce(p_as_of, s.collected_date)) AS checked_date
+        FROM video_snapshots s
+        WHERE s.video_id = ANY(p_video_ids)
+        ORDER BY s.video_id, s.collected_date DESC
+    ),
+    upserted AS (
+        INSERT INTO video_latest_stats AS t (
+            video_id, title, published_at, duration_seconds, thumbnail_url,
+            collected_date, checked_date, view_count, like_count, comment_count,
+            view_delta_1d, view_delta_7d, view_delta_30d, updated_at
+        )
+        SELECT
+            l.video_id, m.title, m.published_at, m.duration_seconds, m.thumbnail_url,
+            l.collected_date, l.checked_date, l.view_count, l.like_count, l.comment_count,
+            l.view_count - p1.view_count,
+            l.view_count - p7.view_count,
+            l.view_count - p30.view_count,
+            now()
+        FROM latest l
+        JOIN video_metadata m ON m.video_id = l.video_id
+        LEFT JOIN LATERAL (
+            SELECT p.view_count FROM video_snapshots p
+            WHERE p.video_id = l.video_id AND p.collected_date <= l.checked_date - 1
+            ORDER BY p.collected_date DESC LIMIT 1
+        ) p1 ON true
+        LEFT JOIN LATERAL (
+            SELECT p.view_count FROM video_snapshots p
+            WHERE p.video_id = l.video_id AND p.collected_date <= l.checked_date - 7
+            ORDER BY p.collected_date DESC LIMIT 1
+        ) p7 ON true
+        LEFT JOIN LATERAL (
+            SELECT p.view_count FROM video_snapshots p
+            WHERE p.video_id = l.video_id AND p.collected_date <= l.checked_date - 30
+            ORDER BY p.collected_date DESC LIMIT 1
+        ) p30 ON true
+        ON CONFLICT (video_id) DO UPDATE SET
+            title = EXCLUDED.title,
+            published_at = EXCLUDED.published_at,
+            duration_seconds = EXCLUDED.duration_seconds,
+            thumbnail_url = EXCLUDED.thumbnail_url,
+            collected_date = EXCLUDED.collected_date,
+            checked_date = EXCLUDED.checked_date,
+            view_count = EXCLUDED.view_count,
+            like_count = EXCLUDED.like_count,
+            comment_count = EXCLUDED.comment_count,
+            view_delta_1d = EXCLUDED.view_delta_1d,
+            view_delta_7d = EXCLUDED.view_delta_7d,
+            view_delta_30d = EXCLUDED.view_delta_30d,
+            updated_at = EXCLUDED.updated_at
+        RETURNING 1
+    )
+    SELECT count(*)::INTEGER FROM upserted;
+$$;
+
+CREATE OR REPLACE FUNCTION video_snapshots_filled(
+    p_video_ids TEXT[], p_start DATE, p_end DATE DEFAULT NULL
+)
+RETURNS TABLE (
+    video_id TEXT, collected_date DATE, view_count BIGINT, like_count BIGINT, comment_count BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT v.video_id, d.day::date, s.view_count, s.like_count, s.comment_count
+    FROM unnest(coalesce(p_video_ids, ARRAY(SELECT m.video_id FROM video_metadata m))) AS v(video_id)
+    CROSS JOIN generate_series(
+        p_start,
+        coalesce(p_end, (SELECT max(x.collected_date) FROM video_snapshots x)),
+        interval '1 day'
+    ) AS d(day)
+    JOIN LATERAL (
+        SELECT p.view_count, p.like_count, p.comment_count FROM video_snapshots p
+        WHERE p.video_id = v.video_id AND p.collected_date <= d.day::date
+        ORDER BY p.collected_date DESC LIMIT 1
+    ) s ON true
+    ORDER BY 2, 1;
+$$;
+
+CREATE OR REPLACE FUNCTION compact_video_snapshots(p_keyframe_days INTEGER DEFAULT 7)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    r RECORD;
+    kept_video TEXT;
+    kept_date DATE;
+    kept_counts BIGINT[];
+    rows_before BIGINT;
+    bytes_before BIGINT;
+    deleted BIGINT;
+BEGIN
+    SELECT count(*) INTO rows_before FROM video_snapshots;
+    -- パーティションテーブル自体は空なので各パーティションの合計
+    SELECT coalesce(sum(pg_total_relation_size(relid)), 0) INTO bytes_before
+    FROM pg_partition_tree('video_snapshots');
+
+    CREATE TEMP TABLE _compact_drop (video_id TEXT, collected_date DATE, PRIMARY KEY (video_id, collected_date))
+        ON COMMIT DROP;
+    FOR r IN
+        SELECT video_id, collected_date, view_count, like_count, comment_count
+        FROM video_snapshots
+        ORDER BY video_id, collected_date
+    LOOP
+        IF r.video_id = kept_video
+           AND ARRAY[r.view_count, r.like_count, r.comment_count] IS NOT DISTINCT FROM kept_counts
+           AND r.collected_date - kept_date < p_keyframe_days
+        THEN
+            INSERT INTO _compact_drop VALUES (r.video_id, r.collected_date);
+        ELSE
+            kept_video := r.video_id;
+            kept_date := r.collected_date;
+            kept_counts := ARRAY[r.view_count, r.like_count, r.comment_count];
+        END IF;
+    END LOOP;
+
+    DELETE FROM video_snapshots s USING _compact_drop d
+    WHERE s.video_id = d.video_id AND s.collected_date = d.collected_date;
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+
+    RETURN json_build_object(
+        'rows_before', rows_before,
+        'rows_deleted', deleted,
+        'rows_after', rows_before - deleted,
+        'bytes_before', bytes_before,
+        'estimated_bytes_saved', CASE WHEN rows_before > 0 THEN bytes_before * deleted / rows_before ELSE 0 END
+    );
+END;
+$$;
+
+CREATE OR REPLACE VIEW scraped_snapshots_tiered AS
+    SELECT video_id, 'raw' AS resolution, collected_at AS bucket_start, 1 AS sample_count,
+           view_count AS view_min, view_count AS view_max, view_count AS view_last,
+           like_count AS like_min, like_count AS like_max, like_count AS like_last,
+           collected_at AS last_collected_at
+    FROM scraped_snapshots
+    UNION ALL
+    SELECT video_id, resolution, bucket_start, sample_count,
+           view_min, view_max, view_last, like_min, like_max, like_last, last_collected_at
+    FROM scraped_snapshot_rollups;
+
+CREATE OR REPLACE FUNCTION compact_scraped_snapshots(p_raw_before TIMESTAMPTZ, p_hourly_before TIMESTAMPTZ)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    raw_compacted BIGINT;
+    hourly_written BIGINT;
+    hourly_compacted BIGINT;
+    daily_written BIGINT;
+BEGIN
+    WITH moved AS (
+        DELETE FROM scraped_snapshots WHERE collected_at < p_raw_before
+        RETURNING id, video_id, view_count, like_count, collected_at
+    ),
+    upserted AS (
+        INSERT INTO scraped_snapshot_rollups AS t (
+            video_id, resolution, bucket_start, sample_count,
+            view_min, view_max, view_last, like_min, like_max, like_last, last_collected_at
+        )
+        SELECT
+            m.video_id, 'hour', date_trunc('hour', m.collected_at, 'UTC'), count(*),
+            min(m.view_count), max(m.view_count),
+            (array_agg(m.view_count ORDER BY m.collected_at DESC, m.id DESC))[1],
+            min(m.like_count), max(m.like_count),
+            (array_agg(m.like_count ORDER BY m.collected_at DESC, m.id DESC))[1],
+            max(m.collected_at)
+        FROM moved m
+        GROUP BY m.video_id, date_trunc('hour', m.collected_at, 'UTC')
+        ON CONFLICT (video_id, resolution, bucket_start) DO UPDATE SET
+            sample_count = t.sample_count + EXCLUDED.sample_count,
+            view_min = least(t.view_min, EXCLUDED.view_min),
+            view_max = greatest(t.view_max, EXCLUDED.view_max),
+            view_last = CASE WHEN EXCLUDED.last_collected_at >= t.last_collected_at
+                             THEN EXCLUDED.view_last ELSE t.view_last END,
+            like_min = least(t.like_min, EXCLUDED.like_min),
+            like_max = greatest(t.like_max, EXCLUDED.like_max),
+            like_last = CASE WHEN EXCLUDED.last_collected_at >= t.last_collected_at
+                             THEN EXCLUDED.like_last ELSE t.like_last END,
+            last_collected_at = greatest(t.last_collected_at, EXCLUDED.last_collected_at)
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM moved), (SELECT count(*) FROM upserted)
+    INTO raw_compacted, hourly_written;
+
+    WITH moved AS (
+        DELETE FROM scraped_snapshot_rollups
+        WHERE resolution = 'hour' AND bucket_start < p_hourly_before
+        RETURNING *
+    ),
+    upserted AS (
+        INSERT INTO scraped_snapshot_rollups AS t (
+            video_id, resolution, bucket_start, sample_count,
+            view_min, view_max, view_last, like_min, like_max, like_last, last_collected_at
+        )
+        SELECT
+            m.video_id, 'day', date_trunc('day', m.bucket_start, 'UTC'), sum(m.sample_count),
+            min(m.view_min), max(m.view_max),
+            (array_agg(m.view_last ORDER BY m.last_collected_at DESC))[1],
+            min(m.like_min), max(m.like_max),
+            (array_agg(m.like_last ORDER BY m.last_collected_at DESC))[1],
+            max(m.last_collected_at)
+        FROM moved m
+        GROUP BY m.video_id, date_trunc('day', m.bucket_start, 'UTC')
+        ON CONFLICT (video_id, resolution, bucket_start) DO UPDATE SET
+            sample_count = t.sample_count + EXCLUDED.sample_count,
+            view_min = least(t.view_min, EXCLUDED.view_min),
+            view_max = greatest(t.view_max, EXCLUDED.view_max),
+            view_last = CASE WHEN EXCLUDED.last_collected_at >= t.last_collected_at
+                             THEN EXCLUDED.view_last ELSE t.view_last END,
+            like_min = least(t.like_min, EXCLUDED.like_min),
+            like_max = greatest(t.like_max, EXCLUDED.like_max),
+            like_last = CASE WHEN EXCLUDED.last_collected_at >= t.last_collected_at
+                             THEN EXCLUDED.like_last ELSE t.like_last END,
+            last_collected_at = greatest(t.last_collected_at, EXCLUDED.last_collected_at)
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM moved), (SELECT count(*) FROM upserted)
+    INTO hourly_compacted, daily_written;
+
+    RETURN json_build_object(
+        'raw_compacted', raw_compacted,
+        'hourly_written', hourly_written,
+        'hourly_compacted', hourly_compacted,
+        'daily_written', daily_written,
+        'raw_rows', (SELECT count(*) FROM scraped_snapshots),
+        'hourly_rows', (SELECT count(*) FROM scraped_snapshot_rollups WHERE resolution = 'hour'),
+        'daily_rows', (SELECT count(*) FROM scraped_snapshot_rollups WHERE resolution = 'day')
+    );
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,16 @@
+-- 複数チャンネルの収集: 動画の所属チャンネル
+--
+-- video_metadata.channel_id は videos.list の snippet.channelId。
+-- 単一チャンネルで運用していた間に登録した動画は、channel_metadata が1件だけならそのチャンネルのものとして埋める。
+BEGIN;
+
+ALTER TABLE video_metadata ADD COLUMN IF NOT EXISTS channel_id TEXT;
+
+UPDATE video_metadata SET channel_id = (SELECT channel_id FROM channel_metadata)
+WHERE channel_id IS NULL AND (SELECT count(*) FROM channel_metadata) = 1;
+
+-- チャンネルごとの新着動画（collect.py --mode recent）を公開日の新しい順に読む
+CREATE INDEX IF NOT EXISTS idx_video_metadata_channel_published
+    ON video_metadata(channel_id, published_at DESC, video_id DESC);
+
+COMMIT;
@@ -0,0 +1,12 @@
+-- ensure_video_snapshot_partitions() の実行権限
+--
+-- 006 で作成した関数は呼び出し元の権限で実行され、PUBLIC に EXECUTE が付いていた。
+-- 所有者権限（SECURITY DEFINER、search_path 固定）で実行し、service_role だけが呼べるようにする。
+BEGIN;
+
+ALTER FUNCTION ensure_video_snapshot_partitions(DATE, INTEGER) SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION ensure_video_snapshot_partitions(DATE, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION ensure_video_snapshot_partitions(DATE, INTEGER) TO service_role;
+
+COMMIT;
@@ -0,0 +1,79 @@
+-- video_latest_stats に所属チャンネルを持たせる
+--
+-- ダッシュボードは設定したチャンネルの動画だけを video_latest_stats から読むため、
+-- video_metadata.channel_id（migrations/007）を写し、refresh_video_latest_stats() でも更新する。
+BEGIN;
+
+ALTER TABLE video_latest_stats ADD COLUMN IF NOT EXISTS channel_id TEXT;
+
+UPDATE video_latest_stats t SET channel_id = m.channel_id
+FROM video_metadata m
+WHERE m.video_id = t.video_id AND t.channel_id IS DISTINCT FROM m.channel_id;
+
+CREATE INDEX IF NOT EXISTS idx_video_latest_stats_channel_views ON video_latest_stats(channel_id, view_count DESC);
+
+-- p_as_of はその日に値を確認した日付（変化が無くスナップショットを書かなかった日も含む）。
+-- 増分は checked_date 基準で計算する。
+CREATE OR REPLACE FUNCTION refresh_video_latest_stats(p_video_ids TEXT[], p_as_of DATE DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH latest AS (
+        SELECT DISTINCT ON (s.video_id)
+            s.video_id, s.collected_date, s.view_count, s.like_count, s.comment_count,
+            greatest(s.collected_date, coalesce(p_as_of, s.collected_date)) AS checked_date
+        FROM video_snapshots s
+        WHERE s.video_id = ANY(p_video_ids)
+        ORDER BY s.video_id, s.collected_date DESC
+    ),
+    upserted AS (
+        INSERT INTO video_latest_stats AS t (
+            video_id, channel_id, title, published_at, duration_seconds, thumbnail_url,
+            collected_date, checked_date, view_count, like_count, comment_count,
+            view_delta_1d, view_delta_7d, view_delta_30d, updated_at
+        )
+        SELECT
+            l.video_id, m.channel_id, m.title, m.published_at, m.duration_seconds, m.thumbnail_url,
+            l.collected_date, l.checked_date, l.view_count, l.like_count, l.comment_count,
+            l.view_count - p1.view_count,
+            l.view_count - p7.view_count,
+            l.view_count - p30.view_count,
+            now()
+        FROM latest l
+        JOIN video_metadata m ON m.video_id = l.video_id
+        LEFT JOIN LATERAL (
+            SELECT p.view_count FROM video_snapshots p
+            WHERE p.video_id = l.video_id AND p.collected_date <= l.checked_date - 1
+            ORDER BY p.collected_date DESC LIMIT 1
+        ) p1 ON true
+        LEFT JOIN LATERAL (
+            SELECT p.view_count FROM video_snapshots p
+            WHERE p.video_id = l.video_id AND p.collected_date <= l.checked_date - 7
+            ORDER BY p.collected_date DESC LIMIT 1
+        ) p7 ON true
+        LEFT JOIN LATERAL (
+            SELECT p.view_count FROM video_snapshots p
+            WHERE p.video_id = l.video_id AND p.collected_date <= l.checked_date - 30
+            ORDER BY p.collected_date DESC LIMIT 1
+        ) p30 ON true
+        ON CONFLICT (video_id) DO UPDATE SET
+            channel_id = EXCLUDED.channel_id,
+            title = EXCLUDED.title,
+            published_at = EXCLUDED.published_at,
+            duration_seconds = EXCLUDED.duration_seconds,
+            thumbnail_url = EXCLUDED.thumbnail_url,
+            collected_date = EXCLUDED.collected_date,
+            checked_date = EXCLUDED.checked_date,
+            view_count = EXCLUDED.view_count,
+            like_count = EXCLUDED.like_count,
+            comment_count = EXCLUDED.comment_count,
+            view_delta_1d = EXCLUDED.view_delta_1d,
+            view_delta_7d = EXCLUDED.view_delta_7d,
+            view_delta_30d = EXCLUDED.view_delta_30d,
+            updated_at = EXCLUDED.updated_at
+        RETURNING 1
+    )
+    SELECT count(*)::INTEGER FROM upserted;
+$$;
+
+COMMIT;
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 """初回バックフィル: 既存全動画のメタデータを一括取得
 
+収集対象のチャンネルは config/channels.txt（無ければ settings.CHANNEL_ID のみ）。
+
 使い方:
     python scripts/backfill.py
+    python scripts/backfill.py --resume   # 途中で止まったバックフィルを続きから
+    python scripts/backfill.py --profile  # 段階ごとのプロファイルを data/profiles/ に出力
 """
+import argparse
 import logging
 import sys
 from pathlib import Path
@@ -11,14 +16,30 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from config.settings import (
-    YOUTUBE_API_KEY, CHANNEL_ID, LOG_PATH, API_DAILY_QUOTA_LIMIT,
-    SUPABASE_URL, SUPABASE_KEY,
+    YOUTUBE_API_KEYS, YOUTUBE_API_ENDPOINT, CHANNEL_ID, CHANNELS_FILE, LOG_PATH, API_DAILY_QUOTA_LIMIT, API_FETCH_WORKERS,
+    DISCOVERY_CACHE_PATH, QUOTA_STATE_PATH, API_DISCOVERY_CACHE_PATH, PIPELINE_QUEUE_SIZE, CHECKPOINT_DIR,
+    SUPABASE_URL, SUPABASE_KEY, STORAGE_BACKEND, LOCAL_DB_PATH, WRITE_SPOOL_DIR,
+    METRICS_HISTORY_DIR, METRICS_TEXTFILE_DIR, PROFILE_DIR,
 )
-from src.db import Database
+from src.storage import open_storage
 from src.api_collector import ApiCollector
+from src.channels import load_channel_ids
+from src.checkpoint import RunCheckpoint, fetch_all_video_ids
+from src.discovery_cache import DiscoveryCache
+from src.metrics import metrics
+from src.pipeline import WriteProgress, write_video_details
+from src.sampling import interleave
 
 
 def main():
+    parser = argparse.ArgumentParser(description="初回バックフィル")
+    parser.add_argument("--resume", action="store_true", help="前回途中で止まった実行を続きから再開する")
+    parser.add_argument(
+        "--profile", nargs="?", const=PROFILE_DIR, type=Path, metavar="DIR",
+        help=f"段階ごとの cProfile・スタックのサンプリング・tracemalloc を DIR に出力する（既定: {PROFILE_DIR}）",
+    )
+    args = parser.parse_args()
+
     LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
     logging.basicConfig(
         level=logging.INFO,
@@ -30,50 +51,126 @@ def main():
     )
     logger = logging.getLogger("backfill")
 
-    if not YOUTUBE_API_KEY or YOUTUBE_API_KEY == "YOUR_API_KEY_HERE":
-        logger.error("YOUTUBE_API_KEY が設定されていません。config/.env を確認してください。")
+    if not YOUTUBE_API_KEYS:
+        logger.error("YOUTUBE_API_KEY（または YOUTUBE_API_KEYS）が設定されていません。config/.env を確認してください。")
         sys.exit(1)
 
-    if not SUPABASE_URL or SUPABASE_URL == "YOUR_SUPABASE_URL_HERE":
+    if STORAGE_BACKEND == "supabase" and (not SUPABASE_URL or SUPABASE_URL == "YOUR_SUPABASE_URL_HERE"):
         logger.error("SUPABASE_URL/SUPABASE_KEY が設定されていません。config/.env を確認してください。")
         sys.exit(1)
 
-    db = Database(SUPABASE_URL, SUPABASE_KEY)
+    profiler = None
+    if args.profile:
+        from src.profiling import start_run_profiler
+        profiler = start_run_profiler(args.profile, "backfill")
+
+    db = open_storage(STORAGE_BACKEND, SUPABASE_URL, SUPABASE_KEY, LOCAL_DB_PATH, WRITE_SPOOL_DIR)
     db.ensure_schema()
-    api = ApiCollector(YOUTUBE_API_KEY, API_DAILY_QUOTA_LIMIT)
+    api = ApiCollector(
+        YOUTUBE_API_KEYS, API_DAILY_QUOTA_LIMIT,
+        workers=API_FETCH_WORKERS, quota_state_path=QUOTA_STATE_PATH,
+        discovery_cache_path=API_DISCOVERY_CACHE_PATH, api_endpoint=YOUTUBE_API_ENDPOINT,
+    )
+    cache = DiscoveryCache(DISCOVERY_CACHE_PATH)
+    checkpoint = RunCheckpoint(CHECKPOINT_DIR / "backfill.json", resume=args.resume)
+    if checkpoint.resumed:
+        logger.info(f"チェックポイントから再開（{checkpoint.get('started_at')} 開始の実行）")
 
+    success = False
     try:
-        # 1. 全動画ID取得
-        logger.info("全動画IDを取得中...")
-        video_ids = api.get_all_video_ids(CHANNEL_ID)
-        logger.info(f"合計 {len(video_ids)} 動画を発見")
-
-        # 2. 未登録の動画のみメタデータ取得
-        new_ids = db.find_new_video_ids(video_ids)
+        # 前回実行で送信できなかった書き込みを先に再送
+        with metrics.stage("spool_flush"):
+            db.flush_pending()
+
+        # 1. 全チャンネルの全動画ID取得（ページごとに進捗を記録し、チャンネルごとに確定した時点で記録）
+        channel_ids = load_channel_ids(CHANNELS_FILE, CHANNEL_ID)
+        discovered = checkpoint.get("channels") or {}
+        with metrics.stage("discovery"):
+            unknown = [cid for cid in channel_ids if cid not in discovered and not cache.get_playlist_id(cid)]
+            if unknown:
+                # uploads プレイリストが未取得のチャンネルは channels.list 1回につき50件まとめて引く
+                for channel_id, playlist_id in api.get_uploads_playlist_ids(unknown).items():
+                    cache.set_playlist_id(channel_id, playlist_id)
+            for channel_id in channel_ids:
+                playlist_id = cache.get_playlist_id(channel_id)
+                if channel_id in discovered:
+                    continue
+                if playlist_id is None:
+                    logger.warning(f"{channel_id}: チャンネルが見つからないためスキップします")
+                    continue
+                logger.info(f"{channel_id}: 全動画IDを取得中...")
+                video_ids = fetch_all_video_ids(api, channel_id, playlist_id, checkpoint)
+
+                # 2. 未登録の動画のみメタデータ取得
+                discovered[channel_id] = {"video_ids": video_ids, "new_ids": db.find_new_video_ids(video_ids)}
+                checkpoint.update(channels=discovered)
+        video_ids = interleave([d["video_ids"] for d in discovered.values()])
+        new_ids = [vid for d in discovered.values() for vid in d["new_ids"]]
+        logger.info(f"{len(discovered)} チャンネルで合計 {len(video_ids)} 動画を発見")
         logger.info(f"うち {len(new_ids)} 件が未登録")
 
         if not new_ids:
             logger.info("全動画が既に登録済みです")
+            for channel_id, d in discovered.items():
+                cache.update(channel_id, d["video_ids"], full_scan=True)
+            cache.save()
+            checkpoint.clear()
+            success = True
             return
 
-        # 3. メタデータ取得・保存
-        logger.info("メタデータを取得中...")
-        metadata = api.get_video_metadata(new_ids)
-        db.insert_video_metadata_batch(metadata)
-        logger.info(f"{len(metadata)} 件のメタデータを登録完了")
-
-        # 4. 現在の統計スナップショットも取得
-        logger.info("現在の統計を取得中...")
-        snapshots = api.get_video_stats(video_ids)
-        db.insert_video_snapshots_batch(snapshots)
-        logger.info(f"{len(snapshots)} 件の統計を記録完了")
-
-        logger.info(f"API quota使用量: {api.quota.used}/{api.quota.daily_limit}")
+        # 3. メタデータと現在の統計スナップショットを取得しながら順に保存
+        #    （再開時は書き込み済みのバッチをリクエストしない）
+        done = checkpoint.completed_batches()
+        logger.info(
+            "メタデータと現在の統計を取得中"
+            + (f"（書き込み済みの {len(done)} バッチは省略）" if done else "")
+            + "..."
+        )
+        progress = WriteProgress()
+
+        def refresh_written():
+            logger.info(
+                f"{progress.metadata_count} 件のメタデータと "
+                f"{len(progress.snapshot_video_ids)} 件の統計を記録"
+            )
+            if progress.snapshot_video_ids:
+                with metrics.stage("refresh_latest"):
+                    db.refresh_latest_stats(progress.snapshot_video_ids)
+
+        try:
+            with metrics.stage("video_details"):
+                write_video_details(
+                    db, api.iter_video_details(video_ids, metadata_ids=new_ids, skip_batches=done), progress,
+                    queue_size=PIPELINE_QUEUE_SIZE,
+                    on_written=lambda batch, snapshot_rows: checkpoint.mark_batch_done(
+                        batch.index, len(batch.metadata), snapshot_rows
+                    ),
+                )
+        except Exception:
+            # 書き込めた分は最新統計に反映しておく。ここでの失敗（多くは同じ原因）で元の例外を隠さない
+            try:
+                refresh_written()
+            except Exception as e:
+                logger.error(f"最新統計の更新にも失敗しました: {e}")
+            raise
+        refresh_written()
+        for channel_id, d in discovered.items():
+            cache.update(channel_id, d["video_ids"], full_scan=True)
+        cache.save()
+        checkpoint.clear()
+
+        logger.info(f"API quota使用量: {api.quota.usage_text()}")
+        success = True
     except Exception as e:
-        logger.error(f"バックフィル中にエラーが発生: {e}", exc_info=True)
+        logger.error(f"バックフィル中にエラーが発生: {e}（--resume で続きから再開できます）", exc_info=True)
         sys.exit(1)
     finally:
-        db.close()
+        api.close()
+        with metrics.stage("close"):
+            db.close()
+        metrics.export("backfill", METRICS_HISTORY_DIR, METRICS_TEXTFILE_DIR, success=success)
+        if profiler is not None:
+            profiler.close()
 
     logger.info("バックフィル完了")
 
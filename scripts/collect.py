@@ -1,26 +1,59 @@
 #!/usr/bin/env python3
 """YouTube データ収集メインスクリプト
 
+収集対象のチャンネルは config/channels.txt（無ければ settings.CHANNEL_ID のみ）。
+
 使い方:
     python scripts/collect.py --mode daily    # 全動画の日次スナップショット
+    python scripts/collect.py --mode daily --resume  # 途中で止まった日次収集を続きから
     python scripts/collect.py --mode recent   # 新着動画の高頻度スクレイピング
+    python scripts/collect.py --mode daily --profile  # 段階ごとのプロファイルを data/profiles/ に出力
+    python scripts/collect.py --mode daemon   # 常駐して daily / recent / early を内部のスケジュールで実行
+    python scripts/collect.py --trigger daily # 常駐中のプロセスに今すぐ daily を実行させる
 """
 import argparse
 import logging
+import signal
 import sys
 import time
+from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable
 
 # プロジェクトルートをパスに追加
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from config.settings import (
-    YOUTUBE_API_KEY, CHANNEL_ID, LOG_PATH,
-    SUPABASE_URL, SUPABASE_KEY,
-    API_DAILY_QUOTA_LIMIT, SCRAPE_RECENT_DAYS,
+    YOUTUBE_API_KEYS, YOUTUBE_API_ENDPOINT, CHANNEL_ID, CHANNELS_FILE, LOG_PATH, DISCOVERY_CACHE_PATH,
+    SUPABASE_URL, SUPABASE_KEY, STORAGE_BACKEND, LOCAL_DB_PATH, WRITE_SPOOL_DIR,
+    API_DAILY_QUOTA_LIMIT, API_FETCH_WORKERS, SCRAPE_RECENT_DAYS,
+    SCRAPE_DELAY_MIN, SCRAPE_DELAY_MAX, SCRAPE_MAX_REQUESTS_PER_RUN,
+    SCRAPE_WORKERS, SCRAPE_RUN_DEADLINE, SCRAPE_STATS_ONLY, SCRAPE_REQUIRE_LIKES,
+    DISCOVERY_STOP_AFTER_KNOWN, DISCOVERY_FULL_SCAN_DAYS,
+    QUOTA_STATE_PATH, API_QUOTA_RESERVE, API_DISCOVERY_CACHE_PATH, PIPELINE_QUEUE_SIZE, CHECKPOINT_DIR,
+    SNAPSHOT_STORAGE, SNAPSHOT_KEYFRAME_DAYS,
+    SAMPLING_FRESH_DAYS, SAMPLING_DORMANT_INTERVAL_DAYS, SAMPLING_DORMANT_DAILY_VIEWS,
+    METRICS_HISTORY_DIR, METRICS_TEXTFILE_DIR, PROFILE_DIR,
+    DAEMON_DAILY_AT, DAEMON_DAILY_JITTER, DAEMON_RECENT_INTERVAL, DAEMON_RECENT_JITTER,
+    DAEMON_EARLY_INTERVAL, DAEMON_EARLY_JITTER, DAEMON_STATE_PATH, DAEMON_TRIGGER_DIR, EARLY_LIFE_HOURS,
 )
-from src.db import Database
-from src.api_collector import ApiCollector, QuotaExhaustedError
+from src.storage import Storage, open_storage
+from src.channels import load_channel_ids
+from src.checkpoint import RunCheckpoint, fetch_all_video_ids
+from src.compaction import SnapshotChangeFilter
+from src.discovery_cache import DiscoveryCache
+from src.metrics import metrics
+from src.pipeline import WriteProgress, write_video_details
+from src.models import ScrapedSnapshot
+from src.sampling import EarlyLifeWindow, SamplingPolicy, interleave, plan_snapshot_targets
+
+# googleapiclient / supabase / yt_dlp は import が重いため、使うモードの中でだけ読み込む
+if TYPE_CHECKING:
+    from src.api_collector import ApiCollector
+    from src.scrape_collector import ScrapeCollector
+
+# 常駐モードのジョブ（--trigger に渡せる名前）
+DAEMON_JOBS = ("daily", "recent", "early")
 
 
 def setup_logging():
@@ -35,119 +68,479 @@ def setup_logging():
     )
 
 
-def collect_daily(db: Database):
-    """全動画の日次スナップショット収集"""
+def build_api_collector() -> "ApiCollector":
+    from src.api_collector import ApiCollector
+
+    return ApiCollector(
+        YOUTUBE_API_KEYS, API_DAILY_QUOTA_LIMIT,
+        workers=API_FETCH_WORKERS, quota_state_path=QUOTA_STATE_PATH,
+        discovery_cache_path=API_DISCOVERY_CACHE_PATH, api_endpoint=YOUTUBE_API_ENDPOINT,
+    )
+
+
+def build_scraper() -> "ScrapeCollector":
+    from src.scrape_collector import ScrapeCollector
+
+    return ScrapeCollector(
+        delay_min=SCRAPE_DELAY_MIN,
+        delay_max=SCRAPE_DELAY_MAX,
+        workers=SCRAPE_WORKERS,
+        max_requests=SCRAPE_MAX_REQUESTS_PER_RUN,
+        deadline_seconds=SCRAPE_RUN_DEADLINE,
+    )
+
+
+def discover_video_ids(
+    api: "ApiCollector", db: Storage, cache: DiscoveryCache, checkpoint: RunCheckpoint,
+    channel_id: str, playlist_id: str, full_scan: bool,
+) -> tuple[list[str], list[str]]:
+    """チャンネルの全動画IDと新規動画IDを返す
+
+    full_scan が False ならキャッシュの既知IDを使ってプレイリスト先頭の差分だけを走査する。
+    削除検出のため DISCOVERY_FULL_SCAN_DAYS ごと（またはキャッシュが無いとき）は全件走査する。
+    """
     logger = logging.getLogger("collect.daily")
+    known_ids = cache.known_ids(channel_id)
 
-    if not YOUTUBE_API_KEY or YOUTUBE_API_KEY == "YOUR_API_KEY_HERE":
-        logger.error("YOUTUBE_API_KEY が設定されていません。config/.env を確認してください。")
-        sys.exit(1)
+    if full_scan:
+        logger.info(f"{channel_id}: 動画一覧を全件取得中...")
+        video_ids = fetch_all_video_ids(api, channel_id, playlist_id, checkpoint)
+        return video_ids, db.find_new_video_ids(video_ids)
+
+    logger.info(f"{channel_id}: 動画一覧を差分取得中（既知 {len(known_ids)} 件）...")
+    known_set = set(known_ids)
+    head = api.scan_uploads_head(
+        channel_id, known_set, DISCOVERY_STOP_AFTER_KNOWN, playlist_id=playlist_id
+    )
+    candidates = [vid for vid in head if vid not in known_set]
+    video_ids = list(dict.fromkeys([*head, *known_ids]))
+    return video_ids, db.find_new_video_ids(candidates)
 
-    if not SUPABASE_URL or SUPABASE_URL == "YOUR_SUPABASE_URL_HERE":
-        logger.error("SUPABASE_URL が設定されていません。config/.env を確認してください。")
+
+def collect_daily(
+    db: Storage, channel_ids: list[str], resume: bool = False,
+    api: "ApiCollector | None" = None, cache: DiscoveryCache | None = None,
+):
+    """全チャンネルの全動画の日次スナップショット収集
+
+    チャンネル情報は channels.list 1回につき50チャンネルまとめて取得し、動画の統計は全チャンネルを
+    1つのクォータ予算で優先度順に選んで videos.list のバッチに詰める。
+    resume=True なら同じ日の前回実行のチェックポイントから続ける（済んだ段階・バッチは飛ばす）。
+    api / cache は常駐モードが実行をまたいで使い回すもの（省略時はここで作り、終わったら閉じる）。
+    """
+    if api is not None:
+        _collect_daily(db, channel_ids, resume, api, cache)
+        return
+    if not YOUTUBE_API_KEYS:
+        logging.getLogger("collect.daily").error(
+            "YOUTUBE_API_KEY（または YOUTUBE_API_KEYS）が設定されていません。config/.env を確認してください。"
+        )
         sys.exit(1)
+    api = build_api_collector()
+    try:
+        _collect_daily(db, channel_ids, resume, api, cache)
+    finally:
+        # 最後の保存以降のクォータ使用量もここで状態ファイルへ書き出す
+        api.close()
 
-    api = ApiCollector(YOUTUBE_API_KEY, API_DAILY_QUOTA_LIMIT)
 
-    # 1. チャンネル統計 & メタデータ
-    logger.info("チャンネル情報を取得中...")
-    channel = api.get_channel_stats(CHANNEL_ID)
-    db.insert_channel_snapshot(channel)
-    
-    metadata = api.get_channel_metadata(CHANNEL_ID)
-    db.insert_channel_metadata(metadata)
-    
-    logger.info(
-        f"チャンネル: {metadata.title}, 登録者 {channel.subscriber_count:,}, "
-        f"総再生 {channel.total_view_count:,}, "
-        f"動画数 {channel.video_count}"
-    )
+def _collect_daily(
+    db: Storage, channel_ids: list[str], resume: bool, api: "ApiCollector", cache: DiscoveryCache | None
+):
+    from src.api_collector import QuotaExhaustedError
+
+    logger = logging.getLogger("collect.daily")
+    logger.info(f"本日のクォータ使用済み: {api.quota.usage_text()}")
+
+    checkpoint = RunCheckpoint(CHECKPOINT_DIR / "daily.json", resume=resume)
+    if checkpoint.resumed and checkpoint.get("started_at", "")[:10] != datetime.utcnow().strftime("%Y-%m-%d"):
+        # 日次スナップショットは日付単位なので、前日以前の途中経過は使わない
+        logger.info("チェックポイントが前日以前のものなので最初から実行します")
+        checkpoint.reset()
+    elif checkpoint.resumed:
+        logger.info(f"チェックポイントから再開（{checkpoint.get('started_at')} 開始の実行）")
+
+    # 1. チャンネル統計 & メタデータ & uploads プレイリスト（50チャンネルずつ1リクエストに統合）
+    playlists = checkpoint.get("playlists")
+    if playlists is None:
+        logger.info(f"{len(channel_ids)} チャンネルの情報を取得中...")
+        with metrics.stage("channel"):
+            bundles = api.get_channel_bundles(channel_ids)
+            db.insert_channel_snapshots_batch([channel for channel, _, _ in bundles.values()])
+            db.insert_channel_metadata_batch([metadata for _, metadata, _ in bundles.values()])
+        playlists = {channel_id: playlist_id for channel_id, (_, _, playlist_id) in bundles.items()}
+        checkpoint.update(playlists=playlists)
+
+        for channel, metadata, _ in bundles.values():
+            logger.info(
+                f"チャンネル: {metadata.title}, 登録者 {channel.subscriber_count:,}, "
+                f"総再生 {channel.total_view_count:,}, "
+                f"動画数 {channel.video_count}"
+            )
 
-    # 2. 全動画ID取得 & 新動画検出
-    logger.info("動画一覧を取得中...")
-    video_ids = api.get_all_video_ids(CHANNEL_ID)
-    new_ids = db.find_new_video_ids(video_ids)
+    # 2. 全動画ID取得 & 新動画検出（チャンネルごとに確定した時点で記録）
+    if cache is None:
+        cache = DiscoveryCache(DISCOVERY_CACHE_PATH)
+    discovered = checkpoint.get("channels") or {}
+    with metrics.stage("discovery"):
+        for channel_id, playlist_id in playlists.items():
+            cache.set_playlist_id(channel_id, playlist_id)
+            if channel_id in discovered:
+                continue
+            full_scan = cache.needs_full_scan(channel_id, DISCOVERY_FULL_SCAN_DAYS)
+            video_ids, new_ids = discover_video_ids(
+                api, db, cache, checkpoint, channel_id, playlist_id, full_scan
+            )
+            discovered[channel_id] = {"video_ids": video_ids, "new_ids": new_ids, "full_scan": full_scan}
+            checkpoint.update(channels=discovered)
+    # チャンネルを交互に並べ、同じ優先度の動画がどのチャンネルからも均等に選ばれるようにする
+    video_ids = interleave([d["video_ids"] for d in discovered.values()])
+    new_ids = [vid for d in discovered.values() for vid in d["new_ids"]]
 
-    if new_ids:
-        logger.info(f"新規動画 {len(new_ids)} 件のメタデータを取得中...")
-        metadata = api.get_video_metadata(new_ids)
-        db.insert_video_metadata_batch(metadata)
-        logger.info(f"新規動画 {len(new_ids)} 件を登録")
+    # 3. 残りクォータに収まるよう、変化の大きい動画から順に取得対象を選ぶ
+    #    （再開時は前回の計画をそのまま使い、バッチ番号を一致させる）
+    latest_stats = None
+    if checkpoint.get("targets") is None:
+        with metrics.stage("planning"):
+            latest_stats = db.get_latest_stats()
+            policy = SamplingPolicy(
+                fresh_days=SAMPLING_FRESH_DAYS,
+                dormant_interval_days=SAMPLING_DORMANT_INTERVAL_DAYS,
+                dormant_daily_views=SAMPLING_DORMANT_DAILY_VIEWS,
+            )
+            plan = plan_snapshot_targets(
+                video_ids, latest_stats, api.quota.remaining - API_QUOTA_RESERVE, policy
+            )
+        logger.info(
+            f"取得対象 {len(plan.targets)}/{len(video_ids)} 動画"
+            f"（休眠のため見送り {len(plan.deferred)} 件, 予算超過 {len(plan.dropped)} 件）"
+        )
+        checkpoint.update(targets=plan.targets)
+    targets = checkpoint.get("targets")
 
-    # 3. 全動画の統計スナップショット
-    logger.info(f"全 {len(video_ids)} 動画の統計を取得中...")
+    # 4. 統計スナップショット（新規動画はメタデータも同じリクエストで取得）
+    #    取得済みのバッチから順に書き込み、API と DB の待ち時間を重ねる
+    done = checkpoint.completed_batches()
+    logger.info(
+        f"{len(targets)} 動画の統計を取得中（うち新規 {len(new_ids)} 件はメタデータも取得"
+        + (f", 書き込み済みの {len(done)} バッチは省略" if done else "")
+        + "）..."
+    )
+    snapshot_filter = None
+    if SNAPSHOT_STORAGE == "changes":
+        # 前回保存した値から変わった動画とキーフレームだけを書く
+        snapshot_filter = SnapshotChangeFilter(
+            latest_stats if latest_stats is not None else db.get_latest_stats(), SNAPSHOT_KEYFRAME_DAYS
+        )
+    progress = WriteProgress()
+    completed = False
     try:
-        snapshots = api.get_video_stats(video_ids)
-        db.insert_video_snapshots_batch(snapshots)
-        logger.info(f"{len(snapshots)} 件の統計を記録")
+        with metrics.stage("video_stats"):
+            write_video_details(
+                db, api.iter_video_details(targets, metadata_ids=new_ids, skip_batches=done), progress,
+                queue_size=PIPELINE_QUEUE_SIZE,
+                on_written=lambda batch, snapshot_rows: checkpoint.mark_batch_done(
+                    batch.index, len(batch.metadata), snapshot_rows
+                ),
+                snapshot_filter=snapshot_filter,
+            )
+        # 新規動画の登録が済んでから既知IDとして保存する
+        for channel_id, d in discovered.items():
+            cache.update(channel_id, d["video_ids"], full_scan=d["full_scan"])
+        cache.save()
+        completed = True
     except QuotaExhaustedError as e:
-        logger.warning(f"APIクォータ超過: {e}")
+        logger.warning(f"APIクォータ超過: {e}（--resume で続きから再開できます）")
 
-    logger.info(f"API quota使用量: {api.quota.used}/{api.quota.daily_limit}")
+    if progress.metadata_count:
+        logger.info(f"新規動画 {progress.metadata_count} 件を登録")
+    logger.info(
+        f"{len(progress.snapshot_video_ids)} 動画の統計を取得し {progress.snapshot_rows} 件を記録"
+    )
+
+    # 5. 今回取得した動画だけ最新統計ロールアップを更新（クォータ超過で止まった場合もそこまでの分）
+    #    再開した実行が完了したら、前回の実行で取得した分も含めて更新する
+    refresh_ids = targets if completed and checkpoint.resumed else progress.snapshot_video_ids
+    if refresh_ids:
+        as_of = progress.collected_date or datetime.utcnow().strftime("%Y-%m-%d")
+        with metrics.stage("refresh_latest"):
+            updated = db.refresh_latest_stats(refresh_ids, as_of=as_of)
+        logger.info(f"最新統計ロールアップを {updated} 件更新")
+    if completed:
+        checkpoint.clear()
 
+    logger.info(f"API quota使用量: {api.quota.usage_text()}")
 
-def collect_recent(db: Database):
-    """新着動画のスクレイピング高頻度収集"""
+
+def collect_recent(db: Storage, channel_ids: list[str], scraper: "ScrapeCollector | None" = None):
+    """新着動画のスクレイピング高頻度収集（scraper を渡した場合は閉じずに返す）"""
     logger = logging.getLogger("collect.recent")
 
-    recent_ids = db.get_recent_video_ids(days=SCRAPE_RECENT_DAYS)
+    with metrics.stage("discovery"):
+        if len(channel_ids) == 1:
+            # 単一チャンネルでは channel_id の無い（列を追加する前に登録した）動画も対象にする
+            by_channel = {channel_ids[0]: db.get_recent_video_ids(days=SCRAPE_RECENT_DAYS)}
+        else:
+            by_channel = {
+                channel_id: db.get_recent_video_ids(days=SCRAPE_RECENT_DAYS, channel_id=channel_id)
+                for channel_id in channel_ids
+            }
+    # 1回の上限を超える場合もチャンネルが偏らないよう交互に並べてから切る
+    recent_ids = interleave(list(by_channel.values()))[:SCRAPE_MAX_REQUESTS_PER_RUN]
     if not recent_ids:
         logger.info("直近の新着動画はありません")
         return
 
     logger.info(f"直近 {SCRAPE_RECENT_DAYS} 日の動画 {len(recent_ids)} 件をスクレイピング中...")
 
+    own_scraper = scraper is None
+    if own_scraper:
+        try:
+            scraper = build_scraper()
+        except ImportError:
+            logger.warning("yt-dlp がインストールされていません。pip install yt-dlp を実行してください。")
+            return
+
     try:
-        from src.scrape_collector import ScrapeCollector
-        scraper = ScrapeCollector()
+        with metrics.stage("scrape"):
+            if SCRAPE_STATS_ONLY:
+                # 動画タブはチャンネルごとに取得する
+                selected = set(recent_ids)
+                snaps = []
+                for channel_id, ids in by_channel.items():
+                    ids = [vid for vid in ids if vid in selected]
+                    if ids:
+                        snaps.extend(scraper.collect_stats_only(ids, channel_id, require_likes=SCRAPE_REQUIRE_LIKES))
+            else:
+                snaps = scraper.collect(recent_ids)
+        with metrics.stage("write"):
+            db.insert_scraped_snapshots_batch(snaps)
+        for snap in snaps:
+            logger.info(f"  {snap.video_id}: {snap.view_count:,} views")
+    finally:
+        if own_scraper:
+            scraper.close()
 
-        for video_id in recent_ids:
-            try:
-                snap = scraper.get_live_stats(video_id)
-                if snap:
-                    db.insert_scraped_snapshot(snap)
-                    logger.info(f"  {video_id}: {snap.view_count:,} views")
-            except Exception as e:
-                logger.warning(f"  {video_id}: スクレイピング失敗 - {e}")
-
-        logger.info("スクレイピング完了")
+    logger.info("スクレイピング完了")
+
+
+def collect_early(
+    db: Storage, api: "ApiCollector", channel_ids: list[str], cache: DiscoveryCache, window: EarlyLifeWindow
+):
+    """公開から EARLY_LIFE_HOURS 以内の動画の統計を API で取得し、scraped_snapshots に記録する（常駐モードで数分ごと）
+
+    新着は uploads プレイリストの先頭だけを見て検出し、同じ videos.list でメタデータも登録する。
+    1回のコストはチャンネル数 + 対象動画数/50 ユニット。残りが API_QUOTA_RESERVE を切ったら日次収集のために見送る。
+    """
+    logger = logging.getLogger("collect.early")
+    if api.quota.remaining <= API_QUOTA_RESERVE:
+        logger.info(f"クォータの残りが少ないため見送ります（{api.quota.usage_text()}）")
+        return
+
+    with metrics.stage("discovery"):
+        missing = [cid for cid in channel_ids if not cache.get_playlist_id(cid)]
+        if missing:
+            for channel_id, playlist_id in api.get_uploads_playlist_ids(missing).items():
+                cache.set_playlist_id(channel_id, playlist_id)
+        new_ids = []
+        # 既知IDの更新は新着のメタデータを書き込めた後に行う（失敗したら次回も新着として拾う）
+        discovered = {}
+        for channel_id in channel_ids:
+            playlist_id = cache.get_playlist_id(channel_id)
+            if playlist_id is None:
+                continue
+            known_ids = cache.known_ids(channel_id)
+            known_set = set(known_ids)
+            head = api.scan_uploads_head(channel_id, known_set, DISCOVERY_STOP_AFTER_KNOWN, playlist_id=playlist_id)
+            candidates = [vid for vid in head if vid not in known_set]
+            if candidates:
+                new_ids.extend(db.find_new_video_ids(candidates))
+                discovered[channel_id] = list(dict.fromkeys([*head, *known_ids]))
+
+    def save_discovered():
+        for channel_id, video_ids in discovered.items():
+            cache.update(channel_id, video_ids, full_scan=False)
+        cache.save()
+
+    targets = list(dict.fromkeys([*new_ids, *window.video_ids()]))
+    if not targets:
+        save_discovered()
+        logger.info(f"公開から {EARLY_LIFE_HOURS} 時間以内の動画はありません")
+        return
+
+    with metrics.stage("video_stats"):
+        metadata, snapshots = api.get_video_details(targets, metadata_ids=new_ids)
+    for meta in metadata:
+        window.add(meta.video_id, meta.published_at)
+    # メタデータを登録した新着のうち、公開から時間の経った動画（初回起動時など）は記録しない
+    in_window = set(window.video_ids())
+    rows = [
+        ScrapedSnapshot(video_id=s.video_id, view_count=s.view_count, like_count=s.like_count, collected_at=s.collected_at)
+        for s in snapshots if s.video_id in in_window
+    ]
+    with metrics.stage("write"):
+        if metadata:
+            db.insert_video_metadata_batch(metadata)
+        db.insert_scraped_snapshots_batch(rows)
+    save_discovered()
+    logger.info(
+        f"公開から {EARLY_LIFE_HOURS} 時間以内の {len(rows)} 動画を記録"
+        + (f"（新着 {len(metadata)} 件を登録）" if metadata else "")
+    )
+
+
+def run_daemon(db: Storage, channel_ids: list[str]):
+    """常駐して daily / recent / early を内部のスケジュールで実行する
+
+    API クライアント・DB の接続・スクレイパー・動画一覧のキャッシュは実行をまたいで使い回す。
+    計測値は実行ごとに reset し、ジョブ名を mode として書き出す。SIGTERM / SIGINT で実行中のジョブを終えてから止まる。
+    """
+    from src.scheduler import DailyAt, Every, Job, Scheduler
+
+    logger = logging.getLogger("collect.daemon")
+    if not YOUTUBE_API_KEYS:
+        logger.error("YOUTUBE_API_KEY（または YOUTUBE_API_KEYS）が設定されていません。config/.env を確認してください。")
+        sys.exit(1)
+
+    api = build_api_collector()
+    try:
+        scraper = build_scraper()
     except ImportError:
-        logger.warning("yt-dlp がインストールされていません。pip install yt-dlp を実行してください。")
+        logger.warning("yt-dlp がインストールされていないため recent はスキップします。")
+        scraper = None
+    cache = DiscoveryCache(DISCOVERY_CACHE_PATH)
+    window = EarlyLifeWindow(EARLY_LIFE_HOURS)
+    for video_id, published_at in db.get_video_published_at().items():
+        window.add(video_id, published_at)
+    logger.info(f"公開から {EARLY_LIFE_HOURS} 時間以内の動画 {len(window.video_ids())} 件を監視対象として開始")
+
+    def job(mode: str, collect) -> Callable[[], None]:
+        def run():
+            metrics.reset()
+            success = False
+            try:
+                with metrics.stage("spool_flush"):
+                    db.flush_pending()
+                collect()
+                success = True
+            finally:
+                api.quota.save()
+                with metrics.stage("close"):
+                    db.flush_pending()
+                metrics.export(mode, METRICS_HISTORY_DIR, METRICS_TEXTFILE_DIR, success=success)
+        return run
+
+    jobs = [
+        Job("daily", job("daily", lambda: collect_daily(db, channel_ids, api=api, cache=cache)),
+            DailyAt(DAEMON_DAILY_AT), DAEMON_DAILY_JITTER),
+        Job("early", job("early", lambda: collect_early(db, api, channel_ids, cache, window)),
+            Every(DAEMON_EARLY_INTERVAL), DAEMON_EARLY_JITTER),
+    ]
+    if scraper is not None:
+        jobs.append(Job("recent", job("recent", lambda: collect_recent(db, channel_ids, scraper)),
+                        Every(DAEMON_RECENT_INTERVAL), DAEMON_RECENT_JITTER))
+    scheduler = Scheduler(jobs, DAEMON_STATE_PATH, DAEMON_TRIGGER_DIR)
+
+    def handle_signal(signum, frame):
+        if scheduler.stop_event.is_set():
+            raise KeyboardInterrupt
+        logger.info("停止要求を受け付けました（実行中のジョブを終えてから止まります。もう一度で強制終了）")
+        scheduler.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+    try:
+        scheduler.run_forever()
+    finally:
+        if scraper is not None:
+            scraper.close()
+        api.close()
 
 
 def main():
     parser = argparse.ArgumentParser(description="YouTube データ収集")
     parser.add_argument(
         "--mode",
-        choices=["daily", "recent"],
-        required=True,
-        help="収集モード: daily=全動画日次, recent=新着スクレイピング",
+        choices=["daily", "recent", "daemon"],
+        help="収集モード: daily=全動画日次, recent=新着スクレイピング, daemon=常駐して内部のスケジュールで実行",
+    )
+    parser.add_argument(
+        "--trigger",
+        choices=DAEMON_JOBS,
+        help="常駐中のプロセス（--mode daemon）に、予定を待たずにこのジョブを実行させる",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="daily: 同じ日に途中で止まった実行を続きから再開する",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=PROFILE_DIR,
+        type=Path,
+        metavar="DIR",
+        help=f"段階ごとの cProfile・スタックのサンプリング・tracemalloc を DIR に出力する（既定: {PROFILE_DIR}）",
     )
     args = parser.parse_args()
+    if not args.mode and not args.trigger:
+        parser.error("--mode か --trigger を指定してください")
+    if args.mode == "daemon" and (args.resume or args.profile):
+        parser.error("--resume / --profile は daemon では使えません")
 
     setup_logging()
     logger = logging.getLogger("collect")
+    if args.trigger:
+        from src.scheduler import request_run
+        request_run(DAEMON_TRIGGER_DIR, args.trigger)
+        logger.info(f"{args.trigger} の実行を常駐プロセスに要求しました")
+        return
     logger.info(f"=== 収集開始: mode={args.mode} ===")
 
-    if not SUPABASE_URL or SUPABASE_URL == "YOUR_SUPABASE_URL_HERE":
+    if STORAGE_BACKEND == "supabase" and (not SUPABASE_URL or SUPABASE_URL == "YOUR_SUPABASE_URL_HERE"):
         logging.getLogger("collect").error(
             "SUPABASE_URL/SUPABASE_KEY が設定されていません。config/.env を確認してください。"
         )
         sys.exit(1)
 
-    db = Database(SUPABASE_URL, SUPABASE_KEY)
+    profiler = None
+    if args.profile:
+        from src.profiling import start_run_profiler
+        profiler = start_run_profiler(args.profile, args.mode)
+
+    db = open_storage(STORAGE_BACKEND, SUPABASE_URL, SUPABASE_KEY, LOCAL_DB_PATH, WRITE_SPOOL_DIR)
     db.ensure_schema()
 
+    if args.mode == "daemon":
+        # 計測値の書き出しはジョブごとに run_daemon の中で行う
+        try:
+            run_daemon(db, load_channel_ids(CHANNELS_FILE, CHANNEL_ID))
+        finally:
+            db.close()
+        logger.info("=== 常駐を終了しました ===")
+        return
+
+    success = False
     try:
+        # 前回実行で送信できなかった書き込みを先に再送
+        with metrics.stage("spool_flush"):
+            db.flush_pending()
+        channel_ids = load_channel_ids(CHANNELS_FILE, CHANNEL_ID)
         if args.mode == "daily":
-            collect_daily(db)
+            collect_daily(db, channel_ids, resume=args.resume)
         elif args.mode == "recent":
-            collect_recent(db)
+            collect_recent(db, channel_ids)
+        success = True
     except Exception as e:
         logger.error(f"収集中にエラーが発生: {e}", exc_info=True)
         sys.exit(1)
     finally:
-        db.close()
+        # spool に溜まった分はここで送られるので、その書き込みも計測に含める
+        with metrics.stage("close"):
+            db.close()
+        metrics.export(args.mode, METRICS_HISTORY_DIR, METRICS_TEXTFILE_DIR, success=success)
+        if profiler is not None:
+            profiler.close()
 
     logger.info(f"=== 収集完了: mode={args.mode} ===")
 
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""スナップショットの履歴を圧縮し、削減量を報告
+
+video_snapshots: 既存履歴を「変化した行とキーフレームだけ」に圧縮する。
+    SNAPSHOT_STORAGE = "changes" に切り替える前後に一度実行する（Supabase では migrations/004 が必要）。
+    圧縮後も日付ごとの値は video_snapshots_filled() で復元できる。
+scraped_snapshots: 保持期間を過ぎた生データを時間集計へ、さらに古い時間集計を日集計へまとめる。
+    スクレイピングのたびに実行する（Supabase では migrations/005 が必要）。
+
+使い方:
+    python scripts/compact_snapshots.py                    # キーフレーム間隔は SNAPSHOT_KEYFRAME_DAYS
+    python scripts/compact_snapshots.py --keyframe-days 14
+    python scripts/compact_snapshots.py --table scraped_snapshots   # 保持期間は SCRAPE_*_RETENTION_DAYS
+    python scripts/compact_snapshots.py --table scraped_snapshots --raw-days 7 --hourly-days 30
+"""
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.settings import (
+    LOG_PATH, SUPABASE_URL, SUPABASE_KEY, STORAGE_BACKEND, LOCAL_DB_PATH, WRITE_SPOOL_DIR,
+    SNAPSHOT_KEYFRAME_DAYS, SCRAPE_RAW_RETENTION_DAYS, SCRAPE_HOURLY_RETENTION_DAYS,
+)
+from src.compaction import scrape_retention_cutoffs
+from src.storage import open_storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="スナップショットの圧縮")
+    parser.add_argument(
+        "--table", choices=["video_snapshots", "scraped_snapshots"], default="video_snapshots",
+        help="圧縮するテーブル",
+    )
+    parser.add_argument(
+        "--keyframe-days", type=int, default=SNAPSHOT_KEYFRAME_DAYS,
+        help="video_snapshots: 値が変わらなくても行を残す間隔（日）",
+    )
+    parser.add_argument(
+        "--raw-days", type=int, default=SCRAPE_RAW_RETENTION_DAYS,
+        help="scraped_snapshots: 生データを残す日数",
+    )
+    parser.add_argument(
+        "--hourly-days", type=int, default=SCRAPE_HOURLY_RETENTION_DAYS,
+        help="scraped_snapshots: 時間集計を残す日数（これより古いものは日集計）",
+    )
+    args = parser.parse_args()
+
+    LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        handlers=[
+            logging.FileHandler(str(LOG_PATH), encoding="utf-8"),
+            logging.StreamHandler(),
+        ],
+    )
+    logger = logging.getLogger("compact")
+
+    if STORAGE_BACKEND == "supabase" and (not SUPABASE_URL or SUPABASE_URL == "YOUR_SUPABASE_URL_HERE"):
+        logger.error("SUPABASE_URL/SUPABASE_KEY が設定されていません。config/.env を確認してください。")
+        sys.exit(1)
+
+    db = open_storage(STORAGE_BACKEND, SUPABASE_URL, SUPABASE_KEY, LOCAL_DB_PATH, WRITE_SPOOL_DIR)
+    db.ensure_schema()
+
+    try:
+        if args.table == "video_snapshots":
+            report = db.compact_video_snapshots(args.keyframe_days)
+        else:
+            raw_before, hourly_before = scrape_retention_cutoffs(args.raw_days, args.hourly_days)
+            report = db.compact_scraped_snapshots(raw_before, hourly_before)
+    except Exception as e:
+        logger.error(f"圧縮中にエラーが発生: {e}", exc_info=True)
+        sys.exit(1)
+    finally:
+        db.close()
+
+    if args.table == "video_snapshots" and report["rows_before"]:
+        logger.info(
+            f"video_snapshots: {report['rows_before']:,} → {report['rows_after']:,} 行"
+            f"（{report['rows_deleted'] / report['rows_before']:.1%} 削減）"
+        )
+    elif args.table == "scraped_snapshots":
+        logger.info(
+            f"scraped_snapshots: 生データ {report['raw_compacted']:,} 行を時間集計へ、"
+            f"時間集計 {report['hourly_compacted']:,} 行を日集計へ移動"
+            f"（残り 生 {report['raw_rows']:,} / 時間 {report['hourly_rows']:,} / 日 {report['daily_rows']:,} 行）"
+        )
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""video_snapshots から成長指標（日次増分・成長率・経過日数・パーセンタイル帯）を再計算
+
+使い方:
+    python scripts/compute_growth.py            # 直近3日分の指標とパーセンタイル帯を更新
+    python scripts/compute_growth.py --full     # 全期間の指標を書き直す
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.settings import (
+    LOG_PATH, SUPABASE_URL, SUPABASE_KEY, STORAGE_BACKEND, LOCAL_DB_PATH, WRITE_SPOOL_DIR,
+)
+from src.analytics import refresh_growth_tables
+from src.storage import open_storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="成長指標の再計算")
+    parser.add_argument("--full", action="store_true", help="全期間の指標を書き直す")
+    parser.add_argument("--days", type=int, default=3, help="書き込む直近日数（--full 指定時は無視）")
+    parser.add_argument("--max-days", type=int, default=365, help="パーセンタイル帯を計算する経過日数の上限")
+    args = parser.parse_args()
+
+    LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        handlers=[
+            logging.FileHandler(str(LOG_PATH), encoding="utf-8"),
+            logging.StreamHandler(),
+        ],
+    )
+    logger = logging.getLogger("growth")
+
+    if STORAGE_BACKEND == "supabase" and (not SUPABASE_URL or SUPABASE_URL == "YOUR_SUPABASE_URL_HERE"):
+        logger.error("SUPABASE_URL/SUPABASE_KEY が設定されていません。config/.env を確認してください。")
+        sys.exit(1)
+
+    db = open_storage(STORAGE_BACKEND, SUPABASE_URL, SUPABASE_KEY, LOCAL_DB_PATH, WRITE_SPOOL_DIR)
+    db.ensure_schema()
+
+    since = None if args.full else (datetime.utcnow() - timedelta(days=args.days)).strftime("%Y-%m-%d")
+    try:
+        written = refresh_growth_tables(db, since_date=since, max_days=args.max_days)
+        logger.info(f"成長指標を更新: {written}")
+    except Exception as e:
+        logger.error(f"成長指標の計算中にエラーが発生: {e}", exc_info=True)
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
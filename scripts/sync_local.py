@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""ローカルDB（STORAGE_BACKEND=sqlite）に溜めたデータを Supabase へ一括同期
+
+使い方:
+    python scripts/sync_local.py
+"""
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.settings import LOG_PATH, LOCAL_DB_PATH, SUPABASE_URL, SUPABASE_KEY
+from src.storage import open_storage
+
+
+def main():
+    LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        handlers=[
+            logging.FileHandler(str(LOG_PATH), encoding="utf-8"),
+            logging.StreamHandler(),
+        ],
+    )
+    logger = logging.getLogger("sync")
+
+    if not SUPABASE_URL or SUPABASE_URL == "YOUR_SUPABASE_URL_HERE":
+        logger.error("SUPABASE_URL/SUPABASE_KEY が設定されていません。config/.env を確認してください。")
+        sys.exit(1)
+
+    local = open_storage("sqlite", local_path=LOCAL_DB_PATH)
+    local.ensure_schema()
+    remote = open_storage("supabase", SUPABASE_URL, SUPABASE_KEY)
+    remote.ensure_schema()
+
+    try:
+        synced = local.sync_to(remote)
+        logger.info(f"同期完了: {sum(synced.values())} 行")
+    except Exception as e:
+        logger.error(f"同期中にエラーが発生: {e}", exc_info=True)
+        sys.exit(1)
+    finally:
+        local.close()
+        remote.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from src.storage import Storage
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (10, 25, 50, 75, 90)
+LOAD_CHUNK_ROWS = 100_000
+
+
+@dataclass
+class SnapshotArrays:
+    """video_snapshots の列配列（(video, day) 順に整列済み）"""
+    video_ids: np.ndarray  # 動画IDの一覧（video の添字で参照）
+    video: np.ndarray  # int32: video_ids への添字
+    day: np.ndarray  # int64: 1970-01-01 からの日数
+    views: np.ndarray  # int64
+
+
+@dataclass
+class GrowthMetrics:
+    video: np.ndarray
+    day: np.ndarray
+    views: np.ndarray
+    days_since_publish: np.ndarray  # int64（公開日不明は -1）
+    daily_view_delta: np.ndarray  # float64: 前回スナップショットからの1日あたり増分（先頭行は NaN）
+    view_growth_rate: np.ndarray  # float64: 前回比の1日あたり成長率（先頭行・前回0は NaN）
+
+
+@dataclass
+class PercentileBands:
+    days_since_publish: np.ndarray
+    video_count: np.ndarray
+    values: np.ndarray  # shape (len(days_since_publish), len(PERCENTILES))
+
+
+def _to_days(dates: list[str]) -> np.ndarray:
+    """'YYYY-MM-DD...' 文字列を日単位のエポック日数に変換"""
+    return np.array([d[:10] for d in dates], dtype="datetime64[D]").astype(np.int64)
+
+
+def load_snapshot_arrays(rows: Iterable[dict]) -> SnapshotArrays:
+    """スナップショット行を LOAD_CHUNK_ROWS 行ずつ列配列に変換して結合する"""
+    index: dict[str, int] = {}
+    chunks = []
+    video_chunk, date_chunk, view_chunk = [], [], []
+
+    def flush_chunk():
+        if video_chunk:
+            chunks.append((
+                np.array(video_chunk, dtype=np.int32),
+                _to_days(date_chunk),
+                np.array(view_chunk, dtype=np.int64),
+            ))
+            video_chunk.clear()
+            date_chunk.clear()
+            view_chunk.clear()
+
+    for row in rows:
+        video_chunk.append(index.setdefault(row["video_id"], len(index)))
+        date_chunk.append(row["collected_date"])
+        view_chunk.append(row["view_count"] or 0)
+        if len(video_chunk) >= LOAD_CHUNK_ROWS:
+            flush_chunk()
+    flush_chunk()
+
+    if chunks:
+        video, day, views = (np.concatenate(cols) for cols in zip(*chunks))
+    else:
+        video = np.empty(0, dtype=np.int32)
+        day = np.empty(0, dtype=np.int64)
+        views = np.empty(0, dtype=np.int64)
+
+    order = np.lexsort((day, video))
+    return SnapshotArrays(
+        video_ids=np.array(list(index), dtype=object),
+        video=video[order],
+        day=day[order],
+        views=views[order],
+    )
+
+
+def fill_daily(snaps: SnapshotArrays, checked_dates: dict[str, str] | None = None) -> SnapshotArrays:
+    """各動画の系列を最初の行から1日刻みに埋める（欠けた日は直前の行と同じ値）
+
+    SNAPSHOT_STORAGE = "changes" や圧縮後の video_snapshots は値が変わった日とキーフレームしか行が無いため、
+    video_snapshots_filled() と同じく「その日以前で最も新しい行」で日ごとの値を復元してから指標を計算する。
+    checked_dates（video_id → 値を最後に確認した日）があれば、最後の行からその日まで延ばす。
+    """
+    n = len(snaps.video)
+    if n == 0:
+        return snaps
+    is_last = np.append(snaps.video[1:] != snaps.video[:-1], True)
+    checked = np.array(
+        [np.datetime64(checked_dates[v][:10], "D").astype(np.int64) if checked_dates and checked_dates.get(v) else -1
+         for v in snaps.video_ids],
+        dtype=np.int64,
+    )
+    # 各行が受け持つ日数 = 次の行（同じ動画の最終行なら確認日の翌日）までの日数
+    next_day = np.empty(n, dtype=np.int64)
+    next_day[:-1] = snaps.day[1:]
+    next_day[is_last] = np.maximum(snaps.day[is_last], checked[snaps.video[is_last]]) + 1
+    span = next_day - snaps.day
+    offset = np.arange(span.sum()) - np.repeat(np.cumsum(span) - span, span)
+    return SnapshotArrays(
+        video_ids=snaps.video_ids,
+        video=np.repeat(snaps.video, span),
+        day=np.repeat(snaps.day, span) + offset,
+        views=np.repeat(snaps.views, span),
+    )
+
+
+def compute_growth(snaps: SnapshotArrays, published_at: dict[str, str]) -> GrowthMetrics:
+    """日次増分・成長率・公開からの経過日数を全動画まとめて計算"""
+    n = len(snaps.video)
+    delta = np.full(n, np.nan)
+    rate = np.full(n, np.nan)
+    if n > 1:
+        # 隣接行が同じ動画のときだけ差分を取る（スナップショットの欠測日は経過日数で割って均す）
+        same = snaps.video[1:] == snaps.video[:-1]
+        gap = np.where(same, snaps.day[1:] - snaps.day[:-1], 1)
+        prev = snaps.views[:-1].astype(np.float64)
+        per_day = (snaps.views[1:] - snaps.views[:-1]) / gap
+        delta[1:] = np.where(same, per_day, np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate[1:] = np.where(same & (prev > 0), per_day / prev, np.nan)
+
+    publish_day = np.array(
+        [np.datetime64(published_at[v][:10], "D").astype(np.int64) if published_at.get(v) else -1
+         for v in snaps.video_ids],
+        dtype=np.int64,
+    ) if len(snaps.video_ids) else np.empty(0, dtype=np.int64)
+    video_publish = publish_day[snaps.video] if n else np.empty(0, dtype=np.int64)
+    days_since = np.where(video_publish >= 0, snaps.day - video_publish, -1)
+
+    return GrowthMetrics(
+        video=snaps.video,
+        day=snaps.day,
+        views=snaps.views,
+        days_since_publish=days_since,
+        daily_view_delta=delta,
+        view_growth_rate=rate,
+    )
+
+
+def compute_percentile_bands(metrics: GrowthMetrics, max_days: int = 365) -> PercentileBands:
+    """公開からの経過日数ごとに、全動画の累計再生数のパーセンタイル帯を計算（線形補間）"""
+    mask = (metrics.days_since_publish >= 0) & (metrics.days_since_publish <= max_days)
+    dsp = metrics.days_since_publish[mask]
+    views = metrics.views[mask].astype(np.float64)
+    if len(dsp) == 0:
+        return PercentileBands(np.empty(0, np.int64), np.empty(0, np.int64), np.empty((0, len(PERCENTILES))))
+
+    # 経過日数ごとに再生数を昇順に並べ、各グループ内の順位から分位点を一括で求める
+    order = np.lexsort((views, dsp))
+    dsp, views = dsp[order], views[order]
+    groups, starts, counts = np.unique(dsp, return_index=True, return_counts=True)
+
+    q = np.array(PERCENTILES, dtype=np.float64) / 100
+    pos = q[None, :] * (counts[:, None] - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    frac = pos - lo
+    values = views[starts[:, None] + lo] * (1 - frac) + views[starts[:, None] + hi] * frac
+    return PercentileBands(days_since_publish=groups, video_count=counts, values=values)
+
+
+def _nan_to_none(values: np.ndarray) -> list:
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+def growth_metric_rows(
+    snaps: SnapshotArrays, metrics: GrowthMetrics, since_date: str | None = None
+) -> Iterator[list[dict]]:
+    """video_growth_metrics の行を LOAD_CHUNK_ROWS 行ずつ返す（since_date 以降のみ）"""
+    mask = np.ones(len(metrics.day), dtype=bool)
+    if since_date:
+        mask = metrics.day >= np.datetime64(since_date, "D").astype(np.int64)
+    idx = np.flatnonzero(mask)
+    for i in range(0, len(idx), LOAD_CHUNK_ROWS):
+        sel = idx[i:i + LOAD_CHUNK_ROWS]
+        dates = metrics.day[sel].astype("datetime64[D]").astype(str)
+        yield [
+            {
+                "video_id": video_id,
+                "collected_date": date,
+                "days_since_publish": dsp if dsp >= 0 else None,
+                "view_count": views,
+                "daily_view_delta": delta,
+                "view_growth_rate": rate,
+            }
+            for video_id, date, dsp, views, delta, rate in zip(
+                snaps.video_ids[metrics.video[sel]],
+                dates,
+                metrics.days_since_publish[sel].tolist(),
+                metrics.views[sel].tolist(),
+                _nan_to_none(metrics.daily_view_delta[sel]),
+                _nan_to_none(metrics.view_growth_rate[sel]),
+            )
+        ]
+
+
+def percentile_band_rows(bands: PercentileBands) -> list[dict]:
+    now = datetime.utcnow().isoformat()
+    return [
+        {
+            "days_since_publish": int(d),
+            "video_count": int(c),
+            **{f"p{p}": float(v) for p, v in zip(PERCENTILES, values)},
+            "updated_at": now,
+        }
+        for d, c, values in zip(bands.days_since_publish, bands.video_count, bands.values)
+    ]
+
+
+def refresh_growth_tables(db: Storage, since_date: str | None = None, max_days: int = 365) -> dict[str, int]:
+    """スナップショットを読み込んで指標を再計算し、派生テーブルに書き込む
+
+    値が変わった日しか行が無い系列も fill_daily() で日ごとに補完してから計算する。
+    増分の計算には前回スナップショットが必要なため全期間を読み込み、
+    video_growth_metrics には since_date 以降の行だけを書く（None なら全行）。
+    パーセンタイル帯は毎回全体を書き直す。
+    """
+    snaps = load_snapshot_arrays(db.iter_video_snapshots())
+    logger.info(f"{len(snaps.video):,} 行 / {len(snaps.video_ids):,} 動画のスナップショットを読み込み")
+    checked = {vid: row["checked_date"] for vid, row in db.get_latest_stats().items() if row.get("checked_date")}
+    snaps = fill_daily(snaps, checked)
+    logger.info(f"日ごとに補完して {len(snaps.video):,} 行")
+
+    metrics = compute_growth(snaps, db.get_video_published_at())
+    written = 0
+    for rows in growth_metric_rows(snaps, metrics, since_date):
+        db.write_rows("video_growth_metrics", rows)
+        written += len(rows)
+
+    band_rows = percentile_band_rows(compute_percentile_bands(metrics, max_days))
+    db.write_rows("growth_percentile_bands", band_rows)
+    return {"video_growth_metrics": written, "growth_percentile_bands": len(band_rows)}
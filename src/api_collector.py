@@ -1,37 +1,269 @@
+import hashlib
 import json
 import logging
 import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+from zoneinfo import ZoneInfo
 
-from googleapiclient.discovery import build
+from googleapiclient.discovery import Resource, build, build_from_document
+import httplib2
 from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+from googleapiclient.version import __version__ as GOOGLEAPICLIENT_VERSION
 
+from src.metrics import metrics
 from src.models import ChannelSnapshot, ChannelMetadata, VideoMetadata, VideoSnapshot
+from src.retry import PERMANENT, TRANSIENT, Failure, Retrier, RetryPolicy, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
+# channels.list / videos.list は part の数に関わらず1回1ユニット
+CHANNEL_STATS_PART = "statistics"
+CHANNEL_METADATA_PART = "snippet,brandingSettings"
+CHANNEL_UPLOADS_PART = "contentDetails"
+VIDEO_METADATA_PART = "snippet,contentDetails"
+VIDEO_STATS_PART = "statistics"
+
+# クライアント生成に使うディスカバリ文書のリソース（これ以外は読み込まない）
+DISCOVERY_RESOURCES = ("channels", "playlistItems", "videos")
+
+# 403 のうち、そのキーの当日分のクォータが尽きたことを表す reason（別のキーに切り替えれば続けられる）
+QUOTA_EXCEEDED_REASONS = {"quotaExceeded", "dailyLimitExceeded"}
+# 403 のうち、短時間のリクエスト数の制限で、待てば通る reason
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+API_RETRY_POLICY = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=32.0)
+
+
+@dataclass
+class VideoBatch:
+    """videos.list 1回分の結果（index は plan_video_requests の計画上の位置）"""
+    index: int
+    metadata: list[VideoMetadata] = field(default_factory=list)
+    snapshots: list[VideoSnapshot] = field(default_factory=list)
+
 
 class QuotaExhaustedError(Exception):
     pass
 
 
+# 状態ファイルを複数の QuotaTracker から読み書きするためのロック
+_quota_state_lock = threading.Lock()
+# 使用量を状態ファイルへ書き出す間隔（前回の保存からこのユニット数か秒数を超えたら保存する）。
+# 残りは QuotaTracker.save()（ApiCollector.close()）で書き出す
+QUOTA_SAVE_UNITS = 100
+QUOTA_SAVE_SECONDS = 30.0
+
+
+def quota_day(now: datetime | None = None) -> str:
+    """クォータ日（YouTube Data API のクォータは太平洋時間の0時にリセットされる）"""
+    now = now or datetime.now(ZoneInfo("UTC"))
+    return now.astimezone(ZoneInfo("America/Los_Angeles")).strftime("%Y-%m-%d")
+
+
 class QuotaTracker:
-    def __init__(self, daily_limit: int = 10000):
+    """API キー1つ分のクォータ使用量
+
+    state_path を指定すると使用量をクォータ日ごとにファイルへ保存し、
+    同じ日の後続の実行は前回までの使用量から数え始める。
+    保存は QUOTA_SAVE_UNITS / QUOTA_SAVE_SECONDS ごとと、警告・上限の閾値を越えたとき、save() を呼んだときに行う。
+    """
+
+    def __init__(self, daily_limit: int = 10000, state_path: Path | None = None, key_name: str = "default"):
         self.daily_limit = daily_limit
-        self.used = 0
+        self.state_path = Path(state_path) if state_path else None
+        self.key_name = key_name
+        self.day = quota_day()
+        self.used = self._load_used()
+        self._saved_used = self.used
+        self._saved_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _read_state(self) -> dict:
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _load_used(self) -> int:
+        if self.state_path is None:
+            return 0
+        with _quota_state_lock:
+            state = self._read_state()
+        if state.get("day") != self.day:
+            return 0
+        return int(state.get("keys", {}).get(self.key_name, 0))
+
+    def _save_used(self):
+        if self.state_path is None:
+            return
+        with _quota_state_lock:
+            state = self._read_state()
+            if state.get("day") != self.day:
+                state = {"day": self.day, "keys": {}}
+            state.setdefault("keys", {})[self.key_name] = self.used
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_path.with_suffix(self.state_path.suffix + ".tmp")
+            tmp.write_text(json.dumps(state), encoding="utf-8")
+            tmp.replace(self.state_path)
+        self._saved_used = self.used
+        self._saved_at = time.monotonic()
+
+    def _save_due(self, before: int) -> bool:
+        if self.used - self._saved_used >= QUOTA_SAVE_UNITS:
+            return True
+        if time.monotonic() - self._saved_at >= QUOTA_SAVE_SECONDS:
+            return True
+        # 警告・上限の閾値を越えたときは、他の実行がすぐ参照できるよう保存する
+        return any(before < limit <= self.used for limit in (self.daily_limit * 0.9, self.daily_limit))
 
     def consume(self, units: int):
-        self.used += units
-        if self.used > self.daily_limit * 0.9:
-            logger.warning(f"API quota at {self.used}/{self.daily_limit}")
-        if self.used >= self.daily_limit:
-            raise QuotaExhaustedError(f"Daily quota exhausted: {self.used}")
+        # 並列取得時も加算と判定を一貫させるためロック内で確定させる
+        with self._lock:
+            today = quota_day()
+            new_day = today != self.day
+            if new_day:
+                # 太平洋時間の0時をまたいだらリセット（新しい日の状態はすぐ保存する）
+                self.day = today
+                self.used = 0
+            before = self.used
+            self.used += units
+            used = self.used
+            if new_day or self._save_due(before):
+                self._save_used()
+        metrics.add_quota(units, self.key_name)
+        if used > self.daily_limit * 0.9:
+            logger.warning(f"API quota at {used}/{self.daily_limit} ({self.key_name})")
+        if used >= self.daily_limit:
+            raise QuotaExhaustedError(f"Daily quota exhausted: {used} ({self.key_name})")
+
+    def exhaust(self):
+        """API が quotaExceeded を返したキーを、このクォータ日はもう使わないよう使い切った扱いにする"""
+        with self._lock:
+            self.used = max(self.used, self.daily_limit)
+            self._save_used()
+
+    def save(self):
+        """前回の保存以降の使用量を状態ファイルへ書き出す"""
+        with self._lock:
+            if self.used != self._saved_used:
+                self._save_used()
 
     @property
     def remaining(self) -> int:
         return self.daily_limit - self.used
 
 
+def api_key_name(api_key: str) -> str:
+    """状態ファイル・ログ・計測値に載せるキーの識別名（キーそのものは書き出さない）"""
+    return "key-" + hashlib.sha256(api_key.encode()).hexdigest()[:8]
+
+
+@dataclass
+class ApiKey:
+    """QuotaPool に登録する API キー1つ分のクライアントとクォータ"""
+    name: str
+    youtube: Resource
+    quota: QuotaTracker
+
+
+class QuotaPool:
+    """複数の API キーのクォータをまとめて扱う
+
+    リクエストごとに残量の最も多いキーを選ぶため、使用量はキー間でほぼ均等になる。
+    キーが上限に達するか API が quotaExceeded を返すと残りのキーに切り替え、
+    全キーを使い切ったときだけ acquire() が QuotaExhaustedError を送出する。
+    used / daily_limit / remaining は全キーの合計。
+    """
+
+    def __init__(self, keys: list[ApiKey]):
+        self.keys = keys
+        self._lock = threading.Lock()
+
+    @property
+    def used(self) -> int:
+        return sum(key.quota.used for key in self.keys)
+
+    @property
+    def daily_limit(self) -> int:
+        return sum(key.quota.daily_limit for key in self.keys)
+
+    @property
+    def remaining(self) -> int:
+        return sum(max(key.quota.remaining, 0) for key in self.keys)
+
+    def acquire(self, units: int = 1) -> ApiKey:
+        """次のリクエストに使うキー（残量の最も多いもの）を選び、units ユニットを先に差し引く
+
+        選択と加算を同じロック内で行うため、並列のワーカーが同じキーの最後の残りを取り合って上限を超えることはない。
+        API は失敗したリクエストにもクォータを課すため、差し引いた分はリクエストが失敗しても戻さない。
+        このリクエストでキーが上限に達しても例外にはしない（次の acquire() で別のキーに切り替わる）。
+        """
+        with self._lock:
+            key = max(self.keys, key=lambda k: k.quota.remaining)
+            if key.quota.remaining < units:
+                raise QuotaExhaustedError(f"Daily quota exhausted on all {len(self.keys)} key(s): {self.used}")
+            try:
+                key.quota.consume(units)
+            except QuotaExhaustedError:
+                if self.remaining > 0:
+                    logger.warning(f"API key {key.name} reached its daily quota; switching to the remaining keys")
+        return key
+
+    def save(self):
+        for key in self.keys:
+            key.quota.save()
+
+    def mark_exhausted(self, key: ApiKey):
+        logger.warning(f"API key {key.name} returned quotaExceeded; switching to the remaining keys")
+        key.quota.exhaust()
+
+    def usage_text(self) -> str:
+        """合計の使用量と、キーが複数ならキーごとの内訳"""
+        text = f"{self.used}/{self.daily_limit}"
+        if len(self.keys) > 1:
+            text += "（" + ", ".join(f"{k.name} {k.quota.used}/{k.quota.daily_limit}" for k in self.keys) + "）"
+        return text
+
+
+def _error_reasons(error: HttpError) -> set[str]:
+    try:
+        body = json.loads(error.content)
+        return {detail.get("reason") for detail in body["error"].get("errors", [])}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return set()
+
+
+def _is_quota_exceeded(error: HttpError) -> bool:
+    return error.resp.status == 403 and bool(_error_reasons(error) & QUOTA_EXCEEDED_REASONS)
+
+
+def classify_api_error(error: BaseException, idempotent: bool = True) -> Failure:
+    """5xx・429・403 rateLimitExceeded と接続エラーは再試行する（list 系のみなので常に冪等）
+
+    クォータ超過（403 quotaExceeded・QuotaExhaustedError）は再試行しない。
+    """
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        retry_after = parse_retry_after(error.resp.get("retry-after"))
+        if status == 429 or status >= 500:
+            return Failure(True, retry_after)
+        if status == 403 and _error_reasons(error) & RATE_LIMIT_REASONS:
+            return Failure(True, retry_after)
+        return PERMANENT
+    if isinstance(error, (OSError, httplib2.HttpLib2Error)):
+        # ConnectionResetError・タイムアウト・名前解決の失敗など
+        return TRANSIENT
+    return PERMANENT
+
+
 def _parse_duration(duration_str: str) -> int:
     """ISO 8601 duration (PT1H2M3S) を秒に変換"""
     match = re.match(r"PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?", duration_str or "")
@@ -43,150 +275,469 @@ def _parse_duration(duration_str: str) -> int:
     return hours * 3600 + minutes * 60 + seconds
 
 
+def _merge_parts(*parts: str) -> str:
+    """カンマ区切りの part を重複なく順序を保って結合"""
+    merged = []
+    for part in parts:
+        for name in part.split(","):
+            if name and name not in merged:
+                merged.append(name)
+    return ",".join(merged)
+
+
+def plan_video_requests(
+    stats_ids: list[str], metadata_ids: list[str] = ()
+) -> list[tuple[str, list[str]]]:
+    """動画ごとに必要な part を判定し、videos.list の呼び出しを最小回数にまとめる
+
+    メタデータが必要な動画を先頭に並べて50件ずつ区切り、各バッチには
+    そのバッチ内の動画が必要とする part の和集合を指定する。
+    クォータ切れで打ち切られても新規動画の登録が優先される。
+    """
+    stats_set = set(stats_ids)
+    metadata_set = set(metadata_ids)
+    ordered = list(dict.fromkeys([*metadata_ids, *stats_ids]))
+
+    plan = []
+    for i in range(0, len(ordered), 50):
+        batch = ordered[i:i + 50]
+        needed = []
+        if any(vid in metadata_set for vid in batch):
+            needed.append(VIDEO_METADATA_PART)
+        if any(vid in stats_set for vid in batch):
+            needed.append(VIDEO_STATS_PART)
+        plan.append((_merge_parts(*needed), batch))
+    return plan
+
+
+def _parse_channel_snapshot(item: dict, now: datetime) -> ChannelSnapshot:
+    stats = item["statistics"]
+    return ChannelSnapshot(
+        channel_id=item["id"],
+        subscriber_count=int(stats.get("subscriberCount", 0)),
+        total_view_count=int(stats.get("viewCount", 0)),
+        video_count=int(stats.get("videoCount", 0)),
+        collected_at=now.isoformat(),
+        collected_date=now.strftime("%Y-%m-%d"),
+    )
+
+
+def _parse_channel_metadata(item: dict, now: datetime) -> ChannelMetadata:
+    snippet = item["snippet"]
+    branding = item.get("brandingSettings", {})
+
+    # アイコンURL（高解像度を優先）
+    thumbnails = snippet.get("thumbnails", {})
+    thumb_url = (
+        thumbnails.get("high", {}).get("url")
+        or thumbnails.get("default", {}).get("url", "")
+    )
+
+    # バナーURL
+    banner_url = branding.get("image", {}).get("bannerExternalUrl", "")
+
+    return ChannelMetadata(
+        channel_id=item["id"],
+        title=snippet.get("title", ""),
+        thumbnail_url=thumb_url,
+        banner_url=banner_url,
+        updated_at=now.isoformat(),
+    )
+
+
+def _parse_uploads_playlist_id(item: dict) -> str:
+    return item["contentDetails"]["relatedPlaylists"]["uploads"]
+
+
+def _parse_video_snapshot(item: dict, collected_at: str, collected_date: str) -> VideoSnapshot:
+    stats = item["statistics"]
+    return VideoSnapshot(
+        video_id=item["id"],
+        view_count=int(stats.get("viewCount", 0)),
+        like_count=int(stats.get("likeCount", 0)),
+        comment_count=int(stats.get("commentCount", 0)),
+        collected_at=collected_at,
+        collected_date=collected_date,
+    )
+
+
+def _parse_video_metadata(item: dict) -> VideoMetadata:
+    snippet = item["snippet"]
+    content = item["contentDetails"]
+    thumbnails = snippet.get("thumbnails", {})
+    thumb_url = (
+        thumbnails.get("maxres", {}).get("url")
+        or thumbnails.get("high", {}).get("url")
+        or thumbnails.get("default", {}).get("url", "")
+    )
+    return VideoMetadata(
+        video_id=item["id"],
+        title=snippet.get("title", ""),
+        description=snippet.get("description", ""),
+        published_at=snippet.get("publishedAt", ""),
+        duration_seconds=_parse_duration(content.get("duration", "")),
+        tags=json.dumps(snippet.get("tags", []), ensure_ascii=False),
+        category_id=snippet.get("categoryId", ""),
+        thumbnail_url=thumb_url,
+        channel_id=snippet.get("channelId"),
+    )
+
+
+def _collect_refs(node, refs: set[str]):
+    if isinstance(node, dict):
+        if "$ref" in node:
+            refs.add(node["$ref"])
+        for value in node.values():
+            _collect_refs(value, refs)
+    elif isinstance(node, list):
+        for value in node:
+            _collect_refs(value, refs)
+
+
+def _trim_discovery_doc(doc: dict, resources: tuple[str, ...]) -> dict:
+    """ディスカバリ文書を指定リソースと、それが参照するスキーマだけに絞る"""
+    trimmed = dict(doc)
+    trimmed["resources"] = {name: doc["resources"][name] for name in resources}
+
+    schemas = doc.get("schemas", {})
+    keep: set[str] = set()
+    pending: set[str] = set()
+    _collect_refs(trimmed["resources"], pending)
+    _collect_refs(doc.get("parameters", {}), pending)
+    while pending:
+        name = pending.pop()
+        if name in keep or name not in schemas:
+            continue
+        keep.add(name)
+        _collect_refs(schemas[name], pending)
+    trimmed["schemas"] = {name: schemas[name] for name in keep}
+    return trimmed
+
+
+def load_discovery_doc(cache_path: Path | None = None) -> dict | None:
+    """YouTube Data API v3 のディスカバリ文書（使うリソースのみ）を返す
+
+    googleapiclient 同梱の静的文書を絞り込んで cache_path に保存し、次回以降はそれを読む。
+    googleapiclient のバージョンが変わったら作り直す。同梱文書が無ければ None。
+    """
+    if cache_path and cache_path.exists():
+        try:
+            cached = json.loads(cache_path.read_text(encoding="utf-8"))
+            if cached.get("googleapiclientVersion") == GOOGLEAPICLIENT_VERSION:
+                return cached["document"]
+        except (OSError, ValueError, KeyError):
+            logger.warning(f"ディスカバリ文書キャッシュを読み込めません。作り直します: {cache_path}")
+
+    from googleapiclient.discovery_cache import get_static_doc
+
+    content = get_static_doc("youtube", "v3")
+    if content is None:
+        return None
+    doc = _trim_discovery_doc(json.loads(content), DISCOVERY_RESOURCES)
+    if cache_path:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix(cache_path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"googleapiclientVersion": GOOGLEAPICLIENT_VERSION, "document": doc}), encoding="utf-8")
+        tmp.replace(cache_path)
+    return doc
+
+
 class ApiCollector:
-    def __init__(self, api_key: str, daily_quota_limit: int = 10000):
-        self.youtube = build("youtube", "v3", developerKey=api_key)
-        self.quota = QuotaTracker(daily_quota_limit)
+    """YouTube Data API v3 の呼び出し
 
-    def get_channel_stats(self, channel_id: str) -> ChannelSnapshot:
-        response = self.youtube.channels().list(
-            part="statistics",
-            id=channel_id,
-        ).execute()
-        self.quota.consume(1)
-
-        item = response["items"][0]
-        stats = item["statistics"]
-        now = datetime.utcnow()
-        return ChannelSnapshot(
-            channel_id=channel_id,
-            subscriber_count=int(stats.get("subscriberCount", 0)),
-            total_view_count=int(stats.get("viewCount", 0)),
-            video_count=int(stats.get("videoCount", 0)),
-            collected_at=now.isoformat(),
-            collected_date=now.strftime("%Y-%m-%d"),
+    api_keys に複数のキーを渡すと、キーごとのクォータ（daily_quota_limit ずつ）を QuotaPool で束ね、
+    リクエストをキー間に振り分ける。self.quota は全キー合計の使用量を返す。
+    """
+
+    def __init__(
+        self,
+        api_keys: str | list[str],
+        daily_quota_limit: int = 10000,
+        workers: int = 1,
+        quota_state_path: Path | None = None,
+        discovery_cache_path: Path | None = None,
+        api_endpoint: str | None = None,
+    ):
+        api_keys = list(dict.fromkeys([api_keys] if isinstance(api_keys, str) else api_keys))
+        if not api_keys:
+            raise ValueError("API key is required")
+        # api_endpoint は接続先のルート URL（偽 API サーバーなどに向ける場合。/youtube/v3/ は付けない）
+        client_options = {"api_endpoint": api_endpoint} if api_endpoint else None
+        doc = load_discovery_doc(discovery_cache_path)
+        keys = []
+        for api_key in api_keys:
+            if doc is not None:
+                youtube = build_from_document(doc, developerKey=api_key, client_options=client_options)
+            else:
+                youtube = build("youtube", "v3", developerKey=api_key, client_options=client_options)
+            name = api_key_name(api_key)
+            keys.append(ApiKey(name, youtube, QuotaTracker(daily_quota_limit, quota_state_path, key_name=name)))
+        self.quota = QuotaPool(keys)
+        self.workers = max(1, workers)
+        self._local = threading.local()
+        # videos.list のワーカー（常駐モードでは実行をまたいで接続ごと使い回す）
+        self._executor: ThreadPoolExecutor | None = None
+        # 全ワーカーで共有する（一時的な失敗が続いたら全体で呼び出しを止める）
+        self.retrier = Retrier("youtube_api", classify_api_error, API_RETRY_POLICY)
+
+    def _init_worker(self):
+        # httplib2.Http はスレッドセーフではないため、ワーカーごとに専用のトランスポートを持つ
+        self._local.http = build_http()
+
+    def _execute(self, request) -> dict:
+        """リクエストを実行（ワーカースレッドではスレッド専用の HTTP トランスポートを使用）
+
+        一時的な失敗は self.retrier がバックオフして再試行する。
+        """
+        # methodId は "youtube.videos.list" の形
+        op = getattr(request, "methodId", "").removeprefix("youtube.") or "request"
+        return self.retrier.call(op, lambda: request.execute(http=getattr(self._local, "http", None)))
+
+    def _call(self, resource: str, **params) -> dict:
+        """resource の list を残量のあるキーで実行する（発行前にそのキーのクォータを1ユニット差し引く）
+
+        API が quotaExceeded を返したらそのキーを使い切った扱いにして、次のキーで同じリクエストを送る。
+        """
+        while True:
+            key = self.quota.acquire()
+            try:
+                response = self._execute(getattr(key.youtube, resource)().list(**params))
+            except HttpError as e:
+                if not _is_quota_exceeded(e):
+                    raise
+                self.quota.mark_exhausted(key)
+                continue
+            return response
+
+    def _iter_video_batches(self, plan: Iterable[tuple[str, list[str]]]) -> Iterator[list[dict]]:
+        """計画に沿って videos.list を実行し、バッチ順に items を返す（workers > 1 で並列実行）
+
+        先行して発行するのは workers * 2 バッチまでで、呼び出し側が結果を受け取るまで先へ進まない。
+        """
+
+        def fetch(step: tuple[str, list[str]]) -> list[dict]:
+            part, batch = step
+            # 他のワーカーが全キーのクォータを使い切っていたら、発行前の acquire() で止まる
+            response = self._call("videos", part=part, id=",".join(batch))
+            return response.get("items", [])
+
+        if self.workers == 1:
+            for step in plan:
+                yield fetch(step)
+            return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="videos-list", initializer=self._init_worker
+            )
+        pending: deque = deque()
+        try:
+            for step in plan:
+                pending.append(self._executor.submit(fetch, step))
+                if len(pending) >= self.workers * 2:
+                    # 投入順に結果を回収して出力順を決定的にする
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # クォータ超過などで失敗・中断したら未着手のバッチは発行しない
+            for future in pending:
+                future.cancel()
+            # 発行済みのバッチは終わるまで待つ（呼び出し側の後始末より後にクォータが動かないように）
+            for future in pending:
+                if not future.cancelled():
+                    future.exception()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.quota.save()
+
+    def _fetch_channels(self, channel_ids: list[str], part: str) -> dict[str, dict]:
+        """channels.list を50件ずつ呼び、チャンネルID→item を返す（存在しないチャンネルは含まれない）"""
+        items = {}
+        for i in range(0, len(channel_ids), 50):
+            response = self._call("channels", part=part, id=",".join(channel_ids[i:i + 50]), maxResults=50)
+            items.update((item["id"], item) for item in response.get("items", []))
+        return items
+
+    def _fetch_channel(self, channel_id: str, part: str) -> dict:
+        items = self._fetch_channels([channel_id], part)
+        if channel_id not in items:
+            raise ValueError(f"Channel not found: {channel_id}")
+        return items[channel_id]
+
+    def get_channel_bundles(
+        self, channel_ids: list[str]
+    ) -> dict[str, tuple[ChannelSnapshot, ChannelMetadata, str]]:
+        """複数チャンネルの統計・メタデータ・uploads プレイリストIDを channels.list 1回につき50件ずつ取得
+
+        見つからなかったチャンネルは警告ログを出して結果から除く。順序は channel_ids に従う。
+        """
+        items = self._fetch_channels(
+            list(dict.fromkeys(channel_ids)),
+            _merge_parts(CHANNEL_STATS_PART, CHANNEL_METADATA_PART, CHANNEL_UPLOADS_PART),
         )
+        now = datetime.utcnow()
+        bundles = {}
+        for channel_id in channel_ids:
+            item = items.get(channel_id)
+            if item is None:
+                logger.warning(f"Channel not found: {channel_id}")
+                continue
+            bundles[channel_id] = (
+                _parse_channel_snapshot(item, now),
+                _parse_channel_metadata(item, now),
+                _parse_uploads_playlist_id(item),
+            )
+        return bundles
+
+    def get_channel_bundle(self, channel_id: str) -> tuple[ChannelSnapshot, ChannelMetadata, str]:
+        """統計・メタデータ・uploads プレイリストIDを1回の channels.list で取得"""
+        bundles = self.get_channel_bundles([channel_id])
+        if channel_id not in bundles:
+            raise ValueError(f"Channel not found: {channel_id}")
+        return bundles[channel_id]
+
+    def get_channel_stats(self, channel_id: str) -> ChannelSnapshot:
+        item = self._fetch_channel(channel_id, CHANNEL_STATS_PART)
+        return _parse_channel_snapshot(item, datetime.utcnow())
 
     def get_channel_metadata(self, channel_id: str) -> ChannelMetadata:
-        response = self.youtube.channels().list(
-            part="snippet,brandingSettings",
-            id=channel_id,
-        ).execute()
-        self.quota.consume(1)
-
-        item = response["items"][0]
-        snippet = item["snippet"]
-        branding = item["brandingSettings"]
-        
-        # アイコンURL（高解像度を優先）
-        thumbnails = snippet.get("thumbnails", {})
-        thumb_url = (
-            thumbnails.get("high", {}).get("url")
-            or thumbnails.get("default", {}).get("url", "")
-        )
-        
-        # バナーURL
-        banner_url = branding.get("image", {}).get("bannerExternalUrl", "")
-        
-        return ChannelMetadata(
-            channel_id=channel_id,
-            title=snippet.get("title", ""),
-            thumbnail_url=thumb_url,
-            banner_url=banner_url,
-            updated_at=datetime.utcnow().isoformat(),
-        )
+        item = self._fetch_channel(channel_id, CHANNEL_METADATA_PART)
+        return _parse_channel_metadata(item, datetime.utcnow())
 
     def get_uploads_playlist_id(self, channel_id: str) -> str:
-        response = self.youtube.channels().list(
-            part="contentDetails",
-            id=channel_id,
-        ).execute()
-        self.quota.consume(1)
-        return response["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
-
-    def get_all_video_ids(self, channel_id: str) -> list[str]:
-        """uploads プレイリスト経由で全動画IDを取得（search.listより低コスト）"""
-        playlist_id = self.get_uploads_playlist_id(channel_id)
-        video_ids = []
-        next_page_token = None
+        item = self._fetch_channel(channel_id, CHANNEL_UPLOADS_PART)
+        return _parse_uploads_playlist_id(item)
+
+    def get_uploads_playlist_ids(self, channel_ids: list[str]) -> dict[str, str]:
+        """複数チャンネルの uploads プレイリストIDを50件ずつまとめて取得（見つからないチャンネルは含まない）"""
+        items = self._fetch_channels(list(dict.fromkeys(channel_ids)), CHANNEL_UPLOADS_PART)
+        return {channel_id: _parse_uploads_playlist_id(item) for channel_id, item in items.items()}
+
+    def _iter_playlist_video_ids(
+        self,
+        playlist_id: str,
+        page_token: str | None = None,
+        on_page: Callable[[str | None], None] | None = None,
+    ):
+        """uploads プレイリストを先頭（新しい順）から1ページずつ辿って動画IDを返す
+
+        page_token を渡すとそのページから始める。on_page(次のページトークン) は
+        各ページの動画IDを返し終えた時点で呼ばれる（最終ページでは None）。
+        """
+        next_page_token = page_token
 
         while True:
-            response = self.youtube.playlistItems().list(
+            response = self._call(
+                "playlistItems",
                 part="contentDetails",
                 playlistId=playlist_id,
                 maxResults=50,
                 pageToken=next_page_token,
-            ).execute()
-            self.quota.consume(1)
+            )
 
             for item in response.get("items", []):
-                video_ids.append(item["contentDetails"]["videoId"])
+                yield item["contentDetails"]["videoId"]
 
             next_page_token = response.get("nextPageToken")
+            if on_page is not None:
+                on_page(next_page_token)
             if not next_page_token:
                 break
 
+    def get_all_video_ids(
+        self,
+        channel_id: str,
+        playlist_id: str | None = None,
+        resume: tuple[str, list[str]] | None = None,
+        on_page: Callable[[str | None, list[str]], None] | None = None,
+    ) -> list[str]:
+        """uploads プレイリスト経由で全動画IDを取得（search.listより低コスト）
+
+        resume に (ページトークン, 取得済みID) を渡すと途中のページから続ける。
+        on_page(次のページトークン, ここまでの全ID) は各ページの取得後に呼ばれる。
+        """
+        if playlist_id is None:
+            playlist_id = self.get_uploads_playlist_id(channel_id)
+        page_token, video_ids = resume if resume else (None, [])
+        video_ids = list(video_ids)
+        notify = (lambda token: on_page(token, video_ids)) if on_page else None
+        video_ids.extend(self._iter_playlist_video_ids(playlist_id, page_token, notify))
         logger.info(f"Found {len(video_ids)} videos in channel")
         return video_ids
 
-    def get_video_stats(self, video_ids: list[str]) -> list[VideoSnapshot]:
-        """50件ずつバッチで動画統計を取得"""
-        snapshots = []
+    def scan_uploads_head(
+        self,
+        channel_id: str,
+        known_ids: set[str],
+        stop_after_known: int,
+        playlist_id: str | None = None,
+    ) -> list[str]:
+        """uploads プレイリストの先頭から、既知IDが stop_after_known 件連続するまでを取得
+
+        新着動画はプレイリストの先頭に追加されるため、既知IDの連続に達した時点で
+        以降のページは取得しない。返り値には停止までに見た既知IDも含む。
+        """
+        if playlist_id is None:
+            playlist_id = self.get_uploads_playlist_id(channel_id)
+        head = []
+        known_run = 0
+        for video_id in self._iter_playlist_video_ids(playlist_id):
+            head.append(video_id)
+            known_run = known_run + 1 if video_id in known_ids else 0
+            if known_run >= stop_after_known:
+                break
+        logger.info(f"Scanned {len(head)} videos at head of uploads playlist")
+        return head
+
+    def iter_video_details(
+        self, video_ids: list[str], metadata_ids: list[str] = (), skip_batches: set[int] = frozenset()
+    ) -> Iterator[VideoBatch]:
+        """video_ids の統計と metadata_ids のメタデータを統合した videos.list で取得し、バッチごとに返す
+
+        skip_batches に含まれる番号のバッチ（前回の実行で取得・保存済み）はリクエストしない。
+        """
+        metadata_set = set(metadata_ids)
+        stats_set = set(video_ids)
         now = datetime.utcnow()
         collected_date = now.strftime("%Y-%m-%d")
         collected_at = now.isoformat()
 
-        for i in range(0, len(video_ids), 50):
-            batch = video_ids[i:i + 50]
-            response = self.youtube.videos().list(
-                part="statistics",
-                id=",".join(batch),
-            ).execute()
-            self.quota.consume(1)
+        steps = [
+            (index, step)
+            for index, step in enumerate(plan_video_requests(video_ids, metadata_ids))
+            if index not in skip_batches
+        ]
+        batches = self._iter_video_batches(step for _, step in steps)
+        for (index, _), items in zip(steps, batches):
+            batch = VideoBatch(index)
+            for item in items:
+                if item["id"] in metadata_set:
+                    batch.metadata.append(_parse_video_metadata(item))
+                if item["id"] in stats_set:
+                    batch.snapshots.append(_parse_video_snapshot(item, collected_at, collected_date))
+            yield batch
 
-            for item in response.get("items", []):
-                stats = item["statistics"]
-                snapshots.append(VideoSnapshot(
-                    video_id=item["id"],
-                    view_count=int(stats.get("viewCount", 0)),
-                    like_count=int(stats.get("likeCount", 0)),
-                    comment_count=int(stats.get("commentCount", 0)),
-                    collected_at=collected_at,
-                    collected_date=collected_date,
-                ))
+    def get_video_details(
+        self, video_ids: list[str], metadata_ids: list[str] = ()
+    ) -> tuple[list[VideoMetadata], list[VideoSnapshot]]:
+        """iter_video_details の結果をまとめて返す"""
+        metadata_list = []
+        snapshots = []
+        for batch in self.iter_video_details(video_ids, metadata_ids):
+            metadata_list.extend(batch.metadata)
+            snapshots.extend(batch.snapshots)
+        return metadata_list, snapshots
 
+    def get_video_stats(self, video_ids: list[str]) -> list[VideoSnapshot]:
+        """50件ずつバッチで動画統計を取得"""
+        _, snapshots = self.get_video_details(video_ids)
         return snapshots
 
     def get_video_metadata(self, video_ids: list[str]) -> list[VideoMetadata]:
         """50件ずつバッチで動画メタデータを取得"""
-        metadata_list = []
-
-        for i in range(0, len(video_ids), 50):
-            batch = video_ids[i:i + 50]
-            response = self.youtube.videos().list(
-                part="snippet,contentDetails",
-                id=",".join(batch),
-            ).execute()
-            self.quota.consume(1)
-
-            for item in response.get("items", []):
-                snippet = item["snippet"]
-                content = item["contentDetails"]
-                thumbnails = snippet.get("thumbnails", {})
-                thumb_url = (
-                    thumbnails.get("maxres", {}).get("url")
-                    or thumbnails.get("high", {}).get("url")
-                    or thumbnails.get("default", {}).get("url", "")
-                )
-                metadata_list.append(VideoMetadata(
-                    video_id=item["id"],
-                    title=snippet.get("title", ""),
-                    description=snippet.get("description", ""),
-                    published_at=snippet.get("publishedAt", ""),
-                    duration_seconds=_parse_duration(content.get("duration", "")),
-                    tags=json.dumps(snippet.get("tags", []), ensure_ascii=False),
-                    category_id=snippet.get("categoryId", ""),
-                    thumbnail_url=thumb_url,
-                ))
-
+        metadata_list, _ = self.get_video_details([], metadata_ids=video_ids)
         return metadata_list
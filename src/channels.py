@@ -0,0 +1,23 @@
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def load_channel_ids(path: Path, default: str) -> list[str]:
+    """チャンネル一覧ファイルを読む（1行に1つのチャンネルID、# 以降はコメント、重複は除く）
+
+    ファイルが無いか空なら default だけを返す。
+    """
+    path = Path(path)
+    if not path.exists():
+        return [default]
+    channel_ids = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        channel_id = line.split("#", 1)[0].strip()
+        if channel_id and channel_id not in channel_ids:
+            channel_ids.append(channel_id)
+    if not channel_ids:
+        logger.warning(f"{path} にチャンネルIDが無いため {default} のみ収集します")
+        return [default]
+    return channel_ids
@@ -0,0 +1,157 @@
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.api_collector import ApiCollector
+
+logger = logging.getLogger(__name__)
+
+
+class RunCheckpoint:
+    """実行途中の進捗をローカルに保存し、--resume で続きから再開するためのチェックポイント
+
+    計画（path の JSON、段階が進んだときだけ書き直す）:
+        {"started_at": ISO 8601,
+         "playlists": {channel_id: str},      # チャンネル情報の取得・保存が済んでいれば uploads プレイリストを記録
+         "channels": {channel_id: {"video_ids": [...], "new_ids": [...], "full_scan": bool}},
+                                              # 動画一覧が確定したチャンネル
+         "targets": [...]}                    # 統計を取得する動画（videos.list の計画の元）
+
+    進捗（path の隣の .progress.jsonl、1行ずつ追記する）:
+        {"channel_id": str, "page_token": str | None, "video_ids": [...]}  # 全件走査で取得した1ページ分
+        {"batch": int, "video_metadata": int, "video_snapshots": int}      # 書き込みまで済んだ videos.list バッチ
+
+    ページやバッチのたびに計画全体を書き直さないよう、進捗は追記だけにする。
+    読み込み時に進捗を再生して state の "discovery" / "completed_batches" / "written" を組み立てる。
+
+    各段階は結果を記録してから次へ進むため、再開時は記録のある段階を飛ばし、
+    同じ videos.list を二度発行しない（バッチ番号は targets と new_ids から決まる計画上の位置）。
+    """
+
+    def __init__(self, path: Path, resume: bool = False):
+        self.path = Path(path)
+        self.progress_path = self.path.with_suffix(".progress.jsonl")
+        self._lock = threading.Lock()
+        self.state: dict = {}
+        self.resumed = False
+        if resume and self.path.exists():
+            try:
+                self.state = json.loads(self.path.read_text(encoding="utf-8"))
+                self._replay_progress()
+                self.resumed = True
+            except (OSError, ValueError) as e:
+                logger.warning(f"チェックポイントを読み込めないため最初から実行します: {e}")
+        if not self.resumed:
+            self.reset()
+
+    def _replay_progress(self):
+        if not self.progress_path.exists():
+            return
+        line = ""
+        with self.progress_path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 追記の途中で落ちた最後の行は、その進捗が無かったものとして扱う
+                    logger.warning("チェックポイントの進捗の壊れた行を読み飛ばします")
+                    continue
+                self._apply(entry)
+        if line and not line.endswith("\n"):
+            # 続きの追記が壊れた行とつながらないよう改行で閉じる
+            with self.progress_path.open("a", encoding="utf-8") as f:
+                f.write("\n")
+
+    def _apply(self, entry: dict):
+        if "batch" in entry:
+            self.state.setdefault("completed_batches", []).append(entry["batch"])
+            written = self.state.setdefault("written", {"video_metadata": 0, "video_snapshots": 0})
+            written["video_metadata"] += entry["video_metadata"]
+            written["video_snapshots"] += entry["video_snapshots"]
+        else:
+            discovery = self.state.setdefault("discovery", {}).setdefault(
+                entry["channel_id"], {"page_token": None, "video_ids": []}
+            )
+            discovery["page_token"] = entry["page_token"]
+            discovery["video_ids"].extend(entry["video_ids"])
+
+    def _append(self, entry: dict):
+        self._apply(entry)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.progress_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def reset(self):
+        self.state = {"started_at": datetime.utcnow().isoformat()}
+        self.resumed = False
+        self.progress_path.unlink(missing_ok=True)
+        self.save()
+
+    def get(self, key: str, default=None):
+        return self.state.get(key, default)
+
+    def update(self, **values):
+        with self._lock:
+            self.state.update(values)
+            self._save()
+
+    def completed_batches(self) -> set[int]:
+        return set(self.state.get("completed_batches", []))
+
+    def mark_batch_done(self, index: int, metadata_count: int, snapshot_count: int):
+        """バッチの書き込み完了を記録（書き込みステージのスレッドから呼ばれる）"""
+        with self._lock:
+            self._append({"batch": index, "video_metadata": metadata_count, "video_snapshots": snapshot_count})
+
+    def record_page(self, channel_id: str, page_token: str | None, video_ids: list[str]):
+        """全件走査で取得した1ページ分の動画IDと次ページのトークンを記録（page_token が None なら最終ページ）"""
+        with self._lock:
+            self._append({"channel_id": channel_id, "page_token": page_token, "video_ids": video_ids})
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        # 書き込み途中で落ちてもチェックポイントが壊れないよう一時ファイル経由で置き換える。
+        # 進捗は追記ファイルにあるので計画だけを書く
+        plan = {k: v for k, v in self.state.items() if k not in ("discovery", "completed_batches", "written")}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(plan, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.path)
+
+    def clear(self):
+        """最後まで完了したらチェックポイントを消す"""
+        self.path.unlink(missing_ok=True)
+        self.progress_path.unlink(missing_ok=True)
+
+
+def fetch_all_video_ids(
+    api: "ApiCollector", channel_id: str, playlist_id: str, checkpoint: RunCheckpoint
+) -> list[str]:
+    """uploads プレイリストを全件取得（ページごとに進捗を記録し、再開時は続きのページから）"""
+    discovery = (checkpoint.get("discovery") or {}).get(channel_id)
+    if discovery and discovery["page_token"] is None:
+        # 最終ページまで取得済み
+        return list(discovery["video_ids"])
+    if discovery:
+        logger.info(f"動画一覧の取得を途中から再開（取得済み {len(discovery['video_ids'])} 件）")
+    # on_page は取得済み全件を渡すので、前回の記録より後ろの分だけを追記する
+    recorded = len(discovery["video_ids"]) if discovery else 0
+
+    def on_page(token: str | None, ids: list[str]):
+        nonlocal recorded
+        checkpoint.record_page(channel_id, token, ids[recorded:])
+        recorded = len(ids)
+
+    return api.get_all_video_ids(
+        channel_id,
+        playlist_id=playlist_id,
+        resume=(discovery["page_token"], list(discovery["video_ids"])) if discovery else None,
+        on_page=on_page,
+    )
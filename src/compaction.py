@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from src.models import VideoSnapshot
+
+
+def _days_between(start: str, end: str) -> int:
+    return (datetime.strptime(end[:10], "%Y-%m-%d") - datetime.strptime(start[:10], "%Y-%m-%d")).days
+
+
+def scrape_retention_cutoffs(raw_days: int, hourly_days: int, now: datetime | None = None) -> tuple[str, str]:
+    """scraped_snapshots の圧縮境界 (raw_before, hourly_before) を collected_at と同じ ISO 8601 (UTC) で返す
+
+    生データは raw_days 日前の時刻の区切り、時間集計は hourly_days 日前の日付の区切りより古いものが対象。
+    区切りに揃えるため、集計区間が実行ごとに途中で分かれることはない。
+    """
+    if raw_days < 0 or hourly_days < raw_days:
+        raise ValueError(f"0 <= raw_days <= hourly_days である必要があります: raw_days={raw_days}, hourly_days={hourly_days}")
+    now = now or datetime.utcnow()
+    raw_before = now.replace(minute=0, second=0, microsecond=0) - timedelta(days=raw_days)
+    hourly_before = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=hourly_days)
+    return raw_before.isoformat(), hourly_before.isoformat()
+
+
+def needs_snapshot_row(last: dict | None, counts: tuple, collected_date: str, keyframe_days: int) -> bool:
+    """前回保存した行 last と比べ、この値を video_snapshots に書く必要があるか
+
+    値が変わったとき、または前回の保存から keyframe_days 日以上経ったとき（キーフレーム）に書く。
+    """
+    if last is None:
+        return True
+    if (last["view_count"], last["like_count"], last["comment_count"]) != tuple(counts):
+        return True
+    return _days_between(last["collected_date"], collected_date) >= keyframe_days
+
+
+class SnapshotChangeFilter:
+    """変化した動画とキーフレームのスナップショットだけを通すフィルタ
+
+    last_rows は動画ごとの最後に保存した行（video_latest_stats の collected_date と各カウント）。
+    通した行で last_rows を更新するため、同じ実行内で同じ動画が再度来ても正しく判定できる。
+    """
+
+    def __init__(self, last_rows: dict[str, dict], keyframe_days: int):
+        self._last = last_rows
+        self.keyframe_days = keyframe_days
+
+    def __call__(self, snapshots: list[VideoSnapshot]) -> list[VideoSnapshot]:
+        kept = []
+        for snap in snapshots:
+            counts = (snap.view_count, snap.like_count, snap.comment_count)
+            if needs_snapshot_row(self._last.get(snap.video_id), counts, snap.collected_date, self.keyframe_days):
+                kept.append(snap)
+                self._last[snap.video_id] = {
+                    "collected_date": snap.collected_date,
+                    "view_count": snap.view_count,
+                    "like_count": snap.like_count,
+                    "comment_count": snap.comment_count,
+                }
+        return kept
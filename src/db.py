@@ -1,158 +1,436 @@
-from datetime import datetime
+import fcntl
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+import httpx
+from postgrest.exceptions import APIError
 from supabase import create_client, Client
 
-from src.models import ChannelSnapshot, ChannelMetadata, VideoMetadata, VideoSnapshot, ScrapedSnapshot
+from src.metrics import metrics
+from src.retry import PERMANENT, TRANSIENT, Failure, Retrier, RetryPolicy
+from src.storage import Storage, TABLES, TableSpec
+
+logger = logging.getLogger(__name__)
+
+# TIMESTAMPTZ 型の列（migrations/006）。収集側は datetime.utcnow().isoformat() の naive な UTC で持つ
+TIMESTAMP_COLUMNS = frozenset({"collected_at", "published_at", "updated_at", "bucket_start", "last_collected_at"})
+_TZ_SUFFIX = re.compile(r"(Z|[+-]\d{2}:?\d{2})$")
+
+SUPABASE_RETRY_POLICY = RetryPolicy(max_attempts=5, base_delay=0.5, max_delay=20.0)
+# リクエストが処理されずに終わったと分かるエラー（INSERT も重複させずに再送できる）
+#   429/503: 受け付けを断られた  PGRST000-003: PostgREST から DB に繋がらない
+#   08xxx: DB 接続の異常  40001/40P01: 直列化の失敗・デッドロックでロールバック済み  53300: 接続数の上限
+_NOT_PROCESSED_CODES = {"429", "503", "PGRST000", "PGRST001", "PGRST002", "PGRST003", "40001", "40P01", "53300"}
+# 処理されたかどうか分からないエラー（冪等な呼び出しだけ再送する）
+_MAYBE_PROCESSED_CODES = {"500", "502", "504", "520"}
+
+
+def _as_utc(value: str) -> str:
+    """タイムゾーンの無い ISO 8601 日時に +00:00 を付ける（DB のタイムゾーン設定に依存しないように）"""
+    if "T" in value and not _TZ_SUFFIX.search(value):
+        return value + "+00:00"
+    return value
+
+
+def _typed_row(row: dict) -> dict:
+    return {
+        k: _as_utc(v) if k in TIMESTAMP_COLUMNS and isinstance(v, str) else v
+        for k, v in row.items()
+    }
+
+
+def _dedupe_rows(table: str, rows: list[dict]) -> list[dict]:
+    """一意キーが同じ行は後勝ちで1行にまとめる（1回の upsert に同じキーが2回あるとエラーになるため）"""
+    on_conflict = TABLES[table].on_conflict
+    if on_conflict is None:
+        return rows
+    keys = on_conflict.split(",")
+    merged = {}
+    for row in rows:
+        merged[tuple(row[k] for k in keys)] = row
+    return list(merged.values())
+
+
+def classify_supabase_error(error: BaseException, idempotent: bool = True) -> Failure:
+    """一時的な失敗なら再試行する。idempotent=False（INSERT）は未処理と分かる失敗だけ再試行する"""
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return TRANSIENT  # 送信前に失敗している
+    if isinstance(error, (httpx.TransportError, OSError)):
+        return TRANSIENT if idempotent else PERMANENT
+    if isinstance(error, APIError):
+        code = str(error.code or "")
+        if code in _NOT_PROCESSED_CODES or code.startswith("08"):
+            return TRANSIENT
+        if code in _MAYBE_PROCESSED_CODES:
+            return TRANSIENT if idempotent else PERMANENT
+    return PERMANENT
+
+
+def _maybe_processed(error: BaseException) -> bool:
+    """リクエストが処理されたかどうか分からない失敗（冪等なら再送してよいが、INSERT は重複しうる）"""
+    return classify_supabase_error(error, True).retryable and not classify_supabase_error(error, False).retryable
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _quote(value) -> str:
+    """PostgREST の論理演算フィルタ用に値をダブルクォートで囲む"""
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _keyset_filter(keys: tuple[str, ...], last: dict, desc: bool) -> str:
+    """複合キー keys の並びで last より後ろの行を表す or フィルタ
+
+    Postgres の既定どおり NULL は昇順なら末尾、降順なら先頭に並ぶものとして扱う。
+    """
+    op = "lt" if desc else "gt"
+    terms = []
+    prefix: list[str] = []
+    for key in keys:
+        value = last[key]
+        after = []
+        if value is None:
+            if desc:
+                after.append(f"{key}.not.is.null")
+        else:
+            after.append(f"{key}.{op}.{_quote(value)}")
+            if not desc:
+                after.append(f"{key}.is.null")
+        for cond in after:
+            terms.append(f"and({','.join([*prefix, cond])})" if prefix else cond)
+        prefix.append(f"{key}.is.null" if value is None else f"{key}.eq.{_quote(value)}")
+    return ",".join(terms)
+
+
+class WriteSpool:
+    """書き込みを先にディスクへ追記し、後でテーブル単位にまとめて送る write-ahead spool
+
+    追記先は directory 内の JSON Lines セグメント（1行 = {"table": ..., "row": {...}}）。
+    flush() は既存セグメントを読み込み、TABLES の順（親テーブルが先）に一括で書き込んでから削除する。
+    directory は複数のプロセス（常駐・cron の collect.py・backfill.py）で共有されるため、追記とセグメントの確保は
+    directory/.lock の排他ロック下で行い、flush() は送る前にセグメントを *.flushing-<pid> へ改名して自分のものにする
+    （確保した後に他のプロセスが追記した行は新しいセグメントに入り、消されない）。
+    途中で失敗した場合は未送信分だけを新しいセグメントに書き戻すため、次回の flush() で再送される。
+    ただし一意キーの無いテーブルのチャンクが処理されたか分からない失敗をした場合、そのチャンクは書き戻さない（重複を避ける）。
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._segment: Path | None = None
+
+    def _new_segment_path(self) -> Path:
+        return self.directory / f"{time.time_ns()}-{os.getpid()}.jsonl"
+
+    @contextmanager
+    def _locked(self):
+        with open(self.directory / ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def append(self, table: str, rows: list[dict]):
+        if not rows:
+            return
+        if self._segment is None:
+            self._segment = self._new_segment_path()
+        with self._locked(), open(self._segment, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps({"table": table, "row": row}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def pending_count(self) -> int:
+        return sum(
+            1 for pattern in ("*.jsonl", "*.jsonl.flushing-*") for path in self.directory.glob(pattern)
+            for line in path.read_text(encoding="utf-8").splitlines() if line
+        )
+
+    def _claim_segments(self) -> list[Path]:
+        """送信するセグメントを改名して確保する（他のプロセスの送信中のものは除く）"""
+        suffix = f".flushing-{os.getpid()}"
+        claimed = []
+        with self._locked():
+            for path in self.directory.glob("*.jsonl"):
+                claimed.append(path.rename(path.with_name(path.name + suffix)))
+            # 送信途中で落ちたプロセスが確保したまま残したセグメントも引き取る
+            for path in self.directory.glob("*.jsonl.flushing-*"):
+                name, _, pid = path.name.rpartition(".flushing-")
+                if path in claimed or (pid.isdigit() and int(pid) != os.getpid() and _pid_alive(int(pid))):
+                    continue
+                claimed.append(path.rename(path.with_name(name + suffix)))
+        # ファイル名の先頭は作成時刻なので、名前順に読めば後に書いた行が後勝ちになる
+        return sorted(claimed)
 
+    def flush(self, write: Callable[[str, list[dict]], None], batch_size: int = 500) -> int:
+        """溜まっている全セグメントを write(table, rows) で送信し、送信した行数を返す"""
+        # 以降の append は新しいセグメントに書く
+        self._segment = None
+        segments = self._claim_segments()
+        if not segments:
+            return 0
 
-class Database:
-    def __init__(self, supabase_url: str, supabase_key: str):
+        grouped: dict[str, list[dict]] = {table: [] for table in TABLES}
+        for path in segments:
+            for line in path.read_text(encoding="utf-8").splitlines():
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 追記途中で落ちた最終行は読み飛ばす
+                    logger.warning(f"{path.name}: 壊れた行を読み飛ばしました")
+                    continue
+                grouped[entry["table"]].append(entry["row"])
+
+        chunks = []
+        for table, rows in grouped.items():
+            rows = _dedupe_rows(table, rows)
+            chunks.extend((table, rows[i:i + batch_size]) for i in range(0, len(rows), batch_size))
+
+        sent = 0
+        done = 0
+        try:
+            for table, batch in chunks:
+                write(table, batch)
+                sent += len(batch)
+                done += 1
+        except Exception as e:
+            # 未送信のチャンクだけを書き戻してから元のセグメントを消す
+            unsent = chunks[done:]
+            table, batch = chunks[done]
+            if TABLES[table].on_conflict is None and _maybe_processed(e):
+                # 一意キーの無い INSERT は、処理されたか分からない失敗の後に再送すると行が重複しうるため書き戻さない
+                logger.warning(f"{table}: 書き込まれたか分からないため {len(batch)} 行を再送しません: {e}")
+                unsent = chunks[done + 1:]
+            # 書き終えてから .jsonl に改名し、他のプロセスの flush() が書きかけを読まないようにする
+            retry_path = self._new_segment_path()
+            tmp = retry_path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for table, batch in unsent:
+                    metrics.add_retry("supabase", f"spool {table}")
+                    for row in batch:
+                        f.write(json.dumps({"table": table, "row": row}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            tmp.replace(retry_path)
+            for path in segments:
+                path.unlink()
+            raise
+
+        for path in segments:
+            path.unlink()
+        return sent
+
+
+class Database(Storage):
+    def __init__(
+        self, supabase_url: str, supabase_key: str, spool_dir: Path | None = None, page_size: int = 1000
+    ):
         self.client: Client = create_client(supabase_url, supabase_key)
+        self.spool = WriteSpool(spool_dir) if spool_dir else None
+        # PostgREST の max-rows（Supabase の既定は1000）以下にすること
+        self.page_size = page_size
+        self.retrier = Retrier("supabase", classify_supabase_error, SUPABASE_RETRY_POLICY)
 
     def ensure_schema(self):
-        """Supabaseではマイグレーションで事前にテーブルを作成するため、ここでは何もしない"""
-        pass
+        """テーブルはマイグレーションで事前に作成する。ここでは video_snapshots の月パーティションを先の月まで用意する"""
+        try:
+            created = self._rpc("ensure_video_snapshot_partitions", {})
+        except Exception as e:
+            # 作成できなくても受け皿の video_snapshots_default に書き込めるので、収集は止めない
+            logger.warning(f"video_snapshots のパーティションを用意できませんでした: {e}")
+            return
+        if created:
+            logger.info(f"video_snapshots のパーティションを {created} 件作成")
+
+    def flush(self):
+        """spool に溜まった書き込み（前回実行の未送信分を含む）を Supabase へ一括送信"""
+        if self.spool is None:
+            return
+        sent = self.spool.flush(self._send_rows)
+        if sent:
+            logger.info(f"spool から {sent} 行を書き込みました")
+
+    def flush_pending(self):
+        try:
+            self.flush()
+        except Exception as e:
+            # 行は spool に残り、次の flush で再送される
+            logger.error(f"spool の書き込みに失敗しました（次回の flush で再送）: {e}")
 
     def close(self):
-        pass
-
-    # ── チャンネルスナップショット ──
-
-    def insert_channel_snapshot(self, snap: ChannelSnapshot):
-        self.client.table("channel_snapshots").upsert(
-            {
-                "channel_id": snap.channel_id,
-                "subscriber_count": snap.subscriber_count,
-                "total_view_count": snap.total_view_count,
-                "video_count": snap.video_count,
-                "collected_date": snap.collected_date,
-                "collected_at": snap.collected_at,
-            },
-            on_conflict="channel_id,collected_date",
-        ).execute()
-
-    def insert_channel_metadata(self, meta: ChannelMetadata):
-        self.client.table("channel_metadata").upsert(
-            {
-                "channel_id": meta.channel_id,
-                "title": meta.title,
-                "thumbnail_url": meta.thumbnail_url,
-                "banner_url": meta.banner_url,
-                "updated_at": meta.updated_at,
-            },
-            on_conflict="channel_id",
-        ).execute()
+        self.flush_pending()
 
-    # ── 動画メタデータ ──
+    def write_rows(self, table: str, rows: list[dict]):
+        if self.spool is not None:
+            self.spool.append(table, rows)
+        else:
+            self._send_rows(table, rows)
 
-    def insert_video_metadata(self, meta: VideoMetadata):
-        now = datetime.utcnow().isoformat()
-        existing = (
-            self.client.table("video_metadata")
-            .select("first_seen_at")
-            .eq("video_id", meta.video_id)
-            .execute()
-        )
-        first_seen = existing.data[0]["first_seen_at"] if existing.data else now
-
-        self.client.table("video_metadata").upsert(
-            {
-                "video_id": meta.video_id,
-                "title": meta.title,
-                "description": meta.description,
-                "published_at": meta.published_at,
-                "duration_seconds": meta.duration_seconds,
-                "tags": meta.tags,
-                "category_id": meta.category_id,
-                "thumbnail_url": meta.thumbnail_url,
-                "first_seen_at": first_seen,
-                "updated_at": now,
-            },
-            on_conflict="video_id",
-        ).execute()
-
-    def insert_video_metadata_batch(self, metas: list[VideoMetadata]):
-        for m in metas:
-            self.insert_video_metadata(m)
+    def _execute(self, op: str, request, idempotent: bool = True):
+        """PostgREST へのリクエストを実行（一時的な失敗は self.retrier がバックオフして再試行）"""
+        return self.retrier.call(op, request.execute, idempotent=idempotent)
+
+    def _rpc(self, function: str, params: dict):
+        # 呼び出す関数はどれも再実行しても結果が変わらない
+        return self._execute(f"rpc {function}", self.client.rpc(function, params)).data
+
+    def _send_rows(self, table: str, rows: list[dict]):
+        spec = TABLES[table]
+        # 列の揃った行ごとに送る。default_to_null=False でも、1回の upsert で他の行にだけある列は
+        # 列デフォルトで上書きされるため（sync_to が送る first_seen_at など）
+        by_columns: dict[tuple[str, ...], list[dict]] = {}
+        for row in rows:
+            by_columns.setdefault(tuple(row), []).append(row)
+        for group in by_columns.values():
+            self._send_batches(table, spec, group)
+
+    def _send_batches(self, table: str, spec: TableSpec, rows: list[dict]):
+        # 500件ずつバッチ処理（Supabaseの制限対応）
+        for i in range(0, len(rows), 500):
+            batch = [_typed_row(r) for r in rows[i:i + 500]]
+            if spec.on_conflict is None:
+                # 一意キーの無い INSERT は再送で重複しうるため、未処理と分かる失敗だけ再試行する
+                self._execute(
+                    f"insert {table}",
+                    self.client.table(table).insert(batch, default_to_null=spec.default_to_null),
+                    idempotent=False,
+                )
+            else:
+                # default_to_null=False なら送らない列は INSERT 時に列デフォルト、更新時は据え置きになる
+                self._execute(f"upsert {table}", self.client.table(table).upsert(
+                    batch, on_conflict=spec.on_conflict, default_to_null=spec.default_to_null
+                ))
+            metrics.add_rows(table, len(batch))
+
+    # ── 動画メタデータ ──
 
     def find_new_video_ids(self, video_ids: list[str]) -> list[str]:
         existing = set()
         for i in range(0, len(video_ids), 100):
             batch = video_ids[i:i + 100]
-            result = (
-                self.client.table("video_metadata")
-                .select("video_id")
-                .in_("video_id", batch)
-                .execute()
+            result = self._execute(
+                "select video_metadata",
+                self.client.table("video_metadata").select("video_id").in_("video_id", batch),
             )
             existing.update(r["video_id"] for r in result.data)
         return [vid for vid in video_ids if vid not in existing]
 
-    # ── 動画スナップショット ──
-
-    def insert_video_snapshot(self, snap: VideoSnapshot):
-        self.client.table("video_snapshots").upsert(
-            {
-                "video_id": snap.video_id,
-                "view_count": snap.view_count,
-                "like_count": snap.like_count,
-                "comment_count": snap.comment_count,
-                "collected_date": snap.collected_date,
-                "collected_at": snap.collected_at,
-            },
-            on_conflict="video_id,collected_date",
-        ).execute()
-
-    def insert_video_snapshots_batch(self, snaps: list[VideoSnapshot]):
-        # Supabase upsert はバッチ対応
-        rows = [
-            {
-                "video_id": s.video_id,
-                "view_count": s.view_count,
-                "like_count": s.like_count,
-                "comment_count": s.comment_count,
-                "collected_date": s.collected_date,
-                "collected_at": s.collected_at,
-            }
-            for s in snaps
-        ]
-        # 500件ずつバッチ処理（Supabaseの制限対応）
-        for i in range(0, len(rows), 500):
-            batch = rows[i:i + 500]
-            self.client.table("video_snapshots").upsert(
-                batch, on_conflict="video_id,collected_date"
-            ).execute()
-
-    # ── スクレイピングスナップショット ──
-
-    def insert_scraped_snapshot(self, snap: ScrapedSnapshot):
-        self.client.table("scraped_snapshots").insert(
-            {
-                "video_id": snap.video_id,
-                "view_count": snap.view_count,
-                "like_count": snap.like_count,
-                "collected_at": snap.collected_at,
-            }
-        ).execute()
+    # ── ロールアップ ──
+
+    def refresh_latest_stats(self, video_ids: list[str], as_of: str | None = None) -> int:
+        # スナップショットが DB に届いてから集計する
+        self.flush()
+        updated = 0
+        for i in range(0, len(video_ids), 500):
+            batch = video_ids[i:i + 500]
+            updated += self._rpc("refresh_video_latest_stats", {"p_video_ids": batch, "p_as_of": as_of}) or 0
+        return updated
+
+    def compact_video_snapshots(self, keyframe_days: int) -> dict:
+        # migrations/004 の compact_video_snapshots()（削除した領域は VACUUM まで OS に返らないため推定値）
+        self.flush()
+        return self._rpc("compact_video_snapshots", {"p_keyframe_days": keyframe_days})
+
+    def compact_scraped_snapshots(self, raw_before: str, hourly_before: str) -> dict:
+        # migrations/005 の compact_scraped_snapshots()（引数は migrations/006 以降 TIMESTAMPTZ）
+        self.flush()
+        return self._rpc(
+            "compact_scraped_snapshots",
+            {"p_raw_before": _as_utc(raw_before), "p_hourly_before": _as_utc(hourly_before)},
+        )
+
+    def get_latest_stats(self) -> dict[str, dict]:
+        rows = self.iter_rows(
+            "video_latest_stats",
+            "video_id, published_at, collected_date, checked_date, view_count, like_count, comment_count, "
+            "view_delta_1d, view_delta_7d",
+            keys=("video_id",),
+        )
+        return {r["video_id"]: r for r in rows}
+
+    # ── ストリーミング読み出し ──
+
+    def iter_rows(
+        self,
+        table: str,
+        columns: str,
+        keys: tuple[str, ...],
+        desc: bool = False,
+        filters: Iterable[tuple[str, str, object]] = (),
+        page_size: int | None = None,
+    ) -> Iterator[dict]:
+        """keys の順に table をキーセットページングで1行ずつ返す
+
+        keys は一意になる列の組（末尾に主キーを含める）。filters は (演算子, 列, 値) のリストで、
+        例えば ("gte", "published_at", cutoff)。各ページを返している間に次のページを先読みするため、
+        件数に関わらずメモリに載るのは最大2ページ分。
+        """
+        page_size = page_size or self.page_size
+        select = ", ".join(dict.fromkeys([*keys, *(c.strip() for c in columns.split(","))]))
+
+        def fetch(last: dict | None) -> list[dict]:
+            query = self.client.table(table).select(select)
+            for op, column, value in filters:
+                query = getattr(query, op)(column, value)
+            if last is not None:
+                query = query.or_(_keyset_filter(keys, last, desc))
+            for key in keys:
+                query = query.order(key, desc=desc)
+            return self._execute(f"select {table}", query.limit(page_size)).data
+
+        with ThreadPoolExecutor(max_workers=1) as prefetch:
+            future = prefetch.submit(fetch, None)
+            while future is not None:
+                rows = future.result()
+                future = prefetch.submit(fetch, rows[-1]) if len(rows) >= page_size else None
+                yield from rows
 
     # ── クエリヘルパー ──
 
-    def get_recent_video_ids(self, days: int = 7) -> list[str]:
-        from datetime import timedelta
-        cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
-        result = (
-            self.client.table("video_metadata")
-            .select("video_id")
-            .gte("published_at", cutoff)
-            .order("published_at", desc=True)
-            .execute()
+    def iter_video_ids(self, published_since: str | None = None, channel_id: str | None = None) -> Iterator[str]:
+        filters = [("gte", "published_at", _as_utc(published_since))] if published_since else []
+        if channel_id:
+            filters.append(("eq", "channel_id", channel_id))
+        rows = self.iter_rows(
+            "video_metadata", "video_id", keys=("published_at", "video_id"), desc=True, filters=filters
         )
-        return [r["video_id"] for r in result.data]
-
-    def get_all_video_ids(self) -> list[str]:
-        result = (
-            self.client.table("video_metadata")
-            .select("video_id")
-            .order("published_at", desc=True)
-            .execute()
+        for r in rows:
+            yield r["video_id"]
+
+    def get_video_published_at(self) -> dict[str, str]:
+        rows = self.iter_rows("video_metadata", "video_id, published_at", keys=("video_id",))
+        return {r["video_id"]: r["published_at"] for r in rows}
+
+    def iter_video_snapshots(
+        self, start_date: str | None = None, end_date: str | None = None
+    ) -> Iterator[dict]:
+        filters = []
+        if start_date:
+            filters.append(("gte", "collected_date", start_date))
+        if end_date:
+            filters.append(("lte", "collected_date", end_date))
+        return self.iter_rows(
+            "video_snapshots",
+            "video_id, collected_date, view_count, like_count, comment_count",
+            keys=("collected_date", "video_id"),
+            filters=filters,
         )
-        return [r["video_id"] for r in result.data]
@@ -0,0 +1,58 @@
+import json
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class DiscoveryCache:
+    """uploads プレイリストIDと既知の動画IDをチャンネルごとにローカル保存するキャッシュ
+
+    ファイル形式:
+        {"channels": {channel_id: {"uploads_playlist_id": str,
+                                   "video_ids": [...],  # プレイリスト順（新しい順）
+                                   "last_full_scan": "YYYY-MM-DD"}}}
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._channels: dict[str, dict] = {}
+        if self.path.exists():
+            try:
+                self._channels = json.loads(self.path.read_text(encoding="utf-8")).get("channels", {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"Discovery cache を読み込めないため破棄します: {e}")
+
+    def _entry(self, channel_id: str) -> dict:
+        return self._channels.setdefault(channel_id, {})
+
+    def get_playlist_id(self, channel_id: str) -> str | None:
+        return self._channels.get(channel_id, {}).get("uploads_playlist_id")
+
+    def set_playlist_id(self, channel_id: str, playlist_id: str):
+        self._entry(channel_id)["uploads_playlist_id"] = playlist_id
+
+    def known_ids(self, channel_id: str) -> list[str]:
+        return list(self._channels.get(channel_id, {}).get("video_ids", []))
+
+    def needs_full_scan(self, channel_id: str, interval_days: int) -> bool:
+        """既知IDが無いか、前回の全件走査から interval_days 日以上経っていれば True"""
+        entry = self._channels.get(channel_id, {})
+        last = entry.get("last_full_scan")
+        if not entry.get("video_ids") or not last:
+            return True
+        return datetime.utcnow().date() - datetime.strptime(last, "%Y-%m-%d").date() >= timedelta(days=interval_days)
+
+    def update(self, channel_id: str, video_ids: list[str], full_scan: bool):
+        entry = self._entry(channel_id)
+        entry["video_ids"] = list(video_ids)
+        if full_scan:
+            entry["last_full_scan"] = datetime.utcnow().strftime("%Y-%m-%d")
+
+    def save(self):
+        # 書き込み途中で落ちてもキャッシュが壊れないよう一時ファイル経由で置き換える
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"channels": self._channels}, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.path)
@@ -0,0 +1,502 @@
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterator
+
+from src.compaction import needs_snapshot_row
+from src.metrics import metrics
+from src.storage import Storage, TABLES
+
+logger = logging.getLogger(__name__)
+
+# supabase_schema.sql と同じテーブル構成。synced は Supabase への同期管理用（0 = 未同期）
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channel_snapshots (
+    id INTEGER PRIMARY KEY,
+    channel_id TEXT NOT NULL,
+    subscriber_count INTEGER,
+    total_view_count INTEGER,
+    video_count INTEGER,
+    collected_date TEXT NOT NULL,
+    collected_at TEXT NOT NULL,
+    synced INTEGER NOT NULL DEFAULT 0,
+    UNIQUE(channel_id, collected_date)
+);
+
+CREATE TABLE IF NOT EXISTS channel_metadata (
+    channel_id TEXT PRIMARY KEY,
+    title TEXT,
+    thumbnail_url TEXT,
+    banner_url TEXT,
+    updated_at TEXT NOT NULL,
+    synced INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS video_metadata (
+    video_id TEXT PRIMARY KEY,
+    title TEXT,
+    description TEXT,
+    published_at TEXT,
+    duration_seconds INTEGER,
+    tags TEXT,
+    category_id TEXT,
+    thumbnail_url TEXT,
+    channel_id TEXT,
+    first_seen_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    updated_at TEXT,
+    synced INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS video_snapshots (
+    id INTEGER PRIMARY KEY,
+    video_id TEXT NOT NULL REFERENCES video_metadata(video_id),
+    view_count INTEGER,
+    like_count INTEGER,
+    comment_count INTEGER,
+    collected_date TEXT NOT NULL,
+    collected_at TEXT NOT NULL,
+    synced INTEGER NOT NULL DEFAULT 0,
+    UNIQUE(video_id, collected_date)
+);
+
+CREATE TABLE IF NOT EXISTS scraped_snapshots (
+    id INTEGER PRIMARY KEY,
+    video_id TEXT NOT NULL REFERENCES video_metadata(video_id),
+    view_count INTEGER,
+    like_count INTEGER,
+    collected_at TEXT NOT NULL,
+    synced INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS scraped_snapshot_rollups (
+    video_id TEXT NOT NULL REFERENCES video_metadata(video_id),
+    resolution TEXT NOT NULL,
+    bucket_start TEXT NOT NULL,
+    sample_count INTEGER NOT NULL,
+    view_min INTEGER,
+    view_max INTEGER,
+    view_last INTEGER,
+    like_min INTEGER,
+    like_max INTEGER,
+    like_last INTEGER,
+    last_collected_at TEXT NOT NULL,
+    synced INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (video_id, resolution, bucket_start)
+);
+
+CREATE TABLE IF NOT EXISTS video_latest_stats (
+    video_id TEXT PRIMARY KEY REFERENCES video_metadata(video_id),
+    channel_id TEXT,
+    title TEXT,
+    published_at TEXT,
+    duration_seconds INTEGER,
+    thumbnail_url TEXT,
+    collected_date TEXT NOT NULL,
+    checked_date TEXT,
+    view_count INTEGER,
+    like_count INTEGER,
+    comment_count INTEGER,
+    view_delta_1d INTEGER,
+    view_delta_7d INTEGER,
+    view_delta_30d INTEGER,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS video_growth_metrics (
+    video_id TEXT NOT NULL REFERENCES video_metadata(video_id),
+    collected_date TEXT NOT NULL,
+    days_since_publish INTEGER,
+    view_count INTEGER,
+    daily_view_delta REAL,
+    view_growth_rate REAL,
+    synced INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (video_id, collected_date)
+);
+
+CREATE TABLE IF NOT EXISTS growth_percentile_bands (
+    days_since_publish INTEGER PRIMARY KEY,
+    video_count INTEGER,
+    p10 REAL,
+    p25 REAL,
+    p50 REAL,
+    p75 REAL,
+    p90 REAL,
+    updated_at TEXT NOT NULL,
+    synced INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_video_snapshots_date ON video_snapshots(collected_date);
+CREATE INDEX IF NOT EXISTS idx_video_snapshots_video ON video_snapshots(video_id);
+CREATE INDEX IF NOT EXISTS idx_channel_snapshots_date ON channel_snapshots(collected_date);
+CREATE INDEX IF NOT EXISTS idx_scraped_snapshots_video_time ON scraped_snapshots(video_id, collected_at);
+CREATE INDEX IF NOT EXISTS idx_scraped_snapshots_collected_at ON scraped_snapshots(collected_at);
+DROP INDEX IF EXISTS idx_scraped_snapshots_video;
+CREATE INDEX IF NOT EXISTS idx_scraped_snapshot_rollups_bucket ON scraped_snapshot_rollups(resolution, bucket_start);
+CREATE INDEX IF NOT EXISTS idx_video_metadata_published ON video_metadata(published_at);
+"""
+
+# sync_to で TABLES[table].columns に加えて送る列（収集時は送らず列デフォルトに任せるが、同期ではローカルの値を保つ）
+SYNC_EXTRA_COLUMNS = {
+    "video_metadata": ("first_seen_at",),
+}
+
+# 作成後に追加した列（table, column, type）
+ADDED_COLUMNS = [
+    ("video_latest_stats", "checked_date", "TEXT"),
+    ("video_metadata", "channel_id", "TEXT"),
+    ("video_latest_stats", "channel_id", "TEXT"),
+]
+
+# 追加した列を使うインデックスと、列を追加した直後に一度だけ行う埋め戻し（migrations/007・009 と同じ）
+ADDED_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_video_metadata_channel ON video_metadata(channel_id, published_at)",
+    "CREATE INDEX IF NOT EXISTS idx_video_latest_stats_channel_views ON video_latest_stats(channel_id, view_count DESC)",
+]
+BACKFILLS = {
+    ("video_metadata", "channel_id"): """
+        UPDATE video_metadata SET channel_id = (SELECT channel_id FROM channel_metadata)
+        WHERE channel_id IS NULL AND (SELECT count(*) FROM channel_metadata) = 1""",
+    ("video_latest_stats", "channel_id"): """
+        UPDATE video_latest_stats SET channel_id = (
+            SELECT m.channel_id FROM video_metadata m WHERE m.video_id = video_latest_stats.video_id
+        )""",
+}
+
+
+# 同じ区間の集計行が既にあれば min/max/last でマージする（migrations/005 と同じ規則）
+ROLLUP_MERGE = """
+    ON CONFLICT(video_id, resolution, bucket_start) DO UPDATE SET
+        sample_count = sample_count + excluded.sample_count,
+        view_min = min(coalesce(view_min, excluded.view_min), coalesce(excluded.view_min, view_min)),
+        view_max = max(coalesce(view_max, excluded.view_max), coalesce(excluded.view_max, view_max)),
+        view_last = CASE WHEN excluded.last_collected_at >= last_collected_at
+                         THEN excluded.view_last ELSE view_last END,
+        like_min = min(coalesce(like_min, excluded.like_min), coalesce(excluded.like_min, like_min)),
+        like_max = max(coalesce(like_max, excluded.like_max), coalesce(excluded.like_max, like_max)),
+        like_last = CASE WHEN excluded.last_collected_at >= last_collected_at
+                         THEN excluded.like_last ELSE like_last END,
+        last_collected_at = max(last_collected_at, excluded.last_collected_at),
+        synced = 0
+"""
+
+
+class LocalDatabase(Storage):
+    """SQLite による組み込みバックエンド（オフライン実行・テスト・ベンチマーク・ローカル主記憶用）"""
+
+    def __init__(self, path: Path | str | None = None, page_size: int = 1000):
+        self.path = str(path) if path else ":memory:"
+        # iter_* が1回に読み出す行数
+        self.page_size = page_size
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self._lock = threading.Lock()
+
+    def ensure_schema(self):
+        with self._lock:
+            self.conn.executescript(SCHEMA)
+            # CREATE TABLE IF NOT EXISTS では既存DBに列が増えないため個別に追加する
+            for table, column, col_type in ADDED_COLUMNS:
+                existing = {r["name"] for r in self.conn.execute(f"PRAGMA table_info({table})")}
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
+                    if (table, column) in BACKFILLS:
+                        self.conn.execute(BACKFILLS[(table, column)])
+            for sql in ADDED_INDEXES:
+                self.conn.execute(sql)
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def write_rows(self, table: str, rows: list[dict]):
+        if not rows:
+            return
+        spec = TABLES[table]
+        columns = ", ".join(spec.columns)
+        placeholders = ", ".join(f":{c}" for c in spec.columns)
+        sql = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+        if spec.on_conflict is not None:
+            # 送った列だけを更新する（first_seen_at など送らない列は既存値を保持）
+            updates = ", ".join(
+                f"{c} = excluded.{c}" for c in spec.columns if c not in spec.on_conflict.split(",")
+            )
+            sql += f" ON CONFLICT({spec.on_conflict}) DO UPDATE SET {updates}, synced = 0"
+        # 1トランザクションでまとめて書き込む
+        op = "insert" if spec.on_conflict is None else "upsert"
+        with self._lock, metrics.timed("sqlite", f"{op} {table}"), self.conn:
+            self.conn.executemany(sql, rows)
+        metrics.add_rows(table, len(rows))
+
+    # ── 動画メタデータ ──
+
+    def find_new_video_ids(self, video_ids: list[str]) -> list[str]:
+        existing = set()
+        with self._lock:
+            for i in range(0, len(video_ids), 500):
+                batch = video_ids[i:i + 500]
+                placeholders = ", ".join("?" for _ in batch)
+                cur = self.conn.execute(
+                    f"SELECT video_id FROM video_metadata WHERE video_id IN ({placeholders})", batch
+                )
+                existing.update(r["video_id"] for r in cur)
+        return [vid for vid in video_ids if vid not in existing]
+
+    # ── ロールアップ ──
+
+    def refresh_latest_stats(self, video_ids: list[str], as_of: str | None = None) -> int:
+        # migrations/009 の refresh_video_latest_stats() と同じ集計
+        def prior(days: int) -> str:
+            return f"""(SELECT p.view_count FROM video_snapshots p
+                        WHERE p.video_id = l.video_id
+                          AND p.collected_date <= date(max(l.collected_date, coalesce(:as_of, l.collected_date)),
+                                                       '-{days} day')
+                        ORDER BY p.collected_date DESC LIMIT 1)"""
+
+        updated = 0
+        with self._lock, self.conn:
+            for i in range(0, len(video_ids), 500):
+                batch = video_ids[i:i + 500]
+                params = {"as_of": as_of, **{f"v{j}": vid for j, vid in enumerate(batch)}}
+                placeholders = ", ".join(f":v{j}" for j in range(len(batch)))
+                cur = self.conn.execute(
+                    f"""
+                    INSERT INTO video_latest_stats (
+                        video_id, channel_id, title, published_at, duration_seconds, thumbnail_url,
+                        collected_date, checked_date, view_count, like_count, comment_count,
+                        view_delta_1d, view_delta_7d, view_delta_30d, updated_at
+                    )
+                    SELECT
+                        l.video_id, m.channel_id, m.title, m.published_at, m.duration_seconds, m.thumbnail_url,
+                        l.collected_date, max(l.collected_date, coalesce(:as_of, l.collected_date)),
+                        l.view_count, l.like_count, l.comment_count,
+                        l.view_count - {prior(1)},
+                        l.view_count - {prior(7)},
+                        l.view_count - {prior(30)},
+                        strftime('%Y-%m-%dT%H:%M:%f', 'now')
+                    FROM video_snapshots l
+                    JOIN video_metadata m ON m.video_id = l.video_id
+                    WHERE l.video_id IN ({placeholders})
+                      AND l.collected_date = (
+                          SELECT max(collected_date) FROM video_snapshots x WHERE x.video_id = l.video_id
+                      )
+                    ON CONFLICT(video_id) DO UPDATE SET
+                        channel_id = excluded.channel_id,
+                        title = excluded.title,
+                        published_at = excluded.published_at,
+                        duration_seconds = excluded.duration_seconds,
+                        thumbnail_url = excluded.thumbnail_url,
+                        collected_date = excluded.collected_date,
+                        checked_date = excluded.checked_date,
+                        view_count = excluded.view_count,
+                        like_count = excluded.like_count,
+                        comment_count = excluded.comment_count,
+                        view_delta_1d = excluded.view_delta_1d,
+                        view_delta_7d = excluded.view_delta_7d,
+                        view_delta_30d = excluded.view_delta_30d,
+                        updated_at = excluded.updated_at
+                    """,
+                    params,
+                )
+                updated += cur.rowcount
+        return updated
+
+    def get_latest_stats(self) -> dict[str, dict]:
+        with self._lock:
+            cur = self.conn.execute(
+                """SELECT video_id, published_at, collected_date, checked_date,
+                          view_count, like_count, comment_count, view_delta_1d, view_delta_7d
+                   FROM video_latest_stats"""
+            )
+            return {r["video_id"]: dict(r) for r in cur}
+
+    def compact_video_snapshots(self, keyframe_days: int) -> dict:
+        def db_bytes() -> int:
+            return (self.conn.execute("PRAGMA page_count").fetchone()[0]
+                    * self.conn.execute("PRAGMA page_size").fetchone()[0])
+
+        with self._lock:
+            bytes_before = db_bytes()
+            rows = self.conn.execute(
+                """SELECT id, video_id, collected_date, view_count, like_count, comment_count
+                   FROM video_snapshots ORDER BY video_id, collected_date"""
+            ).fetchall()
+            drop = []
+            kept = {}
+            for r in rows:
+                counts = (r["view_count"], r["like_count"], r["comment_count"])
+                if needs_snapshot_row(kept.get(r["video_id"]), counts, r["collected_date"], keyframe_days):
+                    kept[r["video_id"]] = dict(r)
+                else:
+                    drop.append((r["id"],))
+            with self.conn:
+                self.conn.executemany("DELETE FROM video_snapshots WHERE id = ?", drop)
+            self.conn.execute("VACUUM")
+            return {
+                "rows_before": len(rows),
+                "rows_deleted": len(drop),
+                "rows_after": len(rows) - len(drop),
+                "bytes_before": bytes_before,
+                "bytes_after": db_bytes(),
+            }
+
+    # ── スクレイピングスナップショット ──
+
+    def compact_scraped_snapshots(self, raw_before: str, hourly_before: str) -> dict:
+        with self._lock, self.conn:
+            hourly_written = self.conn.execute(
+                f"""
+                INSERT INTO scraped_snapshot_rollups (
+                    video_id, resolution, bucket_start, sample_count,
+                    view_min, view_max, view_last, like_min, like_max, like_last, last_collected_at
+                )
+                SELECT video_id, 'hour', bucket, count(*),
+                       min(view_count), max(view_count), max(CASE WHEN rn = 1 THEN view_count END),
+                       min(like_count), max(like_count), max(CASE WHEN rn = 1 THEN like_count END),
+                       max(collected_at)
+                FROM (
+                    SELECT video_id, substr(collected_at, 1, 13) || ':00:00' AS bucket,
+                           view_count, like_count, collected_at,
+                           row_number() OVER (
+                               PARTITION BY video_id, substr(collected_at, 1, 13)
+                               ORDER BY collected_at DESC, id DESC
+                           ) AS rn
+                    FROM scraped_snapshots
+                    WHERE collected_at < :raw_before
+                )
+                WHERE true
+                GROUP BY video_id, bucket
+                {ROLLUP_MERGE}
+                """,
+                {"raw_before": raw_before},
+            ).rowcount
+            raw_compacted = self.conn.execute(
+                "DELETE FROM scraped_snapshots WHERE collected_at < ?", (raw_before,)
+            ).rowcount
+
+            daily_written = self.conn.execute(
+                f"""
+                INSERT INTO scraped_snapshot_rollups (
+                    video_id, resolution, bucket_start, sample_count,
+                    view_min, view_max, view_last, like_min, like_max, like_last, last_collected_at
+                )
+                SELECT video_id, 'day', bucket, sum(sample_count),
+                       min(view_min), max(view_max), max(CASE WHEN rn = 1 THEN view_last END),
+                       min(like_min), max(like_max), max(CASE WHEN rn = 1 THEN like_last END),
+                       max(last_collected_at)
+                FROM (
+                    SELECT video_id, substr(bucket_start, 1, 10) || 'T00:00:00' AS bucket,
+                           sample_count, view_min, view_max, view_last, like_min, like_max, like_last,
+                           last_collected_at,
+                           row_number() OVER (
+                               PARTITION BY video_id, substr(bucket_start, 1, 10)
+                               ORDER BY last_collected_at DESC
+                           ) AS rn
+                    FROM scraped_snapshot_rollups
+                    WHERE resolution = 'hour' AND bucket_start < :hourly_before
+                )
+                WHERE true
+                GROUP BY video_id, bucket
+                {ROLLUP_MERGE}
+                """,
+                {"hourly_before": hourly_before},
+            ).rowcount
+            hourly_compacted = self.conn.execute(
+                "DELETE FROM scraped_snapshot_rollups WHERE resolution = 'hour' AND bucket_start < ?",
+                (hourly_before,),
+            ).rowcount
+
+            counts = dict(self.conn.execute(
+                """SELECT 'raw', count(*) FROM scraped_snapshots
+                   UNION ALL SELECT resolution, count(*) FROM scraped_snapshot_rollups GROUP BY resolution"""
+            ).fetchall())
+        return {
+            "raw_compacted": raw_compacted,
+            "hourly_written": hourly_written,
+            "hourly_compacted": hourly_compacted,
+            "daily_written": daily_written,
+            "raw_rows": counts.get("raw", 0),
+            "hourly_rows": counts.get("hour", 0),
+            "daily_rows": counts.get("day", 0),
+        }
+
+    # ── クエリヘルパー ──
+
+    def iter_video_ids(self, published_since: str | None = None, channel_id: str | None = None) -> Iterator[str]:
+        rows = self._iter_query(
+            """SELECT video_id FROM video_metadata
+               WHERE (:since IS NULL OR published_at >= :since)
+                 AND (:channel IS NULL OR channel_id = :channel)
+               ORDER BY published_at DESC, video_id DESC""",
+            {"since": published_since, "channel": channel_id},
+        )
+        for r in rows:
+            yield r["video_id"]
+
+    def get_video_published_at(self) -> dict[str, str]:
+        with self._lock:
+            cur = self.conn.execute("SELECT video_id, published_at FROM video_metadata")
+            return {r["video_id"]: r["published_at"] for r in cur}
+
+    def iter_video_snapshots(
+        self, start_date: str | None = None, end_date: str | None = None
+    ) -> Iterator[dict]:
+        rows = self._iter_query(
+            """SELECT video_id, collected_date, view_count, like_count, comment_count
+               FROM video_snapshots
+               WHERE collected_date >= coalesce(?, '') AND collected_date <= coalesce(?, '9999-12-31')
+               ORDER BY collected_date, video_id""",
+            (start_date, end_date),
+        )
+        for r in rows:
+            yield dict(r)
+
+    def _iter_query(self, sql: str, params) -> Iterator[sqlite3.Row]:
+        """結果を page_size 行ずつ読み出して返す（ロックはページを読む間だけ持ち、呼び出し側の書き込みを妨げない）"""
+        with self._lock:
+            cur = self.conn.execute(sql, params)
+        try:
+            while True:
+                with self._lock:
+                    rows = cur.fetchmany(self.page_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cur.close()
+
+    # ── Supabase への同期 ──
+
+    def sync_to(self, remote: Storage, batch_size: int = 500) -> dict[str, int]:
+        """未同期の行を親テーブルから順に remote へ一括書き込みし、テーブルごとの件数を返す"""
+        synced = {}
+        for table, spec in TABLES.items():
+            sync_columns = spec.columns + SYNC_EXTRA_COLUMNS.get(table, ())
+            columns = ", ".join(sync_columns)
+            total = 0
+            while True:
+                with self._lock:
+                    rows = self.conn.execute(
+                        f"SELECT rowid AS row_id, {columns} FROM {table} WHERE synced = 0 ORDER BY rowid LIMIT ?",
+                        (batch_size,),
+                    ).fetchall()
+                if not rows:
+                    break
+                remote.write_rows(table, [{c: r[c] for c in sync_columns} for r in rows])
+                # 送信中に収集側が upsert して値が変わった行は未同期のまま残す（送った値と同じ行だけ同期済みにする）
+                unchanged = " AND ".join(f"{c} IS ?" for c in sync_columns)
+                with self._lock, self.conn:
+                    self.conn.executemany(
+                        f"UPDATE {table} SET synced = 1 WHERE rowid = ? AND {unchanged}",
+                        [(r["row_id"], *(r[c] for c in sync_columns)) for r in rows],
+                    )
+                total += len(rows)
+            synced[table] = total
+            if total:
+                logger.info(f"{table}: {total} 行を同期")
+        return synced
@@ -0,0 +1,250 @@
+"""収集1回分の計測値（段階ごとの所要時間・呼び出しレイテンシ・書き込み行数・クォータ消費）
+
+ApiCollector / ScrapeCollector / 各ストレージはモジュール共通の `metrics` に記録し、
+スクリプトは実行の最後に export() で JSON Lines（1実行1行）と Prometheus の textfile に書き出す。
+"""
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, ContextManager
+
+logger = logging.getLogger(__name__)
+
+# レイテンシのヒストグラムの区切り（秒、各区間の上限）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROMETHEUS_PREFIX = "youtube_collector"
+# どの段階にも入っていない間の記録先
+NO_STAGE = "other"
+
+
+class Histogram:
+    """LATENCY_BUCKETS で区切ったレイテンシの度数分布"""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # 末尾は最大の区切りを超えた分
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float | None:
+        """q 分位点を含む区間の上限（最後の区間なら観測した最大値）"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """Prometheus 形式の (le, 累積件数)"""
+        result = []
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS, self.counts):
+            seen += n
+            result.append((repr(bound), seen))
+        result.append(("+Inf", self.count))
+        return result
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class RunMetrics:
+    """スレッド間で共有する1実行分の計測値
+
+    呼び出しは (component, op) ごとにレイテンシ・エラー・リトライを数える。
+    component は youtube_api / scrape / supabase / sqlite、op は "videos.list" や "upsert video_snapshots" など。
+    クォータ消費は記録した時点の段階（stage() で囲んだ区間）に計上する。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # stage() のたびに段階名を渡して with で囲む追加の計測（--profile のプロファイラなど）
+        self.stage_hooks: list[Callable[[str], ContextManager]] = []
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = datetime.utcnow()
+            self._started = time.perf_counter()
+            self.current_stage = NO_STAGE
+            self.stage_seconds: dict[str, float] = {}
+            self.quota_units: dict[str, int] = {}
+            self.quota_units_by_key: dict[str, int] = {}
+            self.rows_written: dict[str, int] = {}
+            self.latency: dict[tuple[str, str], Histogram] = {}
+            self.errors: dict[tuple[str, str], int] = {}
+            self.retries: dict[tuple[str, str], int] = {}
+
+    # ── 記録 ──
+
+    @contextmanager
+    def stage(self, name: str):
+        """with の間を段階 name として所要時間を計り、クォータ消費をこの段階に計上する"""
+        with self._lock:
+            previous = self.current_stage
+            self.current_stage = name
+        start = time.perf_counter()
+        try:
+            with ExitStack() as hooks:
+                for hook in self.stage_hooks:
+                    hooks.enter_context(hook(name))
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + elapsed
+                self.current_stage = previous
+
+    def observe(self, component: str, op: str, seconds: float):
+        with self._lock:
+            self.latency.setdefault((component, op), Histogram()).observe(seconds)
+
+    @contextmanager
+    def timed(self, component: str, op: str):
+        """with の間を1回の呼び出しとしてレイテンシを記録する（例外なら失敗も数える）"""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.add_error(component, op)
+            raise
+        finally:
+            self.observe(component, op, time.perf_counter() - start)
+
+    def add_error(self, component: str, op: str):
+        with self._lock:
+            self.errors[(component, op)] = self.errors.get((component, op), 0) + 1
+
+    def add_retry(self, component: str, op: str):
+        with self._lock:
+            self.retries[(component, op)] = self.retries.get((component, op), 0) + 1
+
+    def add_quota(self, units: int, key: str | None = None):
+        with self._lock:
+            self.quota_units[self.current_stage] = self.quota_units.get(self.current_stage, 0) + units
+            if key is not None:
+                self.quota_units_by_key[key] = self.quota_units_by_key.get(key, 0) + units
+
+    def add_rows(self, table: str, count: int):
+        with self._lock:
+            self.rows_written[table] = self.rows_written.get(table, 0) + count
+
+    # ── 出力 ──
+
+    def summary(self, mode: str, success: bool) -> dict:
+        with self._lock:
+            calls = {}
+            for (component, op), hist in sorted(self.latency.items()):
+                calls[f"{component}/{op}"] = {
+                    "count": hist.count,
+                    "errors": self.errors.get((component, op), 0),
+                    "retries": self.retries.get((component, op), 0),
+                    "total_seconds": round(hist.sum, 4),
+                    "p50_seconds": round(hist.quantile(0.5), 4),
+                    "p95_seconds": round(hist.quantile(0.95), 4),
+                    "max_seconds": round(hist.max, 4),
+                }
+            stages = {
+                name: {"seconds": round(seconds, 3), "quota_units": self.quota_units.get(name, 0)}
+                for name, seconds in self.stage_seconds.items()
+            }
+            if self.quota_units.get(NO_STAGE):
+                stages.setdefault(NO_STAGE, {"seconds": None, "quota_units": self.quota_units[NO_STAGE]})
+            return {
+                "mode": mode,
+                "started_at": self.started_at.isoformat(),
+                "run_seconds": round(time.perf_counter() - self._started, 3),
+                "success": success,
+                "stages": stages,
+                "quota_units": sum(self.quota_units.values()),
+                "quota_units_by_key": dict(self.quota_units_by_key),
+                "rows_written": dict(self.rows_written),
+                "calls": calls,
+            }
+
+    def to_prometheus(self, mode: str, success: bool) -> str:
+        p = PROMETHEUS_PREFIX
+        lines = [
+            f"# HELP {p}_run_seconds Wall time of the last run.",
+            f"# TYPE {p}_run_seconds gauge",
+            f"{p}_run_seconds{_labels(mode=mode)} {time.perf_counter() - self._started:.3f}",
+            f"# TYPE {p}_run_success gauge",
+            f"{p}_run_success{_labels(mode=mode)} {int(success)}",
+            f"# TYPE {p}_run_timestamp_seconds gauge",
+            f"{p}_run_timestamp_seconds{_labels(mode=mode)} {time.time():.0f}",
+        ]
+        with self._lock:
+            lines += [f"# HELP {p}_stage_seconds Wall time per stage of the last run.",
+                      f"# TYPE {p}_stage_seconds gauge"]
+            lines += [f"{p}_stage_seconds{_labels(mode=mode, stage=s)} {v:.3f}" for s, v in self.stage_seconds.items()]
+            lines += [f"# HELP {p}_quota_units YouTube Data API quota units used per stage of the last run.",
+                      f"# TYPE {p}_quota_units gauge"]
+            lines += [f"{p}_quota_units{_labels(mode=mode, stage=s)} {v}" for s, v in self.quota_units.items()]
+            lines += [f"# HELP {p}_key_quota_units YouTube Data API quota units used per API key of the last run.",
+                      f"# TYPE {p}_key_quota_units gauge"]
+            lines += [f"{p}_key_quota_units{_labels(mode=mode, key=k)} {v}" for k, v in self.quota_units_by_key.items()]
+            lines += [f"# TYPE {p}_rows_written gauge"]
+            lines += [f"{p}_rows_written{_labels(mode=mode, table=t)} {v}" for t, v in self.rows_written.items()]
+            for name, counts in (("errors", self.errors), ("retries", self.retries)):
+                lines.append(f"# TYPE {p}_call_{name} gauge")
+                lines += [
+                    f"{p}_call_{name}{_labels(mode=mode, component=c, op=o)} {v}" for (c, o), v in counts.items()
+                ]
+            lines += [f"# HELP {p}_call_seconds Latency of API, scraping and storage calls in the last run.",
+                      f"# TYPE {p}_call_seconds histogram"]
+            for (component, op), hist in sorted(self.latency.items()):
+                for le, n in hist.cumulative():
+                    lines.append(f"{p}_call_seconds_bucket{_labels(mode=mode, component=component, op=op, le=le)} {n}")
+                lines.append(f"{p}_call_seconds_sum{_labels(mode=mode, component=component, op=op)} {hist.sum:.6f}")
+                lines.append(f"{p}_call_seconds_count{_labels(mode=mode, component=component, op=op)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, mode: str, history_dir: Path | None, textfile_dir: Path | None = None, success: bool = True):
+        """history_dir/{mode}.jsonl に1行追記し、textfile_dir があれば Prometheus 形式でも書き出す
+
+        計測値の書き出しに失敗しても収集自体は失敗させない。
+        """
+        summary = self.summary(mode, success)
+        logger.info(
+            "段階ごとの所要時間: "
+            + ", ".join(f"{name} {s['seconds']:.1f}s" for name, s in summary["stages"].items() if s["seconds"] is not None)
+        )
+        try:
+            if history_dir is not None:
+                history_dir = Path(history_dir)
+                history_dir.mkdir(parents=True, exist_ok=True)
+                with open(history_dir / f"{mode}.jsonl", "a", encoding="utf-8") as f:
+                    f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+            if textfile_dir is not None:
+                # node_exporter が書きかけを読まないよう一時ファイルから置き換える
+                path = Path(textfile_dir) / f"{PROMETHEUS_PREFIX}_{mode}.prom"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(path.suffix + ".tmp")
+                tmp.write_text(self.to_prometheus(mode, success), encoding="utf-8")
+                tmp.replace(path)
+        except OSError as e:
+            logger.warning(f"計測値を書き出せませんでした: {e}")
+
+
+# プロセス全体で共有する計測値
+metrics = RunMetrics()
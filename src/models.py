@@ -32,6 +32,7 @@ class VideoMetadata:
     tags: str  # JSON配列のテキスト
     category_id: str
     thumbnail_url: str
+    channel_id: Optional[str] = None  # 所属チャンネル（snippet.channelId）
 
 
 @dataclass
@@ -0,0 +1,114 @@
+import logging
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Iterable
+
+from src.models import VideoSnapshot
+from src.storage import Storage
+
+if TYPE_CHECKING:
+    # 型注釈のためだけに googleapiclient を読み込まない
+    from src.api_collector import VideoBatch
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class BackgroundWriter:
+    """別スレッドで write(item) を投入順に実行する書き込みステージ
+
+    キューは maxsize 件で頭打ちになり、書き込みが追いつかない間は put() が待つ（バックプレッシャー）。
+    書き込みで例外が起きたら、以降の put() と close() でその例外を送出する。
+    """
+
+    def __init__(self, write: Callable[[object], None], maxsize: int = 4, name: str = "writer"):
+        self._write = write
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            # 失敗後も put() が詰まらないようキューは読み捨て続ける
+            if self._error is None:
+                try:
+                    self._write(item)
+                except BaseException as e:
+                    self._error = e
+
+    def put(self, item):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(item)
+
+    def _stop(self):
+        self._queue.put(_DONE)
+        self._thread.join()
+
+    def close(self):
+        """キューに残った分を書き切ってからスレッドを止める"""
+        self._stop()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return
+        # 上流が失敗しても取得済みの分は書き込んでから上流の例外を送出する
+        self._stop()
+        if self._error is not None and self._error is not exc:
+            logger.error(f"書き込みステージでもエラーが発生: {self._error}")
+
+
+@dataclass
+class WriteProgress:
+    """パイプラインで処理した件数（途中で止まった場合もそこまでの分）"""
+    metadata_count: int = 0
+    snapshot_video_ids: list[str] = field(default_factory=list)  # 統計を確認した動画（書かなかった分を含む）
+    snapshot_rows: int = 0  # video_snapshots に書いた行数
+    collected_date: str | None = None
+
+
+def write_video_details(
+    db: Storage,
+    batches: Iterable["VideoBatch"],
+    progress: WriteProgress,
+    queue_size: int = 4,
+    on_written: Callable[["VideoBatch", int], None] | None = None,
+    snapshot_filter: Callable[[list[VideoSnapshot]], list[VideoSnapshot]] | None = None,
+):
+    """取得した videos.list のバッチを取得と並行して書き込む
+
+    batches の取得は呼び出し元のスレッドで、書き込みは BackgroundWriter で行う。
+    同じバッチ内ではメタデータを先に書く（スナップショットが video_metadata を参照するため）。
+    snapshot_filter を渡すと、それが返したスナップショットだけを書く（変化のみ保存するモード）。
+    on_written(batch, 書いたスナップショット行数) はバッチの書き込みが終わるたびに書き込みスレッドから呼ばれる。
+    """
+
+    def write(batch: "VideoBatch"):
+        if batch.metadata:
+            db.insert_video_metadata_batch(batch.metadata)
+            progress.metadata_count += len(batch.metadata)
+        snapshots = snapshot_filter(batch.snapshots) if snapshot_filter else batch.snapshots
+        if snapshots:
+            db.insert_video_snapshots_batch(snapshots)
+            progress.snapshot_rows += len(snapshots)
+        if batch.snapshots:
+            progress.snapshot_video_ids.extend(s.video_id for s in batch.snapshots)
+            progress.collected_date = batch.snapshots[0].collected_date
+        if on_written is not None:
+            on_written(batch, len(snapshots))
+
+    with BackgroundWriter(write, maxsize=queue_size, name="video-writer") as writer:
+        for batch in batches:
+            writer.put(batch)
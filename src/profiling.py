@@ -0,0 +1,222 @@
+"""--profile 用のプロファイラ: 段階（metrics.stage）ごとに CPU・スタック・メモリを記録してファイルに書き出す
+
+段階ごとに次の3種類を directory に出力する（番号は段階の実行順）。
+    NN-<stage>.pstats      cProfile の呼び出しグラフ（python -m pstats / snakeviz で開く）
+    NN-<stage>.collapsed   スタックのサンプリング結果（flamegraph.pl / speedscope に渡す collapsed 形式、
+                           待ち時間も含む壁時計ベース）
+    NN-<stage>.memory.txt  tracemalloc で見た段階中の確保量の多い行と、段階中のピーク
+最後に summary.txt に段階ごとの所要時間・ピークメモリ・自己時間の長い関数をまとめる。
+
+--profile を付けない実行ではこのモジュールは読み込まれず、コストは掛からない。
+"""
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = 0.005  # 秒。スタックを採取する間隔
+MEMORY_TOP = 25  # memory.txt に載せる行数
+SUMMARY_TOP = 15  # summary.txt に載せる関数の数
+
+# プロファイラ自身の確保は memory.txt から除く
+_MEMORY_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+
+# 3.12 以降の cProfile は sys.monitoring を使い、1つで全スレッドを計測する（同時に2つは有効にできない）
+_PROFILES_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+@dataclass
+class StageProfile:
+    name: str
+    seconds: float
+    peak_bytes: int
+    stats: pstats.Stats | None
+
+
+class StackSampler(threading.Thread):
+    """全スレッドのスタックを interval ごとに採取し、collapsed 形式の行ごとに数える"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.counts: Counter[str] = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write(self, path: Path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class _StageCProfile:
+    """段階中に動くすべてのスレッドを cProfile で計測し、終了時に1つの Stats にまとめる
+
+    3.11 以前の cProfile は有効にしたスレッドしか計測しないため、段階中に開始したスレッド
+    （videos.list のワーカーや書き込みスレッド）には threading.setprofile で個別のプロファイラを付ける。
+    """
+
+    def __init__(self):
+        self._profiles: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def _attach(self, frame, event, arg):
+        # 新しいスレッドの最初のイベントで呼ばれ、以降はこのスレッド専用のプロファイラに置き換わる
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+
+    def start(self):
+        main = cProfile.Profile()
+        self._profiles.append(main)
+        if not _PROFILES_ALL_THREADS:
+            threading.setprofile(self._attach)
+        main.enable()
+
+    def stop(self) -> pstats.Stats | None:
+        self._profiles[0].disable()
+        if not _PROFILES_ALL_THREADS:
+            threading.setprofile(None)
+        stats = None
+        with self._lock:
+            for profile in self._profiles:
+                # 他スレッドのプロファイラは止められないため、その時点までの計測値を読む
+                # （pstats.Stats に Profile を直接渡すと create_stats() で disable されてしまう）
+                profile.snapshot_stats()
+                if not profile.stats:
+                    continue
+                if stats is None:
+                    stats = pstats.Stats(_Snapshot(profile.stats))
+                else:
+                    stats.add(_Snapshot(profile.stats))
+        return stats
+
+
+class _Snapshot:
+    """pstats.Stats に計測値だけを渡すための入れ物"""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class RunProfiler:
+    """1回の実行を段階ごとにプロファイルし、directory に書き出す
+
+    start_run_profiler() で metrics.stage_hooks に登録して使う。tracemalloc は生成時に開始し、close() で止める。
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.stages: list[StageProfile] = []
+        self._active = False
+        tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str):
+        # cProfile は同時に1つしか有効にできないため、入れ子の段階は外側の段階に含めて計測する
+        if self._active:
+            yield
+            return
+        self._active = True
+        prefix = self.directory / f"{len(self.stages) + 1:02d}-{name}"
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        sampler = StackSampler()
+        profile = _StageCProfile()
+        start = time.perf_counter()
+        sampler.start()
+        profile.start()
+        try:
+            yield
+        finally:
+            stats = profile.stop()
+            sampler.stop()
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            self._active = False
+
+            if stats is not None:
+                stats.dump_stats(prefix.with_suffix(".pstats"))
+            sampler.write(prefix.with_suffix(".collapsed"))
+            self._write_memory(prefix.with_suffix(".memory.txt"), name, before, after, peak)
+            self.stages.append(StageProfile(name, seconds, peak, stats))
+
+    @staticmethod
+    def _write_memory(path: Path, name: str, before, after, peak: int):
+        diffs = after.filter_traces(_MEMORY_FILTERS).compare_to(before.filter_traces(_MEMORY_FILTERS), "lineno")
+        lines = [
+            f"stage: {name}",
+            f"peak traced memory during stage: {peak / 2**20:.1f} MiB",
+            f"net change: {sum(d.size_diff for d in diffs) / 2**20:+.1f} MiB",
+            "",
+            f"top {MEMORY_TOP} lines by allocated size during stage:",
+        ]
+        lines += [str(d) for d in sorted(diffs, key=lambda d: d.size_diff, reverse=True)[:MEMORY_TOP]]
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    def close(self):
+        """計測を止め、summary.txt を書き出す"""
+        if self.stage in metrics.stage_hooks:
+            metrics.stage_hooks.remove(self.stage)
+        tracemalloc.stop()
+        lines = []
+        for i, stage in enumerate(self.stages, 1):
+            lines.append(f"== {i:02d} {stage.name}: {stage.seconds:.2f}s, peak {stage.peak_bytes / 2**20:.1f} MiB ==")
+            if stage.stats is not None:
+                out = io.StringIO()
+                stage.stats.stream = out
+                stage.stats.sort_stats("tottime").print_stats(SUMMARY_TOP)
+                lines.append(out.getvalue().strip())
+            lines.append("")
+        (self.directory / "summary.txt").write_text("\n".join(lines), encoding="utf-8")
+        logger.info(f"プロファイルを {self.directory} に出力しました")
+
+
+def start_run_profiler(base_dir: Path, mode: str) -> RunProfiler:
+    """base_dir/<mode>-<UTC時刻>/ に出力するプロファイラを作り、以降の metrics.stage() を計測対象にする"""
+    profiler = RunProfiler(Path(base_dir) / f"{mode}-{datetime.utcnow():%Y%m%dT%H%M%SZ}")
+    metrics.stage_hooks.append(profiler.stage)
+    return profiler
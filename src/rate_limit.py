@@ -0,0 +1,47 @@
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """スレッド間で共有するトークンバケット型レートリミッタ
+
+    トークンは interval_min〜interval_max 秒のランダムな間隔で1つずつ補充され、
+    最大 capacity 個まで貯まる。満杯の間は補充間隔のカウントを進めない。
+    """
+
+    def __init__(self, capacity: int, interval_min: float, interval_max: float | None = None):
+        self.capacity = max(1, capacity)
+        self.interval_min = interval_min
+        self.interval_max = interval_min if interval_max is None else interval_max
+        self._tokens = float(self.capacity)
+        self._next_refill = time.monotonic() + self._interval()
+        self._lock = threading.Lock()
+
+    def _interval(self) -> float:
+        return random.uniform(self.interval_min, self.interval_max)
+
+    def _refill(self, now: float):
+        while self._tokens < self.capacity and now >= self._next_refill:
+            self._tokens += 1
+            self._next_refill += self._interval()
+        if self._tokens >= self.capacity:
+            self._next_refill = now + self._interval()
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        """トークンを1つ取得する。timeout 秒以内に取得できなければ False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = self._next_refill - now
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(max(wait, 0.01))
@@ -0,0 +1,182 @@
+"""外部呼び出し（YouTube Data API・Supabase・スクレイピング）の再試行とサーキットブレーカー
+
+呼び出し先ごとに Retrier を1つ持ち、1回の呼び出しを Retrier.call() で実行する。
+失敗は呼び出し先ごとの classify(例外, idempotent) で分類し、一時的な失敗（5xx・レート制限・接続断）だけを
+指数バックオフ（ジッタ付き）で再試行する。クォータ超過や 4xx は再試行しない。
+一時的な失敗が続いた呼び出し先はブレーカーが開き、しばらくの間は呼び出さずに CircuitOpenError で失敗させる。
+"""
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, TypeVar
+
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 4  # 初回を含む試行回数
+    base_delay: float = 1.0  # 1回目の再試行までの待ち時間（秒）。以降は倍々で max_delay まで
+    max_delay: float = 30.0
+    max_retry_after: float = 120.0  # Retry-After がこれより長ければ待たずに諦める
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float | None:
+        """attempt 回目の失敗の後に待つ秒数（再試行しないなら None）"""
+        if attempt >= self.max_attempts:
+            return None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        # 同時に失敗したワーカーが揃って再送しないよう、上限の半分〜上限で散らす
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return cap / 2 + random.uniform(0, cap / 2)
+
+
+@dataclass(frozen=True)
+class Failure:
+    """classify の結果"""
+    retryable: bool
+    retry_after: float | None = None  # 応答が待ち時間を指定していれば秒数
+
+
+PERMANENT = Failure(False)
+TRANSIENT = Failure(True)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-After ヘッダ（秒数または HTTP-date）を秒数にする"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class CircuitOpenError(Exception):
+    """ブレーカーが開いているため呼び出さなかった"""
+
+
+class CircuitBreaker:
+    """一時的な失敗が failure_threshold 回続いたら reset_seconds の間は呼び出しを止める
+
+    reset_seconds が経つと1件だけ試し（half-open）、成功すれば閉じ、失敗すればまた開く。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """呼び出してよければ何もしない。開いていれば CircuitOpenError"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            waited = time.monotonic() - self._opened_at
+            if waited >= self.reset_seconds and not self._probing:
+                self._probing = True
+                return
+        raise CircuitOpenError(f"{self.name}: circuit open after {self._failures} consecutive failures")
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"{self.name}: 呼び出しが回復したためブレーカーを閉じます")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_neutral(self):
+        """回復したかどうかを示さない応答（4xx・クォータ超過など）。連続失敗数と開閉状態はそのままにする
+
+        half-open の試行だった場合は、次の呼び出しでもう一度試せるようにする。
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                logger.warning(
+                    f"{self.name}: 一時的な失敗が {self._failures} 回続いたため "
+                    f"{self.reset_seconds:.0f} 秒間呼び出しを止めます"
+                )
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        """呼び出しを止めている間 True（reset_seconds が経って試せる状態なら False）"""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            return self._probing or time.monotonic() - self._opened_at < self.reset_seconds
+
+
+class Retrier:
+    """component への呼び出しを op ごとに計測し、一時的な失敗をバックオフして再試行する
+
+    classify(例外, idempotent) は再試行してよいかを返す。idempotent=False の呼び出し（重複しうる INSERT など）は
+    リクエストが処理されていないと分かる失敗だけを再試行するよう classify 側で判定する。
+    """
+
+    def __init__(
+        self,
+        component: str,
+        classify: Callable[[BaseException, bool], Failure],
+        policy: RetryPolicy = RetryPolicy(),
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.component = component
+        self.classify = classify
+        self.policy = policy
+        self.breaker = breaker or CircuitBreaker(component)
+
+    def call(self, op: str, fn: Callable[[], T], idempotent: bool = True, deadline: float | None = None) -> T:
+        """fn() を実行して結果を返す（deadline は time.monotonic() 基準で、超える待ちはせず諦める）"""
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.allow()
+            try:
+                with metrics.timed(self.component, op):
+                    result = fn()
+            except Exception as e:
+                failure = self.classify(e, idempotent)
+                if not failure.retryable:
+                    # 4xx・クォータ超過などは呼び出し先が回復したかどうかを示さないので、ブレーカーは動かさない
+                    self.breaker.record_neutral()
+                    raise
+                self.breaker.record_failure()
+                delay = self.policy.delay(attempt, failure.retry_after)
+                if delay is None or (deadline is not None and time.monotonic() + delay > deadline):
+                    raise
+                metrics.add_retry(self.component, op)
+                logger.warning(
+                    f"{self.component} {op}: 一時的な失敗のため {delay:.1f} 秒後に再試行します"
+                    f"（{attempt}/{self.policy.max_attempts}）: {e}"
+                )
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
@@ -0,0 +1,123 @@
+import zlib
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+
+
+@dataclass(frozen=True)
+class SamplingPolicy:
+    fresh_days: int = 30  # 公開からこの日数以内の動画は毎日取得
+    dormant_interval_days: int = 7  # 休眠動画はこの日数に1回だけ取得
+    dormant_daily_views: float = 10.0  # 1日あたりの再生増加がこれ未満なら休眠扱い
+
+
+@dataclass
+class SamplingPlan:
+    targets: list[str]  # 取得する動画（優先度順）
+    deferred: list[str] = field(default_factory=list)  # 休眠中で今日は取得しない動画
+    dropped: list[str] = field(default_factory=list)  # 予算不足で取得しない動画
+
+
+def interleave(groups: list[list[str]]) -> list[str]:
+    """各グループ（チャンネルごとの動画ID）から1件ずつ順に取り出して1列に並べる
+
+    同じ優先度の動画はこの並びの順に選ばれるため、予算が足りないときに特定のチャンネルだけが落ちない。
+    """
+    merged = []
+    for i in range(max(map(len, groups), default=0)):
+        merged.extend(group[i] for group in groups if i < len(group))
+    return list(dict.fromkeys(merged))
+
+
+def _expected_daily_views(stats: dict) -> float | None:
+    if stats.get("view_delta_7d") is not None:
+        return stats["view_delta_7d"] / 7
+    if stats.get("view_delta_1d") is not None:
+        return float(stats["view_delta_1d"])
+    return None
+
+
+def _days_between(start: str | None, today: date) -> int | None:
+    if not start:
+        return None
+    return (today - datetime.strptime(start[:10], "%Y-%m-%d").date()).days
+
+
+def plan_snapshot_targets(
+    video_ids: list[str],
+    latest_stats: dict[str, dict],
+    budget_units: int,
+    policy: SamplingPolicy = SamplingPolicy(),
+    today: date | None = None,
+) -> SamplingPlan:
+    """クォータ予算内で統計を取得する動画を、予想される変化の大きい順に選ぶ
+
+    優先度: 未取得の動画 > 公開直後の動画 > 伸びている動画 > 取得日が回ってきた休眠動画。
+    休眠動画は video_id のハッシュで曜日を分散させ、dormant_interval_days に1回だけ取得する
+    （前回取得から間隔以上空いていれば当日でなくても取得）。
+    予算は videos.list 1回（50件）= 1ユニットとして数え、溢れた分は優先度の低い順に落とす。
+    """
+    today = today or datetime.utcnow().date()
+    ranked = []
+    deferred = []
+    for i, vid in enumerate(video_ids):
+        stats = latest_stats.get(vid)
+        if stats is None:
+            ranked.append((0, 0.0, i, vid))
+            continue
+
+        daily = _expected_daily_views(stats) or 0.0
+        age = _days_between(stats.get("published_at"), today)
+        if age is not None and age <= policy.fresh_days:
+            ranked.append((1, -daily, i, vid))
+        elif daily >= policy.dormant_daily_views:
+            ranked.append((2, -daily, i, vid))
+        else:
+            # 変化のみ保存するモードでは行を書かなかった日も checked_date に残る
+            since_last = _days_between(stats.get("checked_date") or stats.get("collected_date"), today)
+            slot = zlib.crc32(vid.encode()) % policy.dormant_interval_days
+            if (since_last is None or since_last >= policy.dormant_interval_days
+                    or slot == today.toordinal() % policy.dormant_interval_days):
+                ranked.append((3, -daily, i, vid))
+            else:
+                deferred.append(vid)
+
+    ranked.sort()  # 同じ優先度なら元の並び（プレイリスト順）を保つ
+    capacity = max(budget_units, 0) * 50
+    ordered = [vid for *_, vid in ranked]
+    return SamplingPlan(targets=ordered[:capacity], deferred=deferred, dropped=ordered[capacity:])
+
+
+def _parse_utc(value: str) -> datetime:
+    """ISO 8601 の日時を naive な UTC にする（Supabase は +00:00 付き、収集側は naive な UTC で持つ）"""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class EarlyLifeWindow:
+    """公開から hours 時間以内の動画（動画ID→公開日時）をメモリに保持する
+
+    常駐モードの early ジョブが、DB を読み直さずに数分ごとの取得対象を決めるために使う。
+    """
+
+    def __init__(self, hours: float):
+        self.hours = hours
+        self._published: dict[str, datetime] = {}
+
+    def add(self, video_id: str, published_at: str | None):
+        if not published_at:
+            return
+        try:
+            self._published[video_id] = _parse_utc(published_at)
+        except ValueError:
+            pass
+
+    def video_ids(self, now: datetime | None = None) -> list[str]:
+        """期間内の動画を新しい順に返す（期間を過ぎた動画はここで忘れる）"""
+        cutoff = (now or datetime.utcnow()) - timedelta(hours=self.hours)
+        self._published = {vid: at for vid, at in self._published.items() if at >= cutoff}
+        return sorted(self._published, key=self._published.get, reverse=True)
+
+    def __len__(self) -> int:
+        return len(self._published)
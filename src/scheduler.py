@@ -0,0 +1,145 @@
+"""常駐モード（collect.py --mode daemon）用のプロセス内スケジューラ
+
+ジョブは登録順に1つずつメインスレッドで実行する（重ならない）。実行中に予定時刻を過ぎたジョブは、
+終わった後に1回だけ実行する（溜まった回数分は実行しない）。
+ジョブごとの前回の開始時刻を state_path に保存し、再起動しても間隔を保つ（記録が無いジョブはすぐ実行）。
+trigger_dir にジョブ名のファイルを置くと、予定を待たずに次の空きで実行する（request_run()）。
+"""
+import json
+import logging
+import random
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+
+class Every:
+    """前回の開始から seconds 秒ごと"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def next_after(self, last: datetime) -> datetime:
+        return last + timedelta(seconds=self.seconds)
+
+    def __str__(self):
+        return f"{self.seconds / 60:g} 分ごと"
+
+
+class DailyAt:
+    """毎日 at（"HH:MM"、tz の時刻）"""
+
+    def __init__(self, at: str, tz: str = "Asia/Tokyo"):
+        hour, minute = map(int, at.split(":"))
+        self.at = at
+        self.hour = hour
+        self.minute = minute
+        self.tz = ZoneInfo(tz)
+
+    def next_after(self, last: datetime) -> datetime:
+        local = last.astimezone(self.tz)
+        candidate = local.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if candidate <= local:
+            candidate += timedelta(days=1)
+        return candidate.astimezone(timezone.utc)
+
+    def __str__(self):
+        return f"毎日 {self.at}（{self.tz.key}）"
+
+
+@dataclass
+class Job:
+    name: str
+    run: Callable[[], None]
+    schedule: Every | DailyAt
+    jitter: float = 0.0  # 秒。予定時刻から最大この秒数だけ遅らせて、他の実行と開始が揃わないようにする
+    next_run: datetime | None = None
+
+
+def request_run(trigger_dir: Path, name: str):
+    """常駐しているスケジューラに name のジョブを今すぐ実行させる"""
+    trigger_dir = Path(trigger_dir)
+    trigger_dir.mkdir(parents=True, exist_ok=True)
+    (trigger_dir / name).touch()
+
+
+class Scheduler:
+    def __init__(self, jobs: list[Job], state_path: Path, trigger_dir: Path, poll_seconds: float = 5.0):
+        self.jobs = {job.name: job for job in jobs}
+        self.state_path = Path(state_path)
+        self.trigger_dir = Path(trigger_dir)
+        self.poll_seconds = poll_seconds
+        self.stop_event = threading.Event()
+        self._last_run = self._load_state()
+
+    def _load_state(self) -> dict[str, datetime]:
+        try:
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+            return {name: datetime.fromisoformat(value) for name, value in state.get("last_run", {}).items()}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(self.state_path.suffix + ".tmp")
+        state = {"last_run": {name: value.isoformat() for name, value in self._last_run.items()}}
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        tmp.replace(self.state_path)
+
+    def _plan(self, job: Job, now: datetime):
+        last = self._last_run.get(job.name)
+        base = now if last is None else job.schedule.next_after(last)
+        job.next_run = base + timedelta(seconds=random.uniform(0, job.jitter))
+
+    def _take_triggers(self, now: datetime):
+        if not self.trigger_dir.exists():
+            return
+        for path in self.trigger_dir.iterdir():
+            job = self.jobs.get(path.name)
+            path.unlink(missing_ok=True)
+            if job is None:
+                logger.warning(f"不明なジョブの実行要求を無視します: {path.name}")
+                continue
+            logger.info(f"{job.name}: 実行要求を受け付けました")
+            job.next_run = now
+
+    def _run(self, job: Job):
+        started = datetime.now(timezone.utc)
+        logger.info(f"{job.name}: 開始")
+        try:
+            job.run()
+        except Exception as e:
+            # 1つのジョブの失敗で常駐を止めない（次の予定で再実行する）
+            logger.error(f"{job.name}: 失敗しました: {e}", exc_info=True)
+        self._last_run[job.name] = started
+        self._save_state()
+        self._plan(job, datetime.now(timezone.utc))
+        logger.info(
+            f"{job.name}: 終了（{(datetime.now(timezone.utc) - started).total_seconds():.1f}s）。"
+            f"次回 {job.next_run.astimezone():%m-%d %H:%M:%S}"
+        )
+
+    def run_forever(self):
+        """stop() されるまでジョブを実行し続ける（実行中のジョブは最後まで終えてから止まる）"""
+        now = datetime.now(timezone.utc)
+        for job in self.jobs.values():
+            self._plan(job, now)
+            logger.info(f"{job.name}: {job.schedule}、次回 {job.next_run.astimezone():%m-%d %H:%M:%S}")
+        while not self.stop_event.is_set():
+            now = datetime.now(timezone.utc)
+            self._take_triggers(now)
+            due = [job for job in self.jobs.values() if job.next_run <= now]
+            if due:
+                # 予定時刻の早いものから（同時なら登録順）
+                self._run(min(due, key=lambda job: job.next_run))
+                continue
+            wait = min(job.next_run for job in self.jobs.values()) - now
+            self.stop_event.wait(min(wait.total_seconds(), self.poll_seconds))
+
+    def stop(self):
+        self.stop_event.set()
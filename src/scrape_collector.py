@@ -1,40 +1,108 @@
 import logging
-import random
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import yt_dlp
 
 from src.models import ScrapedSnapshot
+from src.rate_limit import TokenBucket
+from src.retry import PERMANENT, TRANSIENT, CircuitOpenError, Failure, Retrier, RetryPolicy
 
 logger = logging.getLogger(__name__)
 
+YDL_OPTS = {
+    "quiet": True,
+    "no_warnings": True,
+    "skip_download": True,
+    "extract_flat": False,
+    "socket_timeout": 15,
+}
+
+# チャンネルの動画タブを1リクエストで一覧取得するためのオプション（個別ページは開かない）
+FLAT_YDL_OPTS = {
+    **YDL_OPTS,
+    "extract_flat": "in_playlist",
+}
+
+# レート制限に掛かったときはリクエスト間隔（SCRAPE_DELAY_*）より十分長く待つ
+SCRAPE_RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay=10.0, max_delay=60.0)
+_HTTP_STATUS = re.compile(r"HTTP Error (\d{3})")
+_TRANSIENT_MESSAGES = re.compile(
+    r"timed out|Connection reset|Connection aborted|Remote end closed|Temporary failure in name resolution",
+    re.IGNORECASE,
+)
+
+
+def classify_scrape_error(error: BaseException, idempotent: bool = True) -> Failure:
+    """429・5xx・接続エラーは再試行する（非公開・削除済みなどの動画は再試行しない）"""
+    if isinstance(error, yt_dlp.utils.DownloadError):
+        # yt-dlp は元の例外をメッセージに埋め込んで DownloadError にする
+        message = str(error)
+        status = _HTTP_STATUS.search(message)
+        if status:
+            code = int(status.group(1))
+            return TRANSIENT if code == 429 or code >= 500 else PERMANENT
+        return TRANSIENT if _TRANSIENT_MESSAGES.search(message) else PERMANENT
+    if isinstance(error, OSError):
+        return TRANSIENT
+    return PERMANENT
+
 
 class ScrapeCollector:
-    def __init__(self, delay_min: float = 3.0, delay_max: float = 5.0):
+    def __init__(
+        self,
+        delay_min: float = 3.0,
+        delay_max: float = 5.0,
+        workers: int = 1,
+        max_requests: int | None = None,
+        deadline_seconds: float | None = None,
+    ):
         self.delay_min = delay_min
         self.delay_max = delay_max
-        self._call_count = 0
+        self.workers = max(1, workers)
+        self.max_requests = max_requests
+        self.deadline_seconds = deadline_seconds
+        # 全ワーカーで共有するレート制限（同時に開始できるのは workers 件まで）
+        self.bucket = TokenBucket(self.workers, delay_min, delay_max)
+        self._local = threading.local()
+        self._ydls: list[yt_dlp.YoutubeDL] = []
+        self._ydls_lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._flat_ydl: yt_dlp.YoutubeDL | None = None
+        # 全ワーカーで共有する（ブロックされ始めたら残りの動画はリクエストせずに諦める）
+        self.retrier = Retrier("scrape", classify_scrape_error, SCRAPE_RETRY_POLICY)
+
+    def _ydl(self) -> yt_dlp.YoutubeDL:
+        # YoutubeDL はスレッドセーフではないため、スレッドごとに1つ作って使い回す
+        ydl = getattr(self._local, "ydl", None)
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL(YDL_OPTS)
+            self._local.ydl = ydl
+            with self._ydls_lock:
+                self._ydls.append(ydl)
+        return ydl
 
-    def get_live_stats(self, video_id: str) -> ScrapedSnapshot | None:
-        """yt-dlp で動画のリアルタイム統計を取得"""
+    def get_live_stats(self, video_id: str, deadline: float | None = None) -> ScrapedSnapshot | None:
+        """yt-dlp で動画のリアルタイム統計を取得（deadline は time.monotonic() 基準の締め切り）"""
         url = f"https://www.youtube.com/watch?v={video_id}"
-        opts = {
-            "quiet": True,
-            "no_warnings": True,
-            "skip_download": True,
-            "extract_flat": False,
-        }
+
+        # ブレーカーが開いている間はトークンを待たずに諦める
+        if self.retrier.breaker.is_open:
+            raise CircuitOpenError("scrape: circuit open")
 
         # レート制限
-        if self._call_count > 0:
-            delay = random.uniform(self.delay_min, self.delay_max)
-            time.sleep(delay)
-        self._call_count += 1
+        timeout = None if deadline is None else deadline - time.monotonic()
+        if not self.bucket.acquire(timeout=timeout):
+            logger.warning(f"{video_id}: 締め切りまでに順番が回らなかったためスキップ")
+            return None
 
         try:
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                info = ydl.extract_info(url, download=False)
+            info = self.retrier.call(
+                "watch", lambda: self._ydl().extract_info(url, download=False), deadline=deadline
+            )
 
             view_count = info.get("view_count")
             if view_count is None:
@@ -47,9 +115,128 @@ class ScrapeCollector:
                 like_count=info.get("like_count"),
                 collected_at=datetime.utcnow().isoformat(),
             )
+        except CircuitOpenError:
+            raise
         except yt_dlp.utils.DownloadError as e:
             logger.warning(f"{video_id}: ダウンロードエラー - {e}")
             raise
         except Exception as e:
             logger.warning(f"{video_id}: 予期しないエラー - {e}")
             raise
+
+    def get_channel_tab_stats(
+        self, channel_id: str, limit: int, deadline: float | None = None
+    ) -> dict[str, dict]:
+        """チャンネルの動画タブを flat 抽出し、新しい順に limit 件の 動画ID→エントリ を返す
+
+        各動画ページを開かずにタブ1ページ分（+継続ページ）のリクエストで
+        複数動画の view_count を得られる。like_count は含まれない。
+        """
+        timeout = None if deadline is None else deadline - time.monotonic()
+        if not self.bucket.acquire(timeout=timeout):
+            logger.warning(f"{channel_id}: 締め切りまでに順番が回らなかったため動画タブの取得をスキップ")
+            return {}
+
+        with self._ydls_lock:
+            if self._flat_ydl is None:
+                self._flat_ydl = yt_dlp.YoutubeDL(FLAT_YDL_OPTS)
+                self._ydls.append(self._flat_ydl)
+            ydl = self._flat_ydl
+        ydl.params["playlistend"] = limit
+        info = self.retrier.call(
+            "channel_tab",
+            lambda: ydl.extract_info(f"https://www.youtube.com/channel/{channel_id}/videos", download=False),
+            deadline=deadline,
+        )
+        return {entry["id"]: entry for entry in info.get("entries") or [] if entry and entry.get("id")}
+
+    def _limit_targets(self, video_ids: list[str]) -> list[str]:
+        if self.max_requests is not None and len(video_ids) > self.max_requests:
+            logger.warning(f"対象 {len(video_ids)} 件のうち先頭 {self.max_requests} 件のみ取得します")
+            return video_ids[:self.max_requests]
+        return video_ids
+
+    def _run_deadline(self) -> float | None:
+        if self.deadline_seconds is None:
+            return None
+        return time.monotonic() + self.deadline_seconds
+
+    def _collect_each(self, video_ids: list[str], deadline: float | None) -> dict[str, ScrapedSnapshot]:
+        """ワーカープールで動画ページを個別に抽出する。失敗した動画は警告ログを出して除外"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        futures = [self._executor.submit(self.get_live_stats, vid, deadline) for vid in video_ids]
+
+        snapshots = {}
+        blocked = 0
+        for video_id, future in zip(video_ids, futures):
+            try:
+                snap = future.result()
+            except CircuitOpenError:
+                blocked += 1
+                continue
+            except Exception as e:
+                logger.warning(f"{video_id}: スクレイピング失敗 - {e}")
+                continue
+            if snap:
+                snapshots[video_id] = snap
+        if blocked:
+            logger.warning(f"失敗が続いたため {blocked} 件はリクエストせずにスキップしました")
+        return snapshots
+
+    def collect(self, video_ids: list[str]) -> list[ScrapedSnapshot]:
+        """ワーカープールで複数動画を並列スクレイピングし、入力順に結果を返す
+
+        1回の実行は max_requests 件までとし、全体が deadline_seconds 秒以内に
+        収まらなかった動画はスキップする。失敗した動画は警告ログを出して除外する。
+        """
+        targets = self._limit_targets(video_ids)
+        found = self._collect_each(targets, self._run_deadline())
+        return [found[vid] for vid in targets if vid in found]
+
+    def collect_stats_only(
+        self, video_ids: list[str], channel_id: str, require_likes: bool = False
+    ) -> list[ScrapedSnapshot]:
+        """動画タブの flat 抽出で統計をまとめて取得し、欠けた動画だけ個別ページから取得する
+
+        require_likes=True の場合、動画タブでは得られない like_count のために
+        全動画が個別取得にフォールバックする。結果は collect() と同じく入力順。
+        """
+        targets = self._limit_targets(video_ids)
+        deadline = self._run_deadline()
+        try:
+            entries = self.get_channel_tab_stats(channel_id, len(targets) + 10, deadline)
+        except Exception as e:
+            logger.warning(f"{channel_id}: 動画タブの取得に失敗 - {e}")
+            entries = {}
+
+        collected_at = datetime.utcnow().isoformat()
+        found = {}
+        missing = []
+        for vid in targets:
+            entry = entries.get(vid, {})
+            if entry.get("view_count") is None or (require_likes and entry.get("like_count") is None):
+                missing.append(vid)
+                continue
+            found[vid] = ScrapedSnapshot(
+                video_id=vid,
+                view_count=entry["view_count"],
+                like_count=entry.get("like_count"),
+                collected_at=collected_at,
+            )
+
+        if missing:
+            logger.info(f"{len(missing)} 件は動画タブで取得できなかったため個別ページから取得します")
+            found.update(self._collect_each(missing, deadline))
+        return [found[vid] for vid in targets if vid in found]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._ydls_lock:
+            for ydl in self._ydls:
+                ydl.close()
+            self._ydls.clear()
+            self._flat_ydl = None
+        self._local = threading.local()
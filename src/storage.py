@@ -0,0 +1,249 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator
+
+from src.models import ChannelSnapshot, ChannelMetadata, VideoMetadata, VideoSnapshot, ScrapedSnapshot
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    columns: tuple[str, ...]  # 書き込み時に送る列
+    on_conflict: str | None  # upsert の一意キー（None は常に INSERT）
+    default_to_null: bool = True  # False: 送らない列は INSERT 時に列デフォルトを使う
+
+
+# supabase_schema.sql のテーブル。外部キーの依存順（親テーブルが先）に並べる
+TABLES = {
+    "channel_snapshots": TableSpec(
+        columns=("channel_id", "subscriber_count", "total_view_count", "video_count",
+                 "collected_date", "collected_at"),
+        on_conflict="channel_id,collected_date",
+    ),
+    "channel_metadata": TableSpec(
+        columns=("channel_id", "title", "thumbnail_url", "banner_url", "updated_at"),
+        on_conflict="channel_id",
+    ),
+    # first_seen_at は送らず列デフォルトに任せ、既存行では更新しない（LocalDatabase.sync_to だけはローカルの値を送る）
+    "video_metadata": TableSpec(
+        columns=("video_id", "title", "description", "published_at", "duration_seconds",
+                 "tags", "category_id", "thumbnail_url", "channel_id", "updated_at"),
+        on_conflict="video_id",
+        default_to_null=False,
+    ),
+    "video_snapshots": TableSpec(
+        columns=("video_id", "view_count", "like_count", "comment_count",
+                 "collected_date", "collected_at"),
+        on_conflict="video_id,collected_date",
+    ),
+    "scraped_snapshots": TableSpec(
+        columns=("video_id", "view_count", "like_count", "collected_at"),
+        on_conflict=None,
+    ),
+    # scraped_snapshots の古い行を compact_scraped_snapshots() がまとめた時間・日集計
+    "scraped_snapshot_rollups": TableSpec(
+        columns=("video_id", "resolution", "bucket_start", "sample_count",
+                 "view_min", "view_max", "view_last", "like_min", "like_max", "like_last",
+                 "last_collected_at"),
+        on_conflict="video_id,resolution,bucket_start",
+    ),
+    # 以下は src/analytics.py が video_snapshots から算出する派生テーブル
+    "video_growth_metrics": TableSpec(
+        columns=("video_id", "collected_date", "days_since_publish", "view_count",
+                 "daily_view_delta", "view_growth_rate"),
+        on_conflict="video_id,collected_date",
+    ),
+    "growth_percentile_bands": TableSpec(
+        columns=("days_since_publish", "video_count", "p10", "p25", "p50", "p75", "p90", "updated_at"),
+        on_conflict="days_since_publish",
+    ),
+}
+
+
+def channel_snapshot_row(snap: ChannelSnapshot) -> dict:
+    return {
+        "channel_id": snap.channel_id,
+        "subscriber_count": snap.subscriber_count,
+        "total_view_count": snap.total_view_count,
+        "video_count": snap.video_count,
+        "collected_date": snap.collected_date,
+        "collected_at": snap.collected_at,
+    }
+
+
+def channel_metadata_row(meta: ChannelMetadata) -> dict:
+    return {
+        "channel_id": meta.channel_id,
+        "title": meta.title,
+        "thumbnail_url": meta.thumbnail_url,
+        "banner_url": meta.banner_url,
+        "updated_at": meta.updated_at,
+    }
+
+
+def video_metadata_row(meta: VideoMetadata, updated_at: str) -> dict:
+    return {
+        "video_id": meta.video_id,
+        "title": meta.title,
+        "description": meta.description,
+        "published_at": meta.published_at,
+        "duration_seconds": meta.duration_seconds,
+        "tags": meta.tags,
+        "category_id": meta.category_id,
+        "thumbnail_url": meta.thumbnail_url,
+        "channel_id": meta.channel_id,
+        "updated_at": updated_at,
+    }
+
+
+def video_snapshot_row(snap: VideoSnapshot) -> dict:
+    return {
+        "video_id": snap.video_id,
+        "view_count": snap.view_count,
+        "like_count": snap.like_count,
+        "comment_count": snap.comment_count,
+        "collected_date": snap.collected_date,
+        "collected_at": snap.collected_at,
+    }
+
+
+def scraped_snapshot_row(snap: ScrapedSnapshot) -> dict:
+    return {
+        "video_id": snap.video_id,
+        "view_count": snap.view_count,
+        "like_count": snap.like_count,
+        "collected_at": snap.collected_at,
+    }
+
+
+class Storage(ABC):
+    """収集データの保存先インターフェース
+
+    書き込みは write_rows() に集約し、各バックエンドはテーブル単位の一括書き込みと
+    読み取り系のクエリだけを実装する。
+    """
+
+    def ensure_schema(self):
+        pass
+
+    def flush(self):
+        """バッファ済みの書き込みを確定する（バッファしないバックエンドでは何もしない）"""
+        pass
+
+    def flush_pending(self):
+        """flush() と同じだが、失敗しても例外にしない（送れなかった行はバッファに残り、次の flush で再送される）
+
+        実行の開始・終了時の再送に使い、再送できなくても収集は続ける。
+        """
+        self.flush()
+
+    def close(self):
+        pass
+
+    @abstractmethod
+    def write_rows(self, table: str, rows: list[dict]):
+        """TABLES[table] の一意キーで rows を一括 upsert（一意キーが無ければ INSERT）"""
+
+    # ── チャンネルスナップショット ──
+
+    def insert_channel_snapshot(self, snap: ChannelSnapshot):
+        self.insert_channel_snapshots_batch([snap])
+
+    def insert_channel_snapshots_batch(self, snaps: list[ChannelSnapshot]):
+        self.write_rows("channel_snapshots", [channel_snapshot_row(s) for s in snaps])
+
+    def insert_channel_metadata(self, meta: ChannelMetadata):
+        self.insert_channel_metadata_batch([meta])
+
+    def insert_channel_metadata_batch(self, metas: list[ChannelMetadata]):
+        self.write_rows("channel_metadata", [channel_metadata_row(m) for m in metas])
+
+    # ── 動画メタデータ ──
+
+    def insert_video_metadata(self, meta: VideoMetadata):
+        self.insert_video_metadata_batch([meta])
+
+    def insert_video_metadata_batch(self, metas: list[VideoMetadata]):
+        now = datetime.utcnow().isoformat()
+        self.write_rows("video_metadata", [video_metadata_row(m, now) for m in metas])
+
+    @abstractmethod
+    def find_new_video_ids(self, video_ids: list[str]) -> list[str]:
+        ...
+
+    # ── 動画スナップショット ──
+
+    def insert_video_snapshot(self, snap: VideoSnapshot):
+        self.insert_video_snapshots_batch([snap])
+
+    def insert_video_snapshots_batch(self, snaps: list[VideoSnapshot]):
+        self.write_rows("video_snapshots", [video_snapshot_row(s) for s in snaps])
+
+    # ── スクレイピングスナップショット ──
+
+    def insert_scraped_snapshot(self, snap: ScrapedSnapshot):
+        self.insert_scraped_snapshots_batch([snap])
+
+    def insert_scraped_snapshots_batch(self, snaps: list[ScrapedSnapshot]):
+        self.write_rows("scraped_snapshots", [scraped_snapshot_row(s) for s in snaps])
+
+    @abstractmethod
+    def compact_scraped_snapshots(self, raw_before: str, hourly_before: str) -> dict:
+        """collected_at < raw_before の生データを時間集計へ、bucket_start < hourly_before の時間集計を日集計へ移す
+
+        集計は区間ごとの最小・最大・最後の値を持ち、既存の集計行とはマージする。
+        境界は src.compaction.scrape_retention_cutoffs() で求める。処理件数と各階層の行数を返す。
+        """
+
+    # ── ロールアップ ──
+
+    @abstractmethod
+    def refresh_latest_stats(self, video_ids: list[str], as_of: str | None = None) -> int:
+        """video_latest_stats を指定動画の最新スナップショットから更新し、更新行数を返す
+
+        as_of はその値を確認した日付。変化が無く行を書かなかった動画も、増分は as_of 基準で計算する。
+        """
+
+    @abstractmethod
+    def get_latest_stats(self) -> dict[str, dict]:
+        """video_latest_stats の video_id → 行（published_at, collected_date, checked_date, 各カウント, view_delta_*）"""
+
+    @abstractmethod
+    def compact_video_snapshots(self, keyframe_days: int) -> dict:
+        """直前に残した行と値が同じでキーフレーム間隔内の行を video_snapshots から削除し、削減量を返す"""
+
+    # ── クエリヘルパー ──
+
+    @abstractmethod
+    def iter_video_ids(self, published_since: str | None = None, channel_id: str | None = None) -> Iterator[str]:
+        """動画IDを公開日の新しい順に1件ずつ返す（published_since 以降の公開・channel_id のチャンネルに限定可）"""
+
+    def get_recent_video_ids(self, days: int = 7, channel_id: str | None = None) -> list[str]:
+        cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
+        return list(self.iter_video_ids(published_since=cutoff, channel_id=channel_id))
+
+    def get_all_video_ids(self) -> list[str]:
+        return list(self.iter_video_ids())
+
+    @abstractmethod
+    def get_video_published_at(self) -> dict[str, str]:
+        """全動画の video_id → published_at"""
+
+    @abstractmethod
+    def iter_video_snapshots(
+        self, start_date: str | None = None, end_date: str | None = None
+    ) -> Iterator[dict]:
+        """video_snapshots を (collected_date, video_id) 順に1行ずつ返す（両端の日付を含む）"""
+
+
+def open_storage(backend: str, supabase_url: str = "", supabase_key: str = "",
+                 local_path: Path | str | None = None, spool_dir: Path | None = None) -> Storage:
+    """設定に応じたバックエンドを生成（使わないバックエンドの依存は import しない）"""
+    if backend == "supabase":
+        from src.db import Database
+        return Database(supabase_url, supabase_key, spool_dir=spool_dir)
+    if backend == "sqlite":
+        from src.local_db import LocalDatabase
+        return LocalDatabase(local_path)
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -1,10 +1,22 @@
+-- チャンネル日次統計
+CREATE TABLE channel_snapshots (
+    id BIGSERIAL PRIMARY KEY,
+    channel_id TEXT NOT NULL,
+    subscriber_count BIGINT,
+    total_view_count BIGINT,
+    video_count BIGINT,
+    collected_date DATE NOT NULL,
+    collected_at TIMESTAMPTZ NOT NULL,
+    UNIQUE(channel_id, collected_date)
+);
+
 -- チャンネルメタデータ（アイコン、バナーなど）
 CREATE TABLE channel_metadata (
     channel_id TEXT PRIMARY KEY,
     title TEXT,
     thumbnail_url TEXT,
     banner_url TEXT,
-    updated_at TEXT NOT NULL
+    updated_at TIMESTAMPTZ NOT NULL
 );
 
 ALTER TABLE channel_metadata ENABLE ROW LEVEL SECURITY;
@@ -15,50 +27,436 @@ CREATE TABLE video_metadata (
     video_id TEXT PRIMARY KEY,
     title TEXT,
     description TEXT,
-    published_at TEXT,
+    published_at TIMESTAMPTZ,
     duration_seconds INTEGER,
     tags TEXT,
     category_id TEXT,
     thumbnail_url TEXT,
-    first_seen_at TEXT,
-    updated_at TEXT
+    channel_id TEXT,  -- 所属チャンネル（snippet.channelId）
+    -- 初回登録時刻。upsert では送らず、列デフォルトで設定して以後は更新しない
+    first_seen_at TIMESTAMPTZ DEFAULT now(),
+    updated_at TIMESTAMPTZ
 );
 
--- 動画日次統計（コアテーブル）
+-- 動画日次統計（コアテーブル）。collected_date の月単位で範囲パーティション化する
 CREATE TABLE video_snapshots (
-    id BIGSERIAL PRIMARY KEY,
     video_id TEXT NOT NULL REFERENCES video_metadata(video_id),
-    view_count INTEGER,
-    like_count INTEGER,
-    comment_count INTEGER,
-    collected_date TEXT NOT NULL,
-    collected_at TEXT NOT NULL,
-    UNIQUE(video_id, collected_date)
-);
+    view_count BIGINT,
+    like_count BIGINT,
+    comment_count BIGINT,
+    collected_date DATE NOT NULL,
+    collected_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (video_id, collected_date)
+) PARTITION BY RANGE (collected_date);
+
+-- 月パーティションが無い日付の受け皿（通常は空のまま）
+CREATE TABLE video_snapshots_default PARTITION OF video_snapshots DEFAULT;
+ALTER TABLE video_snapshots_default ENABLE ROW LEVEL SECURITY;
+
+-- p_from の月から、今月の p_months_ahead か月先までの月パーティションを作成し、作成数を返す
+-- パーティションは RLS を有効にしてポリシーを付けない（読み取りは親テーブル経由だけにする）。
+-- 既に受け皿に入っている同じ月の行は、新しいパーティションへ移す（残っているとパーティションを作成できない）
+-- 収集スクリプト（service_role）が RPC で呼ぶ。テーブルを作るため所有者権限で実行し、service_role 以外からは呼べなくする
+CREATE OR REPLACE FUNCTION ensure_video_snapshot_partitions(p_from DATE DEFAULT NULL, p_months_ahead INTEGER DEFAULT 2)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    month_start DATE := date_trunc('month', coalesce(p_from, current_date))::date;
+    last_month DATE := (date_trunc('month', current_date) + make_interval(months => p_months_ahead))::date;
+    month_end DATE;
+    part_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        part_name := 'video_snapshots_' || to_char(month_start, 'YYYY_MM');
+        month_end := (month_start + interval '1 month')::date;
+        IF to_regclass(part_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TEMP TABLE _partition_rows ON COMMIT DROP AS '
+                'SELECT * FROM video_snapshots_default WHERE collected_date >= %L AND collected_date < %L',
+                month_start, month_end
+            );
+            DELETE FROM video_snapshots_default
+            WHERE collected_date >= month_start AND collected_date < month_end;
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF video_snapshots FOR VALUES FROM (%L) TO (%L)',
+                part_name, month_start, month_end
+            );
+            EXECUTE format('ALTER TABLE %I ENABLE ROW LEVEL SECURITY', part_name);
+            INSERT INTO video_snapshots SELECT * FROM _partition_rows;
+            DROP TABLE _partition_rows;
+            created := created + 1;
+        END IF;
+        month_start := month_end;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION ensure_video_snapshot_partitions(DATE, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION ensure_video_snapshot_partitions(DATE, INTEGER) TO service_role;
+
+SELECT ensure_video_snapshot_partitions();
 
 -- スクレイピング高頻度データ
 CREATE TABLE scraped_snapshots (
     id BIGSERIAL PRIMARY KEY,
     video_id TEXT NOT NULL REFERENCES video_metadata(video_id),
-    view_count INTEGER,
-    like_count INTEGER,
-    collected_at TEXT NOT NULL
+    view_count BIGINT,
+    like_count BIGINT,
+    collected_at TIMESTAMPTZ NOT NULL
+);
+
+-- スクレイピングデータの時間・日集計（resolution = 'hour' | 'day'、bucket_start は区間の開始時刻 UTC）
+-- 保持期間を過ぎた scraped_snapshots は compact_scraped_snapshots() でここにまとめる
+CREATE TABLE scraped_snapshot_rollups (
+    video_id TEXT NOT NULL REFERENCES video_metadata(video_id),
+    resolution TEXT NOT NULL,
+    bucket_start TIMESTAMPTZ NOT NULL,
+    sample_count INTEGER NOT NULL,
+    view_min BIGINT,
+    view_max BIGINT,
+    view_last BIGINT,
+    like_min BIGINT,
+    like_max BIGINT,
+    like_last BIGINT,
+    last_collected_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (video_id, resolution, bucket_start)
+);
+
+-- 動画ごとの最新統計と増分のロールアップ（日次収集の最後に refresh_video_latest_stats で更新）
+CREATE TABLE video_latest_stats (
+    video_id TEXT PRIMARY KEY REFERENCES video_metadata(video_id),
+    channel_id TEXT,  -- video_metadata.channel_id の写し（ダッシュボードがチャンネルで絞り込む）
+    title TEXT,
+    published_at TIMESTAMPTZ,
+    duration_seconds INTEGER,
+    thumbnail_url TEXT,
+    collected_date DATE NOT NULL,
+    checked_date DATE,  -- 値を最後に確認した日（SNAPSHOT_STORAGE=changes では collected_date より新しいことがある）
+    view_count BIGINT,
+    like_count BIGINT,
+    comment_count BIGINT,
+    view_delta_1d BIGINT,
+    view_delta_7d BIGINT,
+    view_delta_30d BIGINT,
+    updated_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX idx_video_latest_stats_views ON video_latest_stats(view_count DESC);
+CREATE INDEX idx_video_latest_stats_published ON video_latest_stats(published_at);
+CREATE INDEX idx_video_latest_stats_channel_views ON video_latest_stats(channel_id, view_count DESC);
+
+ALTER TABLE video_latest_stats ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Allow public read" ON video_latest_stats FOR SELECT USING (true);
+
+-- p_as_of はその日に値を確認した日付（変化が無くスナップショットを書かなかった日も含む）。
+-- 増分は checked_date 基準で計算する。
+CREATE OR REPLACE FUNCTION refresh_video_latest_stats(p_video_ids TEXT[], p_as_of DATE DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH latest AS (
+        SELECT DISTINCT ON (s.video_id)
+            s.video_id, s.collected_date, s.view_count, s.like_count, s.comment_count,
+            greatest(s.collected_date, coalesce(p_as_of, s.collected_date)) AS checked_date
+        FROM video_snapshots s
+        WHERE s.video_id = ANY(p_video_ids)
+        ORDER BY s.video_id, s.collected_date DESC
+    ),
+    upserted AS (
+        INSERT INTO video_latest_stats AS t (
+            video_id, channel_id, title, published_at, duration_seconds, thumbnail_url,
+            collected_date, checked_date, view_count, like_count, comment_count,
+            view_delta_1d, view_delta_7d, view_delta_30d, updated_at
+        )
+        SELECT
+            l.video_id, m.channel_id, m.title, m.published_at, m.duration_seconds, m.thumbnail_url,
+            l.collected_date, l.checked_date, l.view_count, l.like_count, l.comment_count,
+            l.view_count - p1.view_count,
+            l.view_count - p7.view_count,
+            l.view_count - p30.view_count,
+            now()
+        FROM latest l
+        JOIN video_metadata m ON m.video_id = l.video_id
+        LEFT JOIN LATERAL (
+            SELECT p.view_count FROM video_snapshots p
+            WHERE p.video_id = l.video_id AND p.collected_date <= l.checked_date - 1
+            ORDER BY p.collected_date DESC LIMIT 1
+        ) p1 ON true
+        LEFT JOIN LATERAL (
+            SELECT p.view_count FROM video_snapshots p
+            WHERE p.video_id = l.video_id AND p.collected_date <= l.checked_date - 7
+            ORDER BY p.collected_date DESC LIMIT 1
+        ) p7 ON true
+        LEFT JOIN LATERAL (
+            SELECT p.view_count FROM video_snapshots p
+            WHERE p.video_id = l.video_id AND p.collected_date <= l.checked_date - 30
+            ORDER BY p.collected_date DESC LIMIT 1
+        ) p30 ON true
+        ON CONFLICT (video_id) DO UPDATE SET
+            channel_id = EXCLUDED.channel_id,
+            title = EXCLUDED.title,
+            published_at = EXCLUDED.published_at,
+            duration_seconds = EXCLUDED.duration_seconds,
+            thumbnail_url = EXCLUDED.thumbnail_url,
+            collected_date = EXCLUDED.collected_date,
+            checked_date = EXCLUDED.checked_date,
+            view_count = EXCLUDED.view_count,
+            like_count = EXCLUDED.like_count,
+            comment_count = EXCLUDED.comment_count,
+            view_delta_1d = EXCLUDED.view_delta_1d,
+            view_delta_7d = EXCLUDED.view_delta_7d,
+            view_delta_30d = EXCLUDED.view_delta_30d,
+            updated_at = EXCLUDED.updated_at
+        RETURNING 1
+    )
+    SELECT count(*)::INTEGER FROM upserted;
+$$;
+
+-- 日付ごとの値の復元（ダッシュボードの推移グラフ用）
+--   p_start〜p_end の各日について、その日以前で最も新しいスナップショットの値を返す。
+--   p_video_ids が NULL なら全動画、p_end が NULL なら最新の収集日まで。
+CREATE OR REPLACE FUNCTION video_snapshots_filled(
+    p_video_ids TEXT[], p_start DATE, p_end DATE DEFAULT NULL
+)
+RETURNS TABLE (
+    video_id TEXT, collected_date DATE, view_count BIGINT, like_count BIGINT, comment_count BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT v.video_id, d.day::date, s.view_count, s.like_count, s.comment_count
+    FROM unnest(coalesce(p_video_ids, ARRAY(SELECT m.video_id FROM video_metadata m))) AS v(video_id)
+    CROSS JOIN generate_series(
+        p_start,
+        coalesce(p_end, (SELECT max(x.collected_date) FROM video_snapshots x)),
+        interval '1 day'
+    ) AS d(day)
+    JOIN LATERAL (
+        SELECT p.view_count, p.like_count, p.comment_count FROM video_snapshots p
+        WHERE p.video_id = v.video_id AND p.collected_date <= d.day::date
+        ORDER BY p.collected_date DESC LIMIT 1
+    ) s ON true
+    ORDER BY 2, 1;
+$$;
+
+-- 既存履歴の圧縮（scripts/compact_snapshots.py から呼ぶ）: 直前に残した行と値が同じで、キーフレーム間隔内の行を削除する
+--   削除後の領域は VACUUM (FULL) video_snapshots; を別途実行すると OS に返される。
+CREATE OR REPLACE FUNCTION compact_video_snapshots(p_keyframe_days INTEGER DEFAULT 7)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    r RECORD;
+    kept_video TEXT;
+    kept_date DATE;
+    kept_counts BIGINT[];
+    rows_before BIGINT;
+    bytes_before BIGINT;
+    deleted BIGINT;
+BEGIN
+    SELECT count(*) INTO rows_before FROM video_snapshots;
+    -- パーティションテーブル自体は空なので各パーティションの合計
+    SELECT coalesce(sum(pg_total_relation_size(relid)), 0) INTO bytes_before
+    FROM pg_partition_tree('video_snapshots');
+
+    CREATE TEMP TABLE _compact_drop (video_id TEXT, collected_date DATE, PRIMARY KEY (video_id, collected_date))
+        ON COMMIT DROP;
+    FOR r IN
+        SELECT video_id, collected_date, view_count, like_count, comment_count
+        FROM video_snapshots
+        ORDER BY video_id, collected_date
+    LOOP
+        IF r.video_id = kept_video
+           AND ARRAY[r.view_count, r.like_count, r.comment_count] IS NOT DISTINCT FROM kept_counts
+           AND r.collected_date - kept_date < p_keyframe_days
+        THEN
+            INSERT INTO _compact_drop VALUES (r.video_id, r.collected_date);
+        ELSE
+            kept_video := r.video_id;
+            kept_date := r.collected_date;
+            kept_counts := ARRAY[r.view_count, r.like_count, r.comment_count];
+        END IF;
+    END LOOP;
+
+    DELETE FROM video_snapshots s USING _compact_drop d
+    WHERE s.video_id = d.video_id AND s.collected_date = d.collected_date;
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+
+    RETURN json_build_object(
+        'rows_before', rows_before,
+        'rows_deleted', deleted,
+        'rows_after', rows_before - deleted,
+        'bytes_before', bytes_before,
+        'estimated_bytes_saved', CASE WHEN rows_before > 0 THEN bytes_before * deleted / rows_before ELSE 0 END
+    );
+END;
+$$;
+
+-- 生データ・時間集計・日集計を1本の時系列として読むビュー（生データは min = max = last）
+CREATE OR REPLACE VIEW scraped_snapshots_tiered AS
+    SELECT video_id, 'raw' AS resolution, collected_at AS bucket_start, 1 AS sample_count,
+           view_count AS view_min, view_count AS view_max, view_count AS view_last,
+           like_count AS like_min, like_count AS like_max, like_count AS like_last,
+           collected_at AS last_collected_at
+    FROM scraped_snapshots
+    UNION ALL
+    SELECT video_id, resolution, bucket_start, sample_count,
+           view_min, view_max, view_last, like_min, like_max, like_last, last_collected_at
+    FROM scraped_snapshot_rollups;
+
+-- scraped_snapshots の圧縮（scripts/compact_snapshots.py --table scraped_snapshots から呼ぶ）
+--   collected_at < p_raw_before の生データを時間集計へ、bucket_start < p_hourly_before の時間集計を日集計へ移す（既存の集計行とは min/max/last でマージ）
+CREATE OR REPLACE FUNCTION compact_scraped_snapshots(p_raw_before TIMESTAMPTZ, p_hourly_before TIMESTAMPTZ)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    raw_compacted BIGINT;
+    hourly_written BIGINT;
+    hourly_compacted BIGINT;
+    daily_written BIGINT;
+BEGIN
+    WITH moved AS (
+        DELETE FROM scraped_snapshots WHERE collected_at < p_raw_before
+        RETURNING id, video_id, view_count, like_count, collected_at
+    ),
+    upserted AS (
+        INSERT INTO scraped_snapshot_rollups AS t (
+            video_id, resolution, bucket_start, sample_count,
+            view_min, view_max, view_last, like_min, like_max, like_last, last_collected_at
+        )
+        SELECT
+            m.video_id, 'hour', date_trunc('hour', m.collected_at, 'UTC'), count(*),
+            min(m.view_count), max(m.view_count),
+            (array_agg(m.view_count ORDER BY m.collected_at DESC, m.id DESC))[1],
+            min(m.like_count), max(m.like_count),
+            (array_agg(m.like_count ORDER BY m.collected_at DESC, m.id DESC))[1],
+            max(m.collected_at)
+        FROM moved m
+        GROUP BY m.video_id, date_trunc('hour', m.collected_at, 'UTC')
+        ON CONFLICT (video_id, resolution, bucket_start) DO UPDATE SET
+            sample_count = t.sample_count + EXCLUDED.sample_count,
+            view_min = least(t.view_min, EXCLUDED.view_min),
+            view_max = greatest(t.view_max, EXCLUDED.view_max),
+            view_last = CASE WHEN EXCLUDED.last_collected_at >= t.last_collected_at
+                             THEN EXCLUDED.view_last ELSE t.view_last END,
+            like_min = least(t.like_min, EXCLUDED.like_min),
+            like_max = greatest(t.like_max, EXCLUDED.like_max),
+            like_last = CASE WHEN EXCLUDED.last_collected_at >= t.last_collected_at
+                             THEN EXCLUDED.like_last ELSE t.like_last END,
+            last_collected_at = greatest(t.last_collected_at, EXCLUDED.last_collected_at)
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM moved), (SELECT count(*) FROM upserted)
+    INTO raw_compacted, hourly_written;
+
+    WITH moved AS (
+        DELETE FROM scraped_snapshot_rollups
+        WHERE resolution = 'hour' AND bucket_start < p_hourly_before
+        RETURNING *
+    ),
+    upserted AS (
+        INSERT INTO scraped_snapshot_rollups AS t (
+            video_id, resolution, bucket_start, sample_count,
+            view_min, view_max, view_last, like_min, like_max, like_last, last_collected_at
+        )
+        SELECT
+            m.video_id, 'day', date_trunc('day', m.bucket_start, 'UTC'), sum(m.sample_count),
+            min(m.view_min), max(m.view_max),
+            (array_agg(m.view_last ORDER BY m.last_collected_at DESC))[1],
+            min(m.like_min), max(m.like_max),
+            (array_agg(m.like_last ORDER BY m.last_collected_at DESC))[1],
+            max(m.last_collected_at)
+        FROM moved m
+        GROUP BY m.video_id, date_trunc('day', m.bucket_start, 'UTC')
+        ON CONFLICT (video_id, resolution, bucket_start) DO UPDATE SET
+            sample_count = t.sample_count + EXCLUDED.sample_count,
+            view_min = least(t.view_min, EXCLUDED.view_min),
+            view_max = greatest(t.view_max, EXCLUDED.view_max),
+            view_last = CASE WHEN EXCLUDED.last_collected_at >= t.last_collected_at
+                             THEN EXCLUDED.view_last ELSE t.view_last END,
+            like_min = least(t.like_min, EXCLUDED.like_min),
+            like_max = greatest(t.like_max, EXCLUDED.like_max),
+            like_last = CASE WHEN EXCLUDED.last_collected_at >= t.last_collected_at
+                             THEN EXCLUDED.like_last ELSE t.like_last END,
+            last_collected_at = greatest(t.last_collected_at, EXCLUDED.last_collected_at)
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM moved), (SELECT count(*) FROM upserted)
+    INTO hourly_compacted, daily_written;
+
+    RETURN json_build_object(
+        'raw_compacted', raw_compacted,
+        'hourly_written', hourly_written,
+        'hourly_compacted', hourly_compacted,
+        'daily_written', daily_written,
+        'raw_rows', (SELECT count(*) FROM scraped_snapshots),
+        'hourly_rows', (SELECT count(*) FROM scraped_snapshot_rollups WHERE resolution = 'hour'),
+        'daily_rows', (SELECT count(*) FROM scraped_snapshot_rollups WHERE resolution = 'day')
+    );
+END;
+$$;
+
+-- 成長指標の派生テーブル（scripts/compute_growth.py で更新）
+-- 動画×日付ごとの成長指標
+CREATE TABLE video_growth_metrics (
+    video_id TEXT NOT NULL REFERENCES video_metadata(video_id),
+    collected_date DATE NOT NULL,
+    days_since_publish INTEGER,
+    view_count BIGINT,
+    daily_view_delta DOUBLE PRECISION,
+    view_growth_rate DOUBLE PRECISION,
+    PRIMARY KEY (video_id, collected_date)
 );
 
+CREATE INDEX idx_video_growth_metrics_dsp ON video_growth_metrics(days_since_publish);
+
+-- 公開からの経過日数ごとの累計再生数パーセンタイル帯（全動画）
+CREATE TABLE growth_percentile_bands (
+    days_since_publish INTEGER PRIMARY KEY,
+    video_count INTEGER,
+    p10 DOUBLE PRECISION,
+    p25 DOUBLE PRECISION,
+    p50 DOUBLE PRECISION,
+    p75 DOUBLE PRECISION,
+    p90 DOUBLE PRECISION,
+    updated_at TIMESTAMPTZ NOT NULL
+);
+
+ALTER TABLE video_growth_metrics ENABLE ROW LEVEL SECURITY;
+ALTER TABLE growth_percentile_bands ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Allow public read" ON video_growth_metrics FOR SELECT USING (true);
+CREATE POLICY "Allow public read" ON growth_percentile_bands FOR SELECT USING (true);
+
 -- インデックス
-CREATE INDEX idx_video_snapshots_date ON video_snapshots(collected_date);
-CREATE INDEX idx_video_snapshots_video ON video_snapshots(video_id);
-CREATE INDEX idx_channel_snapshots_date ON channel_snapshots(collected_date);
-CREATE INDEX idx_scraped_snapshots_video ON scraped_snapshots(video_id);
+-- 動画ごとの時系列（増分・補完・推移グラフ）は video_snapshots の主キー (video_id, collected_date) で引く
+-- 全動画を日付順に読む iter_video_snapshots のキーセットページング用
+CREATE INDEX idx_video_snapshots_date_video ON video_snapshots(collected_date, video_id);
+-- iter_video_ids のキーセットページング（公開日の新しい順）とダッシュボードの新着一覧用
+CREATE INDEX idx_video_metadata_published_video ON video_metadata(published_at DESC, video_id DESC);
+-- チャンネルを指定した iter_video_ids（複数チャンネルの新着スクレイピング）
+CREATE INDEX idx_video_metadata_channel_published ON video_metadata(channel_id, published_at DESC, video_id DESC);
+-- 追記順と時刻がほぼ一致するテーブルの日付範囲の絞り込みは BRIN
+CREATE INDEX idx_channel_snapshots_date_brin ON channel_snapshots USING brin (collected_date);
+CREATE INDEX idx_scraped_snapshots_video_time ON scraped_snapshots(video_id, collected_at);
+CREATE INDEX idx_scraped_snapshots_collected_at_brin ON scraped_snapshots USING brin (collected_at);
+CREATE INDEX idx_scraped_snapshot_rollups_bucket ON scraped_snapshot_rollups(resolution, bucket_start);
 
 -- RLS（Row Level Security）を有効化 - Next.jsからの読み取りアクセス用
 ALTER TABLE channel_snapshots ENABLE ROW LEVEL SECURITY;
 ALTER TABLE video_metadata ENABLE ROW LEVEL SECURITY;
 ALTER TABLE video_snapshots ENABLE ROW LEVEL SECURITY;
 ALTER TABLE scraped_snapshots ENABLE ROW LEVEL SECURITY;
+ALTER TABLE scraped_snapshot_rollups ENABLE ROW LEVEL SECURITY;
 
 -- anon キーでの読み取りを許可（ダッシュボード表示用）
 CREATE POLICY "Allow public read" ON channel_snapshots FOR SELECT USING (true);
 CREATE POLICY "Allow public read" ON video_metadata FOR SELECT USING (true);
 CREATE POLICY "Allow public read" ON video_snapshots FOR SELECT USING (true);
 CREATE POLICY "Allow public read" ON scraped_snapshots FOR SELECT USING (true);
+CREATE POLICY "Allow public read" ON scraped_snapshot_rollups FOR SELECT USING (true);